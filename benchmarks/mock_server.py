@@ -0,0 +1,328 @@
+"""Local stand-in for the KNMI Open Data API.
+
+Serves the file listing, the download URL endpoint and signed downloads for
+a generated dataset, with configurable latency, bandwidth, page size, error
+rate and throttling. Files are generated from their index, so even a dataset
+of millions of files takes no memory. Run from the repository root:
+
+    python -m benchmarks.mock_server --files 10000 --latency 0.05
+
+The first line written to standard output is the base URL of the API.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+# Start of the generated dataset
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Block that the content of every generated file repeats
+BLOCK = bytes(range(256)) * 256
+
+@dataclass
+class MockServerConfig:
+    """Configuration of the mock API and its generated dataset."""
+    files: int = 1000
+    file_size: int = 100 * 1024
+    interval: float = 600.0  # Seconds between two generated files
+    page_size: int = 1000  # Files per listing page unless maxKeys asks for fewer
+    latency: float = 0.0  # Added to every API request and to the first byte of a download (seconds)
+    bandwidth: Optional[float] = None  # Per download stream (bytes per second), unlimited if None
+    error_rate: float = 0.0  # Fraction of requests answered with a 500
+    throttle_rate: float = 0.0  # Fraction of requests answered with a 429
+    retry_after: float = 1.0  # Retry-After sent with a 429 (seconds)
+    url_ttl: int = 3600  # Lifetime of a download URL (seconds)
+    api_key: Optional[str] = None  # Key required by the API, any key is accepted if None
+
+    def filename(self, index: int) -> str:
+        return f"KMDS__OPER_P___10M_OBS_L2_{index:08d}.nc"
+
+    def index(self, filename: str) -> Optional[int]:
+        try:
+            index = int(filename[len("KMDS__OPER_P___10M_OBS_L2_"):-len(".nc")])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.files and self.filename(index) == filename else None
+
+    def modified(self, index: int) -> datetime:
+        return EPOCH + timedelta(seconds=index * self.interval)
+
+    def end(self) -> datetime:
+        """End of the time range covering all generated files."""
+        return self.modified(self.files)
+
+    def summary(self, index: int) -> Dict[str, object]:
+        timestamp = self.modified(index).isoformat()
+        return {
+            "filename": self.filename(index),
+            "size": self.file_size,
+            "created": timestamp,
+            "lastModified": timestamp,
+        }
+
+class MockServer:
+    """The mock API served from a background thread."""
+
+    def __init__(self, config: MockServerConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockServerConfig()
+        self.secret = random.getrandbits(128).to_bytes(16, "big")
+        self.requests: Dict[str, int] = {"list": 0, "url": 0, "download": 0, "error": 0, "throttled": 0, "unauthorized": 0}
+        self.bytes_sent = 0  # Bytes of file content written to the connections
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def origin(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        """Base URL of the API."""
+        return f"{self.origin}/open-data"
+
+    def start(self) -> MockServer:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-knmi", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self) -> None:
+        """Serve from the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def __enter__(self) -> MockServer:
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+
+    def count_bytes(self, size: int) -> None:
+        with self._lock:
+            self.bytes_sent += size
+
+    def sign(self, filename: str, signed: str, expires: int) -> str:
+        message = f"{filename}|{signed}|{expires}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def list_range(self, begin: Optional[str], end: Optional[str]) -> Tuple[int, int]:
+        """Get the range of file indices with begin <= lastModified < end."""
+        config = self.config
+        first, last = 0, config.files
+        if begin:
+            seconds = (_parse_time(begin) - EPOCH).total_seconds()
+            first = max(first, -int(-seconds // config.interval))  # Round up
+        if end:
+            seconds = (_parse_time(end) - EPOCH).total_seconds()
+            last = min(last, -int(-seconds // config.interval))
+        return first, max(first, last)
+
+def _parse_time(value: str) -> datetime:
+    # An unescaped "+" in the query string arrives as a space
+    moment = datetime.fromisoformat(value.replace(" ", "+").replace("Z", "+00:00"))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def _make_handler(server: MockServer):
+    config = server.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body are sent separately
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+        def send_json(self, status: int, body: object, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def inject_failure(self) -> bool:
+            """Answer with an error or throttle response, as configured."""
+            roll = random.random()
+            if roll < config.throttle_rate:
+                server.count("throttled")
+                self.send_json(429, {"error": "Too Many Requests"}, {"Retry-After": str(config.retry_after)})
+                return True
+            if roll < config.throttle_rate + config.error_rate:
+                server.count("error")
+                self.send_json(500, {"error": "Internal Server Error"})
+                return True
+            return False
+
+        def do_GET(self) -> None:
+            parts = urlsplit(self.path)
+            query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            segments = [unquote(segment) for segment in parts.path.strip("/").split("/")]
+            if config.latency:
+                time.sleep(config.latency)
+            if self.inject_failure():
+                return
+
+            # /open-data/v1/datasets/{name}/versions/{version}/files[/{filename}/url]
+            if segments[:3] == ["open-data", "v1", "datasets"] and len(segments) >= 7 and segments[4] == "versions" and segments[6] == "files":
+                if config.api_key is not None and self.headers.get("Authorization") != config.api_key:
+                    server.count("unauthorized")
+                    return self.send_json(403, {"message": "Forbidden"})
+                if len(segments) == 7:
+                    return self.list_files(query)
+                if len(segments) == 9 and segments[8] == "url":
+                    return self.download_url(segments[7])
+            if len(segments) == 2 and segments[0] == "download":
+                return self.download(segments[1], query)
+            self.send_json(404, {"error": "Not Found"})
+
+        def list_files(self, query: Dict[str, str]) -> None:
+            server.count("list")
+            first, last = server.list_range(query.get("begin"), query.get("end"))
+            page_size = min(int(query.get("maxKeys", config.page_size)), config.page_size)
+            position = int(query.get("nextPageToken", 0))
+            count = max(0, min(page_size, last - first - position))
+
+            if query.get("sorting", "asc").lower() == "desc":
+                indices = range(last - 1 - position, last - 1 - position - count, -1)
+            else:
+                indices = range(first + position, first + position + count)
+            truncated = position + count < last - first
+            body = {
+                "files": [config.summary(index) for index in indices],
+                "isTruncated": truncated,
+                "resultCount": count,
+                "maxResults": page_size,
+                "startAfterFilename": "",
+            }
+            if truncated:
+                body["nextPageToken"] = str(position + count)
+            self.send_json(200, body)
+
+        def download_url(self, filename: str) -> None:
+            server.count("url")
+            index = config.index(filename)
+            if index is None:
+                return self.send_json(404, {"error": "File not found"})
+            signed = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            signature = server.sign(filename, signed, config.url_ttl)
+            url = (
+                f"{server.origin}/download/{quote(filename)}"
+                f"?X-Amz-Date={signed}&X-Amz-Expires={config.url_ttl}&X-Amz-Signature={signature}"
+            )
+            self.send_json(200, {
+                "temporaryDownloadUrl": url,
+                "contentType": "application/x-netcdf",
+                "lastModified": config.modified(index).isoformat(),
+                "size": str(config.file_size),
+            })
+
+        def download(self, filename: str, query: Dict[str, str]) -> None:
+            server.count("download")
+            signed = query.get("X-Amz-Date", "")
+            expires = query.get("X-Amz-Expires", "0")
+            valid = hmac.compare_digest(query.get("X-Amz-Signature", ""), server.sign(filename, signed, int(expires)))
+            try:
+                signed_at = datetime.strptime(signed, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+                expired = datetime.now(timezone.utc) > signed_at + timedelta(seconds=int(expires))
+            except ValueError:
+                expired = True
+            if not valid or expired or config.index(filename) is None:
+                return self.send_json(403, {"error": "Request has expired or signature is invalid"})
+
+            size = config.file_size
+            start, end = 0, size  # `end` is exclusive
+            range_header = self.headers.get("Range")
+            if range_header and range_header.startswith("bytes="):
+                first, _, last = range_header[len("bytes="):].partition("-")
+                start = int(first or 0)
+                if last:
+                    end = min(size, int(last) + 1)
+                if start >= size or start >= end:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Type", "application/x-netcdf")
+            self.send_header("Content-Length", str(end - start))
+            self.end_headers()
+
+            position = start
+            chunk_size = len(BLOCK)
+            try:
+                while position < end:
+                    offset = position % len(BLOCK)
+                    chunk = BLOCK[offset:offset + min(chunk_size, end - position)]
+                    self.wfile.write(chunk)
+                    position += len(chunk)
+                    if config.bandwidth:
+                        time.sleep(len(chunk) / config.bandwidth)
+            finally:
+                server.count_bytes(position - start)
+
+    return Handler
+
+def add_config_arguments(parser: argparse.ArgumentParser, exclude: Iterable[str] = ()) -> None:
+    """Add an option for every field of `MockServerConfig`, except the fields in `exclude`."""
+    for field in fields(MockServerConfig):
+        if field.name in exclude:
+            continue
+        default = getattr(MockServerConfig, field.name)
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=str if "str" in str(field.type) else int if isinstance(default, int) else float,
+            default=default,
+            help=f"(default: {default})",
+        )
+
+def config_from_arguments(args: argparse.Namespace) -> MockServerConfig:
+    """Build a configuration from the options added by `add_config_arguments`; excluded fields keep their default."""
+    return MockServerConfig(**{
+        field.name: getattr(args, field.name) for field in fields(MockServerConfig) if hasattr(args, field.name)
+    })
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_arguments(args), args.host, args.port)
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
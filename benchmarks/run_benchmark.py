@@ -0,0 +1,150 @@
+"""Benchmark the downloader against the local mock KNMI API.
+
+For every dataset size the mock server is started in its own process and the
+download runs in a fresh process, so the reported peak RSS belongs to the
+downloader alone. Reports files/sec, MB/sec, peak RSS and the time until the
+listing completed. Run from the repository root:
+
+    python -m benchmarks.run_benchmark --sizes 1000 10000 100000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict
+
+from benchmarks.mock_server import EPOCH, MockServerConfig, add_config_arguments, config_from_arguments
+
+def peak_rss() -> int | None:
+    """Peak resident set size of this process in bytes, if it can be determined."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def measure(url: str, config: MockServerConfig, options: Dict[str, Any], listing_only: bool) -> Dict[str, Any]:
+    """Run one download (or listing) against the mock server and measure it."""
+    from src.knmi_dataset_downloader import DownloadHooks, download
+    from src.knmi_dataset_downloader.dataset import DownloadContext, DownloadStats, get_files_list, initialize_client
+    from src.knmi_dataset_downloader.fast_listing import FastListingClient
+    from src.knmi_dataset_downloader.transport import SharedTransport
+
+    start_date = EPOCH.replace(tzinfo=None)
+    end_date = config.end().replace(tzinfo=None)
+
+    class ListingTimer(DownloadHooks):
+        listed = 0.0
+
+        def on_list_page(self, files: int, started: float, finished: float) -> None:
+            self.listed = finished
+
+    async def run() -> Dict[str, Any]:
+        timer = ListingTimer()
+        with tempfile.TemporaryDirectory() as output_dir:
+            started = time.time()
+            cpu = time.process_time()
+            if listing_only:
+                fast_listing = options.pop("fast_listing", False)
+                # Clients share one connection pool, as in a download
+                transport = SharedTransport()
+                try:
+                    context = DownloadContext(
+                        client=initialize_client("mock", http_client=transport.client(), base_url=url),
+                        http_client=transport.client(),
+                        dataset_name="benchmark",
+                        version="1",
+                        output_dir=output_dir,
+                        stats=DownloadStats(),
+                        hooks=[timer],
+                    )
+                    if fast_listing:
+                        context.listing_client = FastListingClient(transport.client(), "mock", url)
+                    files = await get_files_list(context, start_date, end_date, **options)
+                finally:
+                    await transport.aclose()
+                stats = DownloadStats(total_files=len(files))
+            else:
+                stats = await download(
+                    api_key="mock",
+                    base_url=url,
+                    dataset_name="benchmark",
+                    version="1",
+                    output_dir=output_dir,
+                    start_date=start_date,
+                    end_date=end_date,
+                    progress="none",
+                    hooks=[timer],
+                    **options,
+                )
+            elapsed = time.time() - started
+            cpu = time.process_time() - cpu
+        return {
+            "files": stats.total_files,
+            "downloaded": stats.downloaded_files,
+            "failed": len(stats.failed_files),
+            "seconds": elapsed,
+            "cpu_seconds": cpu,
+            "listing_seconds": timer.listed - started if timer.listed else 0.0,
+            "bytes": stats.total_bytes_downloaded,
+            "peak_rss": peak_rss(),
+        }
+
+    return asyncio.run(run())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Numbers of files in the generated dataset (default: 1000 10000 100000)")
+    parser.add_argument("--concurrent", type=int, default=10, help="Maximum number of concurrent downloads")
+    parser.add_argument("--listing-only", action="store_true", help="Only list the files, do not download them")
+    parser.add_argument("--fast-listing", action="store_true", help="Decode listing pages directly from JSON")
+    add_config_arguments(parser, exclude=("files",))  # Set per run from --sizes
+    parser.set_defaults(file_size=8 * 1024)
+    args = parser.parse_args()
+
+    server_arguments = [
+        f"--{name.replace('_', '-')}={value}" for name, value in vars(args).items()
+        if name in MockServerConfig.__dataclass_fields__ and value is not None
+    ]
+    options: Dict[str, Any] = {} if args.listing_only else {"max_concurrent": args.concurrent}
+    if args.fast_listing:
+        options["fast_listing"] = True
+
+    print(f"{'files':>8} {'seconds':>9} {'CPU s':>8} {'listing s':>9} {'files/s':>9} {'MB/s':>8} {'peak RSS MB':>11} {'failed':>6}")
+    for size in args.sizes:
+        config = config_from_arguments(args)
+        config.files = size
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.mock_server", f"--files={size}", *server_arguments],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            url = server.stdout.readline().strip()
+            if not url:
+                raise RuntimeError("The mock server did not start")
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(measure, url, config, options, args.listing_only).result()
+        finally:
+            server.terminate()
+            server.wait()
+            server.stdout.close()
+
+        rss = f"{result['peak_rss'] / 1024 / 1024:11.1f}" if result["peak_rss"] else f"{'n/a':>11}"
+        print(
+            f"{result['files']:>8} {result['seconds']:9.2f} {result['cpu_seconds']:8.2f} {result['listing_seconds']:9.2f} "
+            f"{result['files'] / result['seconds']:9.1f} {result['bytes'] / result['seconds'] / 1024 / 1024:8.2f} "
+            f"{rss} {result['failed']:>6}",
+            flush=True,
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark the startup time of the CLI with `python -X importtime`.
+
+Every measurement runs in a fresh interpreter. Reports the import time of
+the CLI module and of the package, the heaviest imports and the wall time
+of `--help`, and fails when an import exceeds its limit or when the CLI
+loads modules that only a download needs. Run from the repository root:
+
+    python -m benchmarks.startup --repeat 5 --max-ms 150
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+PACKAGE = "src.knmi_dataset_downloader"
+
+# Modules that must not be imported before a download starts
+HEAVY_MODULES = ("httpx", "aiofiles", "tqdm", "kiota_abstractions", "kiota_http", "kiota_serialization_json")
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """Import a module in a fresh interpreter.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: Self and cumulative import time in microseconds of every module imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def help_seconds() -> float:
+    """Wall time of `knmi-download --help` in a fresh interpreter."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-m", f"{PACKAGE}.cli", "--help"], capture_output=True, check=True)
+    return time.perf_counter() - started
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs, the fastest is reported (default: 5)")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest imports shown (default: 10)")
+    parser.add_argument("--max-ms", type=float, help="Fail if importing the CLI takes longer than this (optional)")
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    print(f"{'module':<40} {'import ms':>10}")
+    for module in (f"{PACKAGE}.cli", PACKAGE, f"{PACKAGE}.dataset"):
+        runs = [import_times(module) for _ in range(args.repeat)]
+        fastest = min(runs, key=lambda times: times[module][1])
+        print(f"{module:<40} {fastest[module][1] / 1000:10.1f}")
+        if module == f"{PACKAGE}.cli":
+            cli_times = fastest
+            heavy = sorted(name for name in fastest if name in HEAVY_MODULES)
+            if heavy:
+                failures.append(f"the CLI imports {', '.join(heavy)} at startup")
+            if args.max_ms is not None and fastest[module][1] / 1000 > args.max_ms:
+                failures.append(f"importing the CLI takes {fastest[module][1] / 1000:.1f} ms, more than {args.max_ms} ms")
+
+    print(f"{'--help wall time':<40} {min(help_seconds() for _ in range(args.repeat)) * 1000:10.1f}")
+    print(f"\nHeaviest imports of {PACKAGE}.cli (self ms):")
+    for name, (self_us, _) in sorted(cli_times.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"  {name:<38} {self_us / 1000:10.1f}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
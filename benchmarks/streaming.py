@@ -0,0 +1,107 @@
+"""Benchmark the CPU cost of streaming a download to disk.
+
+Streams a generated response through `stream_to_file` with the legacy
+settings (8 KiB chunks, one write and one progress update per chunk), with
+the current defaults, and with the dedicated writer thread, and reports the
+throughput per CPU second. Run from the
+repository root:
+
+    python -m benchmarks.streaming --size-mb 512
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncIterator, Dict
+
+import httpx
+from tqdm import tqdm
+
+from src.knmi_dataset_downloader.dataset import DownloadContext, DownloadStats, stream_to_file
+from src.knmi_dataset_downloader.defaults import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_PROGRESS_INTERVAL,
+    DEFAULT_WRITE_BUFFER_SIZE,
+)
+
+# Size of the chunks the fake server sends, similar to what a socket read returns
+NETWORK_CHUNK_SIZE = 16 * 1024
+
+SETTINGS: Dict[str, Dict[str, object]] = {
+    "before": {"chunk_size": 8192, "write_buffer_size": 0, "progress_interval": 0.0},
+    "after": {
+        "chunk_size": DEFAULT_CHUNK_SIZE,
+        "write_buffer_size": DEFAULT_WRITE_BUFFER_SIZE,
+        "progress_interval": DEFAULT_PROGRESS_INTERVAL,
+    },
+    "thread": {
+        "chunk_size": DEFAULT_CHUNK_SIZE,
+        "write_buffer_size": DEFAULT_WRITE_BUFFER_SIZE,
+        "progress_interval": DEFAULT_PROGRESS_INTERVAL,
+        "writer": "thread",
+    },
+}
+
+def make_handler(size: int):
+    block = os.urandom(NETWORK_CHUNK_SIZE)
+
+    async def body() -> AsyncIterator[bytes]:
+        sent = 0
+        while sent < size:
+            chunk = block[: min(NETWORK_CHUNK_SIZE, size - sent)]
+            sent += len(chunk)
+            yield chunk
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body())
+
+    return handler
+
+async def run(name: str, size: int, directory: Path) -> None:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(make_handler(size)))
+    context = DownloadContext(
+        client=None,
+        http_client=http_client,
+        dataset_name="benchmark",
+        version="1",
+        output_dir=directory,
+        stats=DownloadStats(),
+        **SETTINGS[name],
+    )
+
+    with open(os.devnull, "w") as devnull, tqdm(total=size, file=devnull, unit="iB") as progress:
+        position = 0
+
+        def on_progress(new_position: int) -> None:
+            nonlocal position
+            progress.update(new_position - position)
+            position = new_position
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        written = await stream_to_file(context, "https://benchmark.test/file", directory / name, 0, on_progress)
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+    await http_client.aclose()
+    assert written == size
+    print(
+        f"{name:>6}: {size / wall / 1024 / 1024:8.1f} MB/s wall, "
+        f"{size / cpu / 1024 / 1024:8.1f} MB per CPU second ({cpu:.2f}s CPU)"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the streamed file in MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in SETTINGS:
+            asyncio.run(run(name, args.size_mb * 1024 * 1024, Path(directory)))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,53 @@
-from .dataset import download, DownloadStats
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
 from .defaults import DEFAULT_DATASET_NAME, DEFAULT_DATASET_VERSION, DEFAULT_MAX_CONCURRENT, DEFAULT_OUTPUT_DIR
 
+if TYPE_CHECKING:
+    from .dataset import download, list_files, DownloadStats
+    from .file_listing import FileListing
+    from .hooks import DownloadHooks
+    from .progress import ProgressReporter
+    from .retry import RetryPolicy
+    from .transport import TransportConfig
+
+# Exported names and the modules defining them. They are imported on first use, so that importing the
+# package (for example by the CLI) does not load httpx and the kiota client until a download needs them.
+_LAZY_EXPORTS = {
+    'download': '.dataset',
+    'list_files': '.dataset',
+    'DownloadStats': '.dataset',
+    'FileListing': '.file_listing',
+    'DownloadHooks': '.hooks',
+    'ProgressReporter': '.progress',
+    'RetryPolicy': '.retry',
+    'TransportConfig': '.transport',
+}
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
+
 __all__ = [
     'download',
+    'list_files',
     'DownloadStats',
+    'DownloadHooks',
+    'FileListing',
+    'ProgressReporter',
+    'RetryPolicy',
+    'TransportConfig',
     'DEFAULT_DATASET_NAME',
     'DEFAULT_DATASET_VERSION',
     'DEFAULT_MAX_CONCURRENT',
     'DEFAULT_OUTPUT_DIR'
-]
\ No newline at end of file
+]
@@ -1,27 +1,252 @@
-import httpx
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+import json
+import os
 import re
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
+
+import httpx
+from kiota_abstractions.authentication.api_key_authentication_provider import ApiKeyAuthenticationProvider
+
+from .defaults import (
+    DEFAULT_API_KEY_CACHE_NAME,
+    DEFAULT_API_KEY_EXPIRY_MARGIN,
+    DEFAULT_API_KEY_TTL,
+    get_default_cache_dir,
+)
+
+if TYPE_CHECKING:
+    from .fast_listing import FastListingClient
 
-async def get_anonymous_api_key() -> str:
+import logging
+log = logging.getLogger(__name__)
+
+# Minimum time between two refreshes of the anonymous API key, so that requests rejected together refresh it once (seconds)
+REFRESH_INTERVAL = 30.0
+
+class ApiKeyError(Exception):
+    """The anonymous API key could not be obtained."""
+
+async def get_anonymous_api_key(client: httpx.AsyncClient | None = None) -> str:
     """Fetch the anonymous API key from the KNMI developer portal.
-    
+
+    Args:
+        client (httpx.AsyncClient | None): HTTP client to send the request with. If None, a temporary client is used.
+
     Returns:
         str: The anonymous API key
-    
+
     Raises:
         ValueError: If the API key cannot be found on the page
         httpx.HTTPError: If there is an error fetching the page
         httpx.TimeoutException: If the request times out after 5 seconds
     """
     url = "https://developer.dataplatform.knmi.nl/open-data-api"
-    
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        response = await client.get(url)
-        response.raise_for_status()
-        
-        pattern = r'eyJ[a-zA-Z0-9_-]+'
-        match = re.search(pattern, response.text)
-        
-        if not match:
-            raise ValueError("Could not find API key on the page")
-            
-        return match.group(0) 
\ No newline at end of file
+
+    if client is None:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            return await get_anonymous_api_key(client)
+
+    response = await client.get(url, timeout=5.0)
+    response.raise_for_status()
+
+    pattern = r'eyJ[a-zA-Z0-9_-]+'
+    match = re.search(pattern, response.text)
+
+    if not match:
+        raise ValueError("Could not find API key on the page")
+
+    return match.group(0)
+
+def api_key_expiry(api_key: str) -> Optional[datetime]:
+    """Get the expiry stated in an API key, if it has one.
+
+    The anonymous key is base64 encoded JSON. Both a bare encoded payload and
+    a JWT (header, payload and signature separated by dots) are checked for
+    an `exp` claim in seconds since the epoch.
+
+    Args:
+        api_key (str): The API key
+
+    Returns:
+        datetime | None: The expiry in UTC, or None if the key does not state one
+    """
+    for part in api_key.split(".")[:2]:
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)))
+        except (binascii.Error, ValueError):
+            continue
+        if isinstance(claims, dict) and isinstance(claims.get("exp"), (int, float)):
+            try:
+                return datetime.fromtimestamp(claims["exp"], timezone.utc)
+            except (OverflowError, OSError, ValueError):
+                return None
+    return None
+
+class ApiKeyCache:
+    """On-disk cache of the anonymous API key, shared between runs.
+
+    A cached key is used until the expiry it states, or for `ttl` after it
+    was fetched if it does not state one, minus `margin`. The file is written
+    atomically, so concurrent runs can share it.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: timedelta = DEFAULT_API_KEY_TTL,
+        margin: timedelta = DEFAULT_API_KEY_EXPIRY_MARGIN,
+    ) -> None:
+        """Create an API key cache.
+
+        Args:
+            path (str | Path): File holding the cached key
+            ttl (timedelta): Lifetime of a key that does not state its expiry
+            margin (timedelta): Time before its expiry at which a key is no longer used
+        """
+        self.path = Path(path)
+        self.ttl = ttl
+        self.margin = margin
+
+    def get(self) -> Optional[str]:
+        """Get the cached key, or None if it is missing or about to expire."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            api_key = record["api_key"]
+            expires = datetime.fromisoformat(record["expires"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            log.debug(f"Ignoring unreadable API key cache {self.path}: {e!s}")
+            return None
+        if not isinstance(api_key, str) or not api_key:
+            return None
+        if datetime.now(timezone.utc) >= expires - self.margin:
+            return None
+        return api_key
+
+    def put(self, api_key: str) -> None:
+        """Store a freshly fetched key. Failing to write the cache is logged, not raised."""
+        expires = api_key_expiry(api_key) or datetime.now(timezone.utc) + self.ttl
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"api_key": api_key, "expires": expires.isoformat()}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.debug(f"Could not write API key cache {self.path}: {e!s}")
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.debug(f"Could not remove API key cache {self.path}: {e!s}")
+
+def make_api_key_cache(cache: ApiKeyCache | str | Path | bool | None = True) -> Optional[ApiKeyCache]:
+    """Get the cache of the anonymous API key from a file, settings, or the default location.
+
+    Args:
+        cache (ApiKeyCache | str | Path | bool | None): A cache, the file to cache the key in, True for
+            `anonymous-api-key.json` in the default cache directory, or False or None for no cache
+
+    Returns:
+        ApiKeyCache | None: The cache, or None if the key is not cached. Without a home directory to
+            hold the default cache, the key is not cached either.
+    """
+    if isinstance(cache, ApiKeyCache):
+        return cache
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        cache_dir = get_default_cache_dir()
+        if cache_dir is None:
+            log.debug("No home directory to cache the anonymous API key in, fetching it every run")
+            return None
+        return ApiKeyCache(cache_dir / DEFAULT_API_KEY_CACHE_NAME)
+    return ApiKeyCache(cache)
+
+class AnonymousApiKey:
+    """The anonymous API key of a run, taken from the cache and refreshed when the API rejects it.
+
+    Authentication providers bound to the key send the refreshed key with
+    every request after a refresh.
+    """
+
+    def __init__(self, client: httpx.AsyncClient | None = None, cache: ApiKeyCache | None = None) -> None:
+        """Create an anonymous API key.
+
+        Args:
+            client (httpx.AsyncClient | None): HTTP client to fetch the key with. If None, a temporary client is used.
+            cache (ApiKeyCache | None): Cache of the key shared between runs. If None, the key is fetched every run.
+        """
+        self.client = client
+        self.cache = cache
+        self.key: Optional[str] = None
+        self._providers: List[ApiKeyAuthenticationProvider | FastListingClient] = []
+        self._lock = asyncio.Lock()
+        self._refreshed: Optional[float] = None
+        self._changed = False
+
+    async def _fetch(self) -> str:
+        try:
+            api_key = await get_anonymous_api_key(self.client)
+        except (httpx.HTTPError, ValueError) as e:
+            raise ApiKeyError(str(e) or type(e).__name__) from e
+        if self.cache is not None:
+            self.cache.put(api_key)
+        return api_key
+
+    async def get(self) -> str:
+        """Get the key, from the cache if it holds a valid one.
+
+        Raises:
+            ApiKeyError: If the key is not cached and cannot be fetched
+        """
+        if self.key is None:
+            self.key = self.cache.get() if self.cache is not None else None
+            if self.key is None:
+                self.key = await self._fetch()
+            else:
+                log.debug(f"Using the cached anonymous API key from {self.cache.path}")
+        return self.key
+
+    def bind(self, provider: ApiKeyAuthenticationProvider | FastListingClient) -> None:
+        """Keep the key sent by an authentication provider or listing client up to date."""
+        self._providers.append(provider)
+
+    async def refresh(self) -> bool:
+        """Fetch the key again after the API rejected it.
+
+        Requests rejected at about the same time share a single refresh.
+
+        Returns:
+            bool: Whether the key changed, so that the rejected request is worth retrying
+        """
+        async with self._lock:
+            if self._refreshed is not None and time.monotonic() - self._refreshed < REFRESH_INTERVAL:
+                return self._changed
+            if self.cache is not None:
+                self.cache.clear()
+            try:
+                api_key = await self._fetch()
+            except ApiKeyError as e:
+                log.warning(f"Could not refresh the anonymous API key: {e!s}")
+                api_key = self.key
+            self._refreshed = time.monotonic()
+            self._changed = api_key != self.key
+            if self._changed:
+                log.info("The API rejected the anonymous API key, continuing with a fresh one")
+                self.key = api_key
+                for provider in self._providers:
+                    provider.api_key = api_key
+            return self._changed
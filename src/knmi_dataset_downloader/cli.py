@@ -2,18 +2,40 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-from datetime import datetime
+import signal
+from datetime import datetime, timedelta
 from pathlib import Path
-from . import dataset
+
+# Only light modules are imported here, so `--help` and argument errors do not load httpx, kiota and tqdm
 from .defaults import (
+    DEFAULT_API_BASE_URL,
     DEFAULT_OUTPUT_DIR,
+    DEFAULT_CHUNK_SIZE,
     DEFAULT_DATASET_NAME,
     DEFAULT_DATASET_VERSION,
+    DEFAULT_MAX_ADAPTIVE_CONCURRENT,
     DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_CONCURRENT_LISTING,
+    DEFAULT_MAX_CONCURRENT_URLS,
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_LISTING_CACHE_TTL,
+    DEFAULT_METRICS_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_PROGRESS,
+    DEFAULT_PROGRESS_REPORT_INTERVAL,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_RETRY_BUDGET,
+    DEFAULT_SEGMENT_THRESHOLD,
+    DEFAULT_SEGMENTS,
     DEFAULT_TIME_WINDOW,
+    DEFAULT_URL_PREFETCH,
+    DEFAULT_WRITE_BUFFER_SIZE,
+    DEFAULT_WRITER,
     get_default_date_range,
 )
-from .api_key import get_anonymous_api_key
+from .progress import PROGRESS_REPORTERS
+from .writers import WRITERS
 
 def parse_date(date_str: str) -> datetime | None:
     """Parse date string in ISO 8601 format (e.g., 2024-01-01T00:00:00 or 2024-01-01)."""
@@ -26,6 +48,24 @@ def parse_date(date_str: str) -> datetime | None:
             "Date must be in ISO 8601 format (e.g., 2024-01-01T00:00:00 or 2024-01-01)"
         )
 
+def install_stop_handlers(stop: asyncio.Event) -> None:
+    """Set `stop` on the first SIGINT or SIGTERM and cancel the run on the second."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+
+    def handle() -> None:
+        if stop.is_set():
+            task.cancel()
+            return
+        print("Stopping after the queued downloads, interrupt again to stop immediately...")
+        stop.set()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, handle)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not supported on this platform, interrupting cancels the run instead
+
 async def async_main() -> None:
     """Download KNMI dataset files."""
     parser = argparse.ArgumentParser(
@@ -52,6 +92,17 @@ async def async_main() -> None:
         default=DEFAULT_MAX_CONCURRENT,
         help=f'Maximum number of concurrent downloads (default: {DEFAULT_MAX_CONCURRENT})'
     )
+    parser.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='Adapt the number of concurrent downloads to the observed throughput, starting at --concurrent'
+    )
+    parser.add_argument(
+        '--adaptive-max',
+        type=int,
+        default=DEFAULT_MAX_ADAPTIVE_CONCURRENT,
+        help=f'Upper bound of the adaptive number of concurrent downloads (default: {DEFAULT_MAX_ADAPTIVE_CONCURRENT})'
+    )
     parser.add_argument(
         '-s', '--start-date',
         default=default_start.isoformat(),
@@ -68,6 +119,11 @@ async def async_main() -> None:
         '--api-key',
         help='KNMI API key (optional - will fetch anonymous API key if not provided)'
     )
+    parser.add_argument(
+        '--no-api-key-cache',
+        action='store_true',
+        help='Fetch the anonymous API key on every run instead of caching it in ~/.cache/knmi-dataset-downloader/anonymous-api-key.json'
+    )
     parser.add_argument(
         '-o', '--output-dir',
         type=Path,
@@ -79,35 +135,263 @@ async def async_main() -> None:
         type=int,
         help='Maximum number of files to download (optional)'
     )
+    parser.add_argument(
+        '--shard-hours',
+        type=float,
+        help='List the date range in concurrent windows of this many hours (optional)'
+    )
+    parser.add_argument(
+        '--listing-concurrent',
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_LISTING,
+        help=f'Maximum number of concurrent listing requests when sharding (default: {DEFAULT_MAX_CONCURRENT_LISTING})'
+    )
+    parser.add_argument(
+        '--fast-listing',
+        action='store_true',
+        help='Decode listing pages directly from JSON instead of through the generated API client, for long listings'
+    )
+    parser.add_argument(
+        '--url-concurrent',
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_URLS,
+        help=f'Maximum number of concurrent download URL requests (default: {DEFAULT_MAX_CONCURRENT_URLS})'
+    )
+    parser.add_argument(
+        '--url-prefetch',
+        type=int,
+        default=DEFAULT_URL_PREFETCH,
+        help=f'Number of download URLs resolved ahead of the downloads (default: {DEFAULT_URL_PREFETCH})'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f'Size of the chunks read from a download stream in bytes (default: {DEFAULT_CHUNK_SIZE})'
+    )
+    parser.add_argument(
+        '--write-buffer',
+        type=int,
+        default=DEFAULT_WRITE_BUFFER_SIZE,
+        help=f'Number of downloaded bytes collected before writing them to disk (default: {DEFAULT_WRITE_BUFFER_SIZE})'
+    )
+    parser.add_argument(
+        '--writer',
+        choices=WRITERS,
+        default=DEFAULT_WRITER,
+        help=f'How downloads are written to disk: through a shared thread pool (aiofiles) or a dedicated thread per file (default: {DEFAULT_WRITER})'
+    )
+    parser.add_argument(
+        '--segments',
+        type=int,
+        default=DEFAULT_SEGMENTS,
+        help=f'Number of concurrent range requests a large file is downloaded with; 1 disables segmented downloads (default: {DEFAULT_SEGMENTS})'
+    )
+    parser.add_argument(
+        '--segment-threshold',
+        type=int,
+        default=DEFAULT_SEGMENT_THRESHOLD,
+        help=f'Size in bytes from which a file is downloaded in segments (default: {DEFAULT_SEGMENT_THRESHOLD})'
+    )
+    parser.add_argument(
+        '--progress',
+        choices=PROGRESS_REPORTERS,
+        default=DEFAULT_PROGRESS,
+        help=f'How progress is shown: progress bars (tqdm), a periodic status line (log), JSON lines (json) or not at all (none) (default: {DEFAULT_PROGRESS})'
+    )
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=DEFAULT_PROGRESS_REPORT_INTERVAL,
+        help=f'Seconds between two status lines of the log and json progress reporters (default: {DEFAULT_PROGRESS_REPORT_INTERVAL})'
+    )
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        help='Serve Prometheus metrics on this local port while downloading (optional)'
+    )
+    parser.add_argument(
+        '--metrics-textfile',
+        type=Path,
+        help='Write Prometheus metrics to this file for the node exporter textfile collector (optional)'
+    )
+    parser.add_argument(
+        '--metrics-interval',
+        type=float,
+        default=DEFAULT_METRICS_INTERVAL,
+        help=f'Seconds between two writes of the metrics textfile (default: {DEFAULT_METRICS_INTERVAL})'
+    )
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='Record the download phases as OpenTelemetry spans (requires opentelemetry-api and a configured exporter)'
+    )
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help='Keep running after the date range and download new files as they are published'
+    )
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f'Seconds between two polls of the listing with --follow (default: {DEFAULT_POLL_INTERVAL})'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Only list files modified since the last incremental run, using the sync state kept in the output directory'
+    )
+    parser.add_argument(
+        '--listing-cache',
+        type=Path,
+        nargs='?',
+        const=True,
+        help='Cache the file listing on disk, in this directory or in ~/.cache/knmi-dataset-downloader/listings (optional)'
+    )
+    parser.add_argument(
+        '--listing-cache-ttl',
+        type=float,
+        default=DEFAULT_LISTING_CACHE_TTL,
+        help=f'Seconds a cached listing of the most recent, still open time bucket is used (default: {DEFAULT_LISTING_CACHE_TTL})'
+    )
+    parser.add_argument(
+        '--base-url',
+        default=DEFAULT_API_BASE_URL,
+        help=f'Base URL of the Open Data API (default: {DEFAULT_API_BASE_URL})'
+    )
+    parser.add_argument(
+        '--no-manifest',
+        action='store_true',
+        help='Do not keep a manifest of downloaded files; check every file on disk instead'
+    )
+    parser.add_argument(
+        '--max-attempts',
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        help=f'Maximum number of attempts per request, including the first (default: {DEFAULT_MAX_ATTEMPTS})'
+    )
+    parser.add_argument(
+        '--retry-budget',
+        type=int,
+        default=DEFAULT_RETRY_BUDGET,
+        help=f'Maximum number of retries over the whole run (default: {DEFAULT_RETRY_BUDGET})'
+    )
+    parser.add_argument(
+        '--rate-limit',
+        type=float,
+        help='Maximum number of API requests per second (optional)'
+    )
+    parser.add_argument(
+        '--burst',
+        type=int,
+        help='Maximum number of API requests sent at once when rate limiting (default: the rate limit)'
+    )
+    parser.add_argument(
+        '--max-connections',
+        type=int,
+        help='Size of the HTTP connection pool (default: twice the number of concurrent downloads)'
+    )
+    parser.add_argument(
+        '--http2',
+        action='store_true',
+        help='Use HTTP/2 where the server supports it (requires knmi-dataset-downloader[http2])'
+    )
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help=f'Timeout for establishing a connection in seconds (default: {DEFAULT_CONNECT_TIMEOUT})'
+    )
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=DEFAULT_READ_TIMEOUT,
+        help=f'Timeout for reading from a connection in seconds (default: {DEFAULT_READ_TIMEOUT})'
+    )
 
     args = parser.parse_args()
 
+    from . import dataset
+    from .api_key import ApiKeyError
+    from .listing_cache import ListingCache
+    from .retry import RetryPolicy
+    from .transport import TransportConfig
+
+    listing_cache = None
+    if args.listing_cache:
+        try:
+            listing_cache = ListingCache(
+                None if args.listing_cache is True else args.listing_cache, ttl=args.listing_cache_ttl
+            )
+        except ValueError as e:
+            parser.error(str(e))
+
     # Parse dates
     start = parse_date(args.start_date)
     end = parse_date(args.end_date)
     
-    # Get API key - either from args or fetch anonymous key
-    api_key = args.api_key
-    if not api_key:
-        print("No API key provided, fetching anonymous API key from KNMI developer portal...")
-        try:
-            api_key = await get_anonymous_api_key()
-        except Exception as e:
-            print(f"Error fetching anonymous API key: {e}")
-            print("Please provide an API key using the --api-key argument")
-            return
+    # Use the API key from args, or the anonymous key (cached between runs unless disabled)
+    if not args.api_key:
+        print("No API key provided, using the anonymous API key from the KNMI developer portal...")
+
+    stop = asyncio.Event()
+    if args.follow:
+        install_stop_handlers(stop)
     
     # Download files
-    await dataset.download(
-        api_key=api_key,
-        dataset_name=args.dataset,
-        version=args.version,
-        max_concurrent=args.concurrent,
-        output_dir=args.output_dir,
-        start_date=start,
-        end_date=end,
-        limit=args.limit
-    )
+    try:
+        await dataset.download(
+            api_key=args.api_key,
+            api_key_cache=not args.no_api_key_cache,
+            dataset_name=args.dataset,
+            version=args.version,
+            max_concurrent=args.concurrent,
+            output_dir=args.output_dir,
+            start_date=start,
+            end_date=end,
+            limit=args.limit,
+            shard_window=timedelta(hours=args.shard_hours) if args.shard_hours else None,
+            max_concurrent_listing=args.listing_concurrent,
+            use_manifest=not args.no_manifest,
+            retry_policy=RetryPolicy(max_attempts=args.max_attempts, retry_budget=args.retry_budget),
+            requests_per_second=args.rate_limit,
+            burst=args.burst,
+            adaptive_concurrency=args.adaptive,
+            max_adaptive_concurrent=args.adaptive_max,
+            transport_config=TransportConfig(
+                max_connections=args.max_connections,
+                http2=args.http2,
+                connect_timeout=args.connect_timeout,
+                read_timeout=args.read_timeout,
+            ),
+            max_concurrent_urls=args.url_concurrent,
+            url_prefetch=args.url_prefetch,
+            chunk_size=args.chunk_size,
+            write_buffer_size=args.write_buffer,
+            writer=args.writer,
+            segments=args.segments,
+            segment_threshold=args.segment_threshold,
+            progress=args.progress,
+            progress_report_interval=args.progress_interval,
+            metrics_port=args.metrics_port,
+            metrics_textfile=args.metrics_textfile,
+            metrics_interval=args.metrics_interval,
+            trace=args.trace,
+            base_url=args.base_url,
+            follow=args.follow,
+            poll_interval=args.poll_interval,
+            stop=stop,
+            incremental=args.incremental,
+            listing_cache=listing_cache,
+            fast_listing=args.fast_listing,
+        )
+    except ApiKeyError as e:
+        print(f"Error fetching anonymous API key: {e}")
+        print("Please provide an API key using the --api-key argument")
+    except ImportError as e:
+        # An optional dependency of --http2 or --trace is missing
+        parser.exit(1, f"Error: {e}\n")
 
 def main() -> None:
     """Synchronous wrapper for async_main."""
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import asyncio
+from types import TracebackType
+from typing import List, Optional, Type
+
+import logging
+log = logging.getLogger(__name__)
+
+class AdaptiveLimiter:
+    """Concurrency limit that adapts to the observed throughput (AIMD).
+
+    Used in place of an `asyncio.Semaphore`. Completed downloads are evaluated
+    in windows of `limit` downloads. The limit grows by one after a window in
+    which the throughput per stream held up and few downloads failed, and is
+    halved when the API throttles, the error rate rises, or the throughput per
+    stream collapses (a latency spike). Only one decrease happens per window,
+    so a burst of 429 responses does not drop the limit to the minimum at once.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 1,
+        maximum: int = 64,
+        error_threshold: float = 0.1,
+        slowdown_threshold: float = 0.5,
+        growth_tolerance: float = 0.9,
+    ) -> None:
+        """Create an adaptive limiter.
+
+        Args:
+            initial (int): Initial concurrency limit
+            minimum (int): Lowest allowed limit
+            maximum (int): Highest allowed limit
+            error_threshold (float): Fraction of failed downloads in a window that triggers a decrease
+            slowdown_threshold (float): Decrease when the throughput per stream drops below this fraction of the baseline
+            growth_tolerance (float): Increase only while the throughput per stream stays above this fraction of the baseline
+        """
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Limits must satisfy 1 <= minimum <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = min(max(initial, minimum), maximum)
+        self.error_threshold = error_threshold
+        self.slowdown_threshold = slowdown_threshold
+        self.growth_tolerance = growth_tolerance
+
+        self.active = 0
+        self._condition = asyncio.Condition()
+        self._baseline: Optional[float] = None  # Throughput per stream in bytes per second
+        self._window_rates: List[float] = []
+        self._window_errors = 0
+        self._decreased = False  # Whether the limit was already decreased in this window
+
+    async def acquire(self) -> None:
+        """Wait until a download slot is available under the current limit."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def release(self) -> None:
+        """Give back a download slot."""
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.release()
+
+    def record_success(self, size: int, seconds: float) -> None:
+        """Record a completed download of `size` bytes that took `seconds`."""
+        if seconds > 0 and size > 0:
+            self._window_rates.append(size / seconds)
+        else:
+            self._window_rates.append(0.0)
+        self._evaluate()
+
+    def record_error(self) -> None:
+        """Record a failed download."""
+        self._window_errors += 1
+        self._evaluate()
+
+    def record_throttle(self) -> None:
+        """Record a throttled request (429 or 503)."""
+        self._decrease("throttled by the API")
+
+    def _evaluate(self) -> None:
+        completed = len(self._window_rates) + self._window_errors
+        if completed < self.limit:
+            return
+
+        rates = [rate for rate in self._window_rates if rate > 0]
+        error_rate = self._window_errors / completed
+        rate = sum(rates) / len(rates) if rates else None
+        self._window_rates = []
+        self._window_errors = 0
+        self._decreased = False
+
+        if error_rate > self.error_threshold:
+            self._decrease(f"{error_rate:.0%} of downloads failed")
+            return
+        if rate is None:
+            return
+        if self._baseline is None:
+            self._baseline = rate
+        elif rate < self._baseline * self.slowdown_threshold:
+            self._decrease("throughput per stream dropped")
+            self._baseline = rate
+            return
+
+        if rate >= self._baseline * self.growth_tolerance:
+            self._set_limit(self.limit + 1, "throughput per stream holds")
+        # Follow slow changes of the link speed
+        self._baseline = 0.8 * self._baseline + 0.2 * rate
+
+    def _decrease(self, reason: str) -> None:
+        if self._decreased:
+            return
+        self._decreased = True
+        self._window_rates = []
+        self._window_errors = 0
+        self._set_limit(self.limit // 2, reason)
+
+    def _set_limit(self, limit: int, reason: str) -> None:
+        # Waiters are woken by the next release, so no notification is needed here
+        limit = min(max(limit, self.minimum), self.maximum)
+        if limit != self.limit:
+            log.debug(f"Concurrency limit {self.limit} -> {limit}: {reason}")
+            self.limit = limit
@@ -1,19 +1,23 @@
 from __future__ import annotations
 
 import asyncio
-from typing import List
+import contextlib
+import os
+import time
+import warnings
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Set, Tuple
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-import aiofiles
 import httpx
-from tqdm.asyncio import tqdm
 from kiota_abstractions.authentication.api_key_authentication_provider import (
     ApiKeyAuthenticationProvider,
     KeyLocation,
 )
 from kiota_http.httpx_request_adapter import HttpxRequestAdapter
+from kiota_http.kiota_client_factory import KiotaClientFactory
+from kiota_http.middleware.options import RetryHandlerOption
 from kiota_serialization_json.json_serialization_writer_factory import (
     JsonSerializationWriterFactory,
 )
@@ -21,9 +25,15 @@ from kiota_serialization_json.json_parse_node_factory import JsonParseNodeFactor
 
 from .knmi_dataset_api.api_client import ApiClient
 from .knmi_dataset_api.models.file_summary import FileSummary
-from .knmi_dataset_api.v1.datasets.item.versions.item.files.files_request_builder import (
-    FilesRequestBuilder,
-)
+
+# The generated request builders define and import deprecated classes, which warn as soon as they are imported
+with warnings.catch_warnings():
+    warnings.filterwarnings("ignore", message="This class is deprecated", category=DeprecationWarning)
+    warnings.filterwarnings("ignore", message="GetQueryParameters is deprecated", category=DeprecationWarning)
+    from .knmi_dataset_api.v1.datasets.item.versions.item.files.files_request_builder import (
+        FilesRequestBuilder,
+    )
+    from .knmi_dataset_api.v1.datasets.item.versions.item.files.item.url import url_request_builder  # noqa: F401
 from .knmi_dataset_api.v1.datasets.item.versions.item.files.get_order_by_query_parameter_type import (
     GetOrderByQueryParameterType,
 )
@@ -31,17 +41,58 @@ from .knmi_dataset_api.v1.datasets.item.versions.item.files.get_sorting_query_pa
     GetSortingQueryParameterType,
 )
 from .defaults import (
+    DEFAULT_API_BASE_URL,
     DEFAULT_OUTPUT_DIR,
+    DEFAULT_CHUNK_SIZE,
     DEFAULT_DATASET_NAME,
     DEFAULT_DATASET_VERSION,
+    DEFAULT_MAX_ADAPTIVE_CONCURRENT,
     DEFAULT_MAX_CONCURRENT,
+    DEFAULT_MAX_CONCURRENT_LISTING,
+    DEFAULT_MAX_CONCURRENT_URLS,
+    DEFAULT_METRICS_HOST,
+    DEFAULT_METRICS_INTERVAL,
+    DEFAULT_PROGRESS,
+    DEFAULT_PROGRESS_INTERVAL,
+    DEFAULT_POLL_INTERVAL,
+    DEFAULT_PROGRESS_REPORT_INTERVAL,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_SEGMENT_THRESHOLD,
+    DEFAULT_SEGMENTS,
+    DEFAULT_SYNC_STATE_INTERVAL,
+    DEFAULT_URL_PREFETCH,
+    DEFAULT_WRITE_BUFFER_SIZE,
+    DEFAULT_WRITER,
     get_default_date_range,
 )
-from .api_key import get_anonymous_api_key
+from .api_key import AnonymousApiKey, ApiKeyCache, make_api_key_cache
+from .concurrency import AdaptiveLimiter
+from .fast_listing import FastListingClient
+from .file_listing import FileListing
+from .manifest import PART_SUFFIX, Manifest, ManifestEntry, PartOrigin, is_up_to_date, stat_files
+from .hooks import DownloadHooks
+from .listing_cache import ListingCache
+from .metrics import DownloadMetrics
+from .tracing import TracingHooks
+from .pool import run_worker_pool
+from .progress import ProgressReporter, make_progress
+from .rate_limit import TokenBucket
+from .retry import Retrier, RetryableError, RetryPolicy
+from .segments import RangeNotSupportedError, SegmentState, discard_segments, plan_segments, preallocate
+from .sync import SyncState, Watermark, as_utc, parse_timestamp
+from .transport import SharedTransport, TransportConfig
+from .urls import ResolvedUrl, url_expiry
+from .writers import open_writer
 
 import logging
 log = logging.getLogger(__name__)
 
+class IncompleteDownloadError(RetryableError):
+    """The download stream ended before the whole file was received."""
+
+class ExpiredUrlError(RetryableError):
+    """The temporary download URL was rejected, most likely because it expired."""
+
 @dataclass
 class DownloadStats:
     """Statistics for the download process."""
@@ -50,6 +101,11 @@ class DownloadStats:
     downloaded_files: int = 0
     failed_files: List[str] = field(default_factory=list)
     total_bytes_downloaded: int = 0
+    stale_files: int = 0
+    retries: int = 0
+    throttled_requests: int = 0
+    concurrency_limit: int = 0
+    expired_urls: int = 0
 
 @dataclass
 class DownloadContext:
@@ -60,28 +116,64 @@ class DownloadContext:
     version: str
     output_dir: Path
     stats: DownloadStats
-    semaphore: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(1))
+    semaphore: asyncio.Semaphore | AdaptiveLimiter = field(default_factory=lambda: asyncio.Semaphore(1))
+    manifest: Manifest | None = None
+    local_sizes: Dict[str, int | None] | None = None
+    retrier: Retrier = field(default_factory=Retrier)
+    rate_limiter: TokenBucket | None = None
+    created_dirs: Set[Path] = field(default_factory=set)
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    write_buffer_size: int = DEFAULT_WRITE_BUFFER_SIZE
+    segments: int = DEFAULT_SEGMENTS
+    segment_threshold: int | None = DEFAULT_SEGMENT_THRESHOLD
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL
+    writer: str = DEFAULT_WRITER
+    progress: ProgressReporter = field(default_factory=ProgressReporter)
+    hooks: List[DownloadHooks] = field(default_factory=list)
+    listing_cache: ListingCache | None = None
+    listing_client: FastListingClient | None = None
 
-def initialize_client(api_key: str) -> ApiClient:
+def initialize_client(
+    api_key: str | AnonymousApiKey,
+    rate_limiter: TokenBucket | None = None,
+    http_client: httpx.AsyncClient | None = None,
+    base_url: str = DEFAULT_API_BASE_URL,
+) -> ApiClient:
     """Initialize the KNMI API client with proper authentication and serialization.
 
     Args:
-        api_key (str): The API key for authentication
+        api_key (str | AnonymousApiKey): The API key for authentication. An anonymous key that is refreshed during
+            the run is sent with every request after the refresh.
+        rate_limiter (TokenBucket | None): Rate limiter applied to every API request. Defaults to None (no limit).
+        http_client (httpx.AsyncClient | None): HTTP client to send the API requests with, for example one
+            created by `SharedTransport.client()`. Defaults to kiota's default client.
+        base_url (str): Base URL of the Open Data API, for example of a local mock server
 
     Returns:
         ApiClient: Configured API client
     """
     auth_provider = ApiKeyAuthenticationProvider(
-        api_key=api_key,
+        api_key=api_key.key if isinstance(api_key, AnonymousApiKey) else api_key,
         parameter_name="Authorization",
         key_location=KeyLocation.Header,
     )
+    if isinstance(api_key, AnonymousApiKey):
+        api_key.bind(auth_provider)
+
+    # Retries are handled by our own retry policy, so kiota's retry handler is disabled
+    http_client = KiotaClientFactory.create_with_default_middleware(
+        client=http_client,
+        options={RetryHandlerOption.get_key(): RetryHandlerOption(should_retry=False)},
+    )
+    if rate_limiter is not None:
+        rate_limiter.install(http_client)
 
     request_adapter = HttpxRequestAdapter(
         authentication_provider=auth_provider,
         parse_node_factory=JsonParseNodeFactory(),
         serialization_writer_factory=JsonSerializationWriterFactory(),
-        base_url="https://api.dataplatform.knmi.nl/open-data",
+        http_client=http_client,
+        base_url=base_url,
     )
 
     return ApiClient(request_adapter)
@@ -94,19 +186,220 @@ def format_size(size_bytes: int) -> str:
         size_bytes = int(size_bytes / 1024)
     return f"{size_bytes:.1f} TB"
 
+def format_timestamp(value: datetime) -> str:
+    """Format a datetime as the timestamp string expected by the listing endpoint."""
+    return value.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+def split_date_range(
+    start_date: datetime,
+    end_date: datetime,
+    window: timedelta,
+) -> List[Tuple[datetime, datetime]]:
+    """Split a date range into consecutive sub-windows.
+
+    Args:
+        start_date (datetime): Start of the range
+        end_date (datetime): End of the range
+        window (timedelta): Maximum length of a single sub-window
+
+    Returns:
+        List[Tuple[datetime, datetime]]: Consecutive (start, end) pairs covering the range
+    """
+    if window <= timedelta(0):
+        raise ValueError("Shard window must be positive")
+
+    windows = []
+    current = start_date
+    while current < end_date:
+        upper = min(current + window, end_date)
+        windows.append((current, upper))
+        current = upper
+    return windows or [(start_date, end_date)]
+
+async def _iter_window_pages(
+    context: DownloadContext,
+    begin: str,
+    end: str,
+    limit: int | None = None,
+    sorting: GetSortingQueryParameterType = GetSortingQueryParameterType.Desc,
+) -> AsyncIterator[List[FileSummary]]:
+    """Page through the listing endpoint for a single time window.
+
+    Args:
+        context (DownloadContext): Download context containing client and configuration
+        begin (str): Lower bound of the window as a listing timestamp
+        end (str): Upper bound of the window as a listing timestamp
+        limit (int | None): Stop paging once this many files have been yielded
+        sorting (GetSortingQueryParameterType): Order of the files by last modification time. Defaults to newest first.
+
+    Yields:
+        List[FileSummary]: One page of files, in the order returned by the API. With a `listing_client` in the
+            context, the files are `FileRecord`s with the same attributes.
+    """
+    config = FilesRequestBuilder.FilesRequestBuilderGetQueryParameters(
+        max_keys=limit,
+        order_by=GetOrderByQueryParameterType.LastModified,
+        sorting=sorting,
+        begin=begin,
+        end=end,
+    )
+
+    request_configuration = FilesRequestBuilder.FilesRequestBuilderGetRequestConfiguration(
+        query_parameters=config
+    )
+
+    def get_page():
+        if context.listing_client is not None:
+            return context.listing_client.get_page(
+                context.dataset_name,
+                context.version,
+                begin=begin,
+                end=end,
+                max_keys=limit,
+                order_by=config.order_by.value,
+                sorting=sorting.value,
+                next_page_token=config.next_page_token,
+            )
+        return (
+            context.client.v1.datasets.by_dataset_name(dataset_name=context.dataset_name)
+            .versions.by_version_id(version_id=context.version)
+            .files.get(request_configuration=request_configuration)
+        )
+
+    listed = 0
+    while True:
+        started = time.time()
+        response = await context.retrier.call(get_page, f"listing page of {context.dataset_name}")
+        if response is None:
+            raise ValueError("No response from API")
+
+        page = response.files or []
+        if limit is not None:
+            page = page[:limit - listed]
+        finished = time.time()
+        for hook in context.hooks:
+            hook.on_list_page(len(page), started, finished)
+        listed += len(page)
+        yield page
+
+        if not response.is_truncated or (limit is not None and listed >= limit):
+            break
+        config.next_page_token = response.next_page_token
+
+async def _list_window(
+    context: DownloadContext,
+    begin: str,
+    end: str,
+    limit: int | None = None,
+) -> List[FileSummary]:
+    """Collect all pages of a single time window into one list."""
+    all_files: List[FileSummary] = []
+    async for page in _iter_window_pages(context, begin, end, limit):
+        all_files.extend(page)
+    return all_files
+
+def _is_newer(file: FileSummary, other: FileSummary) -> bool:
+    """Whether `file` was modified after `other`, the entry kept when de-duplicating listings."""
+    return (file.last_modified or "") > (other.last_modified or "")
+
+def merge_file_lists(file_lists: Iterable[List[FileSummary]]) -> List[FileSummary]:
+    """Merge listings of several windows into one de-duplicated list.
+
+    Files are de-duplicated by filename, keeping the most recently modified
+    entry, and ordered by last modification time, newest first, matching the
+    order of an unsharded listing.
+
+    Args:
+        file_lists (Iterable[List[FileSummary]]): Listings to merge
+
+    Returns:
+        List[FileSummary]: Merged list of files
+    """
+    unique: Dict[str, FileSummary] = {}
+    for files in file_lists:
+        for file in files:
+            if file.filename is None:
+                continue
+            existing = unique.get(file.filename)
+            if existing is None or _is_newer(file, existing):
+                unique[file.filename] = file
+
+    return sorted(
+        unique.values(),
+        key=lambda file: (file.last_modified or "", file.filename or ""),
+        reverse=True,
+    )
+
+async def _list_buckets(
+    context: DownloadContext,
+    start_date: datetime,
+    end_date: datetime,
+    max_concurrent_listing: int = DEFAULT_MAX_CONCURRENT_LISTING,
+) -> List[FileSummary]:
+    """Assemble the listing of a date range from the listing cache, listing only the buckets it is missing."""
+    cache = context.listing_cache
+    buckets = cache.buckets(start_date, end_date)
+    results: List[List[FileSummary]] = []
+    missing = []
+    for bucket in buckets:
+        files = cache.get(context.dataset_name, context.version, bucket[0])
+        if files is None:
+            missing.append(bucket)
+        else:
+            results.append(files)
+
+    async def list_bucket(bucket: Tuple[datetime, datetime]) -> None:
+        files = await _list_window(
+            context=context,
+            begin=format_timestamp(bucket[0]),
+            end=format_timestamp(bucket[1]),
+        )
+        results.append(files)
+        try:
+            cache.put(context.dataset_name, context.version, bucket[0], files)
+        except OSError as e:
+            log.warning(f"Could not write to the listing cache {cache.directory}: {e}")
+
+    if missing:
+        log.debug(f"Listing {len(missing)} of {len(buckets)} buckets missing from the listing cache")
+        await run_worker_pool(missing, list_bucket, max_concurrent_listing)
+        try:
+            cache.evict()
+        except OSError as e:
+            log.warning(f"Could not evict from the listing cache {cache.directory}: {e}")
+
+    # Buckets cover whole days or hours, the range usually does not
+    begin, end = as_utc(start_date), as_utc(end_date)
+    return merge_file_lists(
+        [file for file in files if begin <= (parse_timestamp(file.last_modified) or begin) < end]
+        for files in results
+    )
+
 async def get_files_list(
     context: DownloadContext,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     limit: int | None = None,
+    shard_window: timedelta | None = None,
+    max_concurrent_listing: int = DEFAULT_MAX_CONCURRENT_LISTING,
 ) -> List[FileSummary]:
     """Get list of files for the specified date range.
 
+    When `shard_window` is given, the range is split into sub-windows of that
+    length which are paged through concurrently, and the results are merged into
+    a single de-duplicated list ordered by last modification time.
+
+    When the context has a listing cache, the range is assembled from cached
+    buckets instead, and only the buckets missing from the cache are listed,
+    concurrently and without sharding.
+
     Args:
         context (DownloadContext): Download context containing client and configuration
         start_date (datetime | None): Start date for the files. Defaults to 1 day ago.
         end_date (datetime | None): End date for the files. Defaults to now.
         limit (int | None): Maximum number of files to retrieve. Defaults to None.
+        shard_window (timedelta | None): Length of the sub-windows to list concurrently. Defaults to None (no sharding).
+        max_concurrent_listing (int): Maximum number of sub-windows listed at the same time.
 
     Returns:
         List[FileSummary]: List of file information objects from the KNMI API
@@ -117,126 +410,780 @@ async def get_files_list(
         start_date = start_date or default_start
         end_date = end_date or default_end
 
-    if isinstance(start_date, datetime):
-        begin = start_date.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    if context.listing_cache is not None:
+        files = await _list_buckets(context, start_date, end_date, max_concurrent_listing)
+        return files[:limit]
 
-    if isinstance(end_date, datetime):
-        end = end_date.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    if shard_window is None:
+        files = await _list_window(
+            context=context,
+            begin=format_timestamp(start_date),
+            end=format_timestamp(end_date),
+            limit=limit,
+        )
+        return files[:limit]
 
-    config = FilesRequestBuilder.FilesRequestBuilderGetQueryParameters(
-        max_keys=limit,
-        order_by=GetOrderByQueryParameterType.LastModified,
-        sorting=GetSortingQueryParameterType.Desc,
-        begin=begin,
-        end=end,
-    )
+    windows = split_date_range(start_date, end_date, shard_window)
+    results: List[List[FileSummary]] = [[] for _ in windows]
 
-    request_configuration = FilesRequestBuilder.FilesRequestBuilderGetRequestConfiguration(
-        query_parameters=config
-    )
+    async def list_shard(index: int) -> None:
+        shard_start, shard_end = windows[index]
+        results[index] = await _list_window(
+            context=context,
+            begin=format_timestamp(shard_start),
+            end=format_timestamp(shard_end),
+            limit=limit,
+        )
 
-    response = await (
-        context.client.v1.datasets.by_dataset_name(dataset_name=context.dataset_name)
-        .versions.by_version_id(version_id=context.version)
-        .files.get(request_configuration=request_configuration)
-    )
+    log.debug(f"Listing {len(windows)} windows of {shard_window} with {max_concurrent_listing} concurrent requests")
+    await run_worker_pool(range(len(windows)), list_shard, max_concurrent_listing)
 
-    if response is None:
-        raise ValueError("No response from API")
+    return merge_file_lists(results)[:limit]
 
-    all_files = response.files or []
+async def iter_file_pages(
+    context: DownloadContext,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    limit: int | None = None,
+    shard_window: timedelta | None = None,
+    max_concurrent_listing: int = DEFAULT_MAX_CONCURRENT_LISTING,
+    sorting: GetSortingQueryParameterType = GetSortingQueryParameterType.Desc,
+) -> AsyncIterator[List[FileSummary]]:
+    """Stream the listing for the specified date range page by page.
 
-    # Handle pagination if there are more files
-    while response.is_truncated:
-        config.next_page_token = response.next_page_token
-        response = await (
+    Pages are yielded as soon as they arrive, so callers can start working on
+    the first files while the rest of the range is still being listed. When
+    sharding, pages of the sub-windows are interleaved in arrival order and
+    every file is yielded once. A file modified exactly at the edge between
+    two windows is listed by both, so such files are held back and yielded in
+    a last page, keeping the newest entry like `merge_file_lists`. A file
+    republished while the range is listed can show up in a second window as
+    well; only its first entry is yielded. Sharding combined with
+    a limit needs the complete listing to pick the newest files, so in that case
+    the merged result of `get_files_list` is yielded as a single page. The same
+    goes for a listing assembled from the listing cache.
+
+    Args:
+        context (DownloadContext): Download context containing client and configuration
+        start_date (datetime | None): Start date for the files. Defaults to 1 hour and 30 minutes ago.
+        end_date (datetime | None): End date for the files. Defaults to now.
+        limit (int | None): Maximum number of files to yield. Defaults to None.
+        shard_window (timedelta | None): Length of the sub-windows to list concurrently. Defaults to None (no sharding).
+        max_concurrent_listing (int): Maximum number of sub-windows listed at the same time.
+        sorting (GetSortingQueryParameterType): Order of the files within a window by last modification time.
+            Defaults to newest first.
+
+    Yields:
+        List[FileSummary]: Pages of file information objects from the KNMI API
+    """
+    if start_date is None or end_date is None:
+        default_start, default_end = get_default_date_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+    if as_utc(start_date) >= as_utc(end_date):
+        return  # Nothing to list, for example when an incremental sync already covered the range
+
+    if context.listing_cache is not None:
+        yield await get_files_list(
+            context=context,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            max_concurrent_listing=max_concurrent_listing,
+        )
+        return
+
+    if shard_window is None:
+        async for page in _iter_window_pages(
+            context=context,
+            begin=format_timestamp(start_date),
+            end=format_timestamp(end_date),
+            limit=limit,
+            sorting=sorting,
+        ):
+            yield page
+        return
+
+    if limit is not None:
+        yield await get_files_list(
+            context=context,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            shard_window=shard_window,
+            max_concurrent_listing=max_concurrent_listing,
+        )
+        return
+
+    windows = split_date_range(start_date, end_date, shard_window)
+    pages: asyncio.Queue = asyncio.Queue(maxsize=max_concurrent_listing)
+
+    async def list_shard(window: Tuple[datetime, datetime]) -> None:
+        async for page in _iter_window_pages(
+            context=context,
+            begin=format_timestamp(window[0]),
+            end=format_timestamp(window[1]),
+            sorting=sorting,
+        ):
+            await pages.put(page)
+
+    async def list_shards() -> None:
+        try:
+            await run_worker_pool(windows, list_shard, max_concurrent_listing)
+        except Exception as e:
+            await pages.put(e)
+            return
+        await pages.put(None)
+
+    # Files at an edge shared by two windows, or without a timestamp, by filename
+    edges = {as_utc(window[0]) for window in windows[1:]}
+    held: Dict[str, FileSummary] = {}
+    yielded: Set[str] = set()
+
+    listing = asyncio.ensure_future(list_shards())
+    try:
+        while True:
+            page = await pages.get()
+            if page is None:
+                break
+            if isinstance(page, Exception):
+                raise page
+            unique = []
+            for file in page:
+                if file.filename in yielded:
+                    continue
+                existing = held.get(file.filename)
+                modified = parse_timestamp(file.last_modified)
+                if modified is None or modified in edges:
+                    if existing is None or _is_newer(file, existing):
+                        held[file.filename] = file
+                elif existing is None or _is_newer(file, existing):
+                    held.pop(file.filename, None)
+                    yielded.add(file.filename)
+                    unique.append(file)
+            yield unique
+    finally:
+        listing.cancel()
+    if held:
+        yield list(held.values())
+
+async def follow_file_pages(
+    context: DownloadContext,
+    watermark: Watermark,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    stop: asyncio.Event | None = None,
+) -> AsyncIterator[List[FileSummary]]:
+    """Poll the listing for files modified after the watermark.
+
+    Every `poll_interval` seconds the files modified since the watermark are
+    listed, oldest first, and the files not seen before are yielded. A poll
+    that fails after its retries is logged and tried again on the next poll,
+    and every poll gets a fresh retry budget.
+
+    Args:
+        context (DownloadContext): Download context containing client and configuration
+        watermark (Watermark): Newest modification time seen so far, advanced by every poll
+        poll_interval (float): Time between two polls in seconds
+        stop (asyncio.Event | None): Stops polling once set. If None, polls until cancelled.
+
+    Yields:
+        List[FileSummary]: Pages of new and republished files
+    """
+    stop = stop or asyncio.Event()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+        context.retrier.reset_budget()
+        # The end of the range is well ahead, so clock skew with the API does not hide new files
+        end = datetime.now(timezone.utc) + timedelta(days=1)
+        try:
+            async for page in _iter_window_pages(
+                context=context,
+                begin=format_timestamp(watermark.begin),
+                end=format_timestamp(end),
+                sorting=GetSortingQueryParameterType.Asc,
+            ):
+                new = watermark.update(page)
+                if new:
+                    log.info(f"Found {len(new)} new files")
+                    yield new
+        except Exception as e:
+            log.warning(f"Polling {context.dataset_name} failed, trying again in {poll_interval}s: {e!s}")
+
+def _needs_stat(context: DownloadContext, file: FileSummary) -> bool:
+    """Decide whether the local copy of a listed file has to be checked on disk.
+
+    A manifest entry with the listed size vouches for the local copy, so files
+    downloaded by an earlier run are decided without touching the filesystem.
+    """
+    entry = context.manifest.get(file.filename) if context.manifest is not None else None
+    return entry is None or entry.size is None or bool(file.size) and entry.size != file.size
+
+async def probe_local_copies(context: DownloadContext, files: Iterable[FileSummary]) -> None:
+    """Stat the local copies of listed files the manifest does not vouch for, in one batch in a worker thread.
+
+    The sizes are kept in `context.local_sizes` until the files are handled by `download_file`.
+    """
+    if context.local_sizes is None:
+        return
+    filenames = [file.filename for file in files if file.filename is not None and _needs_stat(context, file)]
+    if filenames:
+        sizes = await asyncio.get_running_loop().run_in_executor(None, stat_files, context.output_dir, filenames)
+        context.local_sizes.update(sizes)
+
+def _local_copy(
+    context: DownloadContext,
+    filename: str,
+    forget: bool = False,
+) -> Tuple[int | None, ManifestEntry | None]:
+    """Get the size of the local copy of a file and its manifest entry, if any.
+
+    The size comes from `probe_local_copies` if the file was probed, from the
+    manifest if it has an entry with a size, and from the filesystem otherwise.
+    With `forget`, a probed size is dropped once it is read.
+    """
+    entry = context.manifest.get(filename) if context.manifest is not None else None
+    if context.local_sizes is not None and filename in context.local_sizes:
+        local_size = context.local_sizes.pop(filename) if forget else context.local_sizes[filename]
+    elif entry is not None and entry.size is not None:
+        local_size = entry.size
+    else:
+        try:
+            local_size = (context.output_dir / filename).stat().st_size
+        except OSError:
+            local_size = None
+    return local_size, entry
+
+def _record_failure(context: DownloadContext, filename: str, error: Exception) -> None:
+    log.error(f"Error downloading {filename}: {str(error)}")
+    context.stats.failed_files.append(filename)
+
+async def resolve_download_url(context: DownloadContext, filename: str) -> ResolvedUrl:
+    """Get a temporary download URL for a file and determine when it expires.
+
+    Args:
+        context (DownloadContext): Download context containing clients and configuration
+        filename (str): Name of the file
+
+    Returns:
+        ResolvedUrl: The download URL and its expiry time
+
+    Raises:
+        ValueError: If the API did not return a download URL
+    """
+    started = time.time()
+    download_url = await context.retrier.call(
+        lambda: (
             context.client.v1.datasets.by_dataset_name(dataset_name=context.dataset_name)
             .versions.by_version_id(version_id=context.version)
-            .files.get(request_configuration=request_configuration)
-        )
-        if response is None:
-            raise ValueError("No response from API")
-        all_files.extend(response.files or [])
-        if limit is not None and len(all_files) >= limit:
-            break
+            .files.by_filename(filename=filename)
+            .url.get()
+        ),
+        f"download URL of {filename}",
+    )
+
+    if download_url is None or download_url.temporary_download_url is None:
+        raise ValueError("No download URL found")
+
+    finished = time.time()
+    for hook in context.hooks:
+        hook.on_url_resolved(filename, started, finished)
 
-    return all_files[:limit]
+    url = download_url.temporary_download_url
+    return ResolvedUrl(url=url, expires_at=url_expiry(url))
 
 async def download_file(
     context: DownloadContext,
     filename: str,
     expected_size: int,
-    files_progress: tqdm,
-    bytes_progress: tqdm,
+    last_modified: str | None = None,
+    download_url: ResolvedUrl | None = None,
+    resolve_error: Exception | None = None,
 ) -> None:
     """Download a single file from the dataset.
 
+    A local copy is kept only if its size matches `expected_size` and, when the
+    context has a manifest, the recorded `last_modified` matches the API.
+    Incomplete or republished files are downloaded again. The size of the
+    local copy is taken from `probe_local_copies` or from the manifest where
+    possible, so that most files need no filesystem probe of their own.
+
+    The download is written to a `.part` file next to the output path that is
+    renamed once complete. A `.part` file left by an interrupted attempt is
+    resumed with a range request, if it was downloaded from the same remote
+    file (see `PartOrigin`); otherwise it is downloaded again. Files of at least `context.segment_threshold`
+    bytes are downloaded in `context.segments` concurrent ranges instead (see
+    `download_segments`), falling back to a single stream when the server does
+    not support ranges. Progress is reported to `context.progress`.
+
     Args:
         context (DownloadContext): Download context containing clients and configuration
         filename (str): Name of the file to download
         expected_size (int): Expected size of the file in bytes
-        files_progress (tqdm): Progress bar for number of files
-        bytes_progress (tqdm): Progress bar for total bytes downloaded
+        last_modified (str | None): Last modification time reported by the API, recorded in the manifest
+        download_url (ResolvedUrl | None): Download URL resolved ahead of time. It is resolved again when
+            missing, about to expire, or rejected by the server.
+        resolve_error (Exception | None): Error with which resolving the download URL ahead of time failed.
+            The file is then reported as failed, like any other failed download, and the error is raised.
     """
+    output_path = context.output_dir / filename
+
+    if resolve_error is not None:
+        _local_copy(context, filename, forget=True)
+        now = time.time()
+        context.progress.start_file(filename, expected_size)
+        for hook in context.hooks:
+            hook.on_file_done(filename, 0, now, now, success=False)
+        context.progress.end_file(filename, success=False)
+        _record_failure(context, filename, resolve_error)
+        raise resolve_error
+
+    local_size, entry = _local_copy(context, filename, forget=True)
+    if is_up_to_date(local_size, entry, expected_size, last_modified):
+        context.stats.skipped_files += 1
+        context.progress.skip_file(filename, expected_size)
+        if context.manifest is not None and (entry is None or entry.last_modified != last_modified):
+            context.manifest.record(filename, local_size, last_modified)
+        return
+
+    if local_size is not None:
+        log.debug(f"Local copy of {filename} is incomplete or outdated, downloading again")
+        context.stats.stale_files += 1
+
+    part_path = output_path.with_name(output_path.name + PART_SUFFIX)
+    origin = PartOrigin(size=expected_size, last_modified=last_modified)
+    segmented = (
+        context.segments > 1
+        and context.segment_threshold is not None
+        and expected_size >= context.segment_threshold
+    )
+
     async with context.semaphore:  # Limit concurrent downloads
-        output_path = context.output_dir / filename
-        output_path.parent.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
-        
-        if output_path.exists():
-            context.stats.skipped_files += 1
-            files_progress.update(n=1)
-            bytes_progress.update(n=expected_size)
-            return
+        if output_path.parent not in context.created_dirs:
+            output_path.parent.mkdir(parents=True, exist_ok=True)  # Ensure directory exists
+            context.created_dirs.add(output_path.parent)
 
         try:
-            download_url = await (
-                context.client.v1.datasets.by_dataset_name(dataset_name=context.dataset_name)
-                .versions.by_version_id(version_id=context.version)
-                .files.by_filename(filename=filename)
-                .url.get()
-            )
+            context.progress.start_file(filename, expected_size)
+            position = 0  # Bytes of this file counted in the progress
+            initial_offset: int | None = None
 
-            if download_url is None or download_url.temporary_download_url is None:
-                raise ValueError("No download URL found")
+            def on_progress(new_position: int) -> None:
+                nonlocal position
+                context.progress.advance(filename, new_position - position)
+                position = new_position
 
-            # Create progress bar for this file
-            file_progress = tqdm(
-                total=expected_size,
-                desc=f"Downloading {filename}",
-                unit="iB",
-                unit_scale=True,
-                leave=False,
-            )
+            async def fetch() -> int:
+                """Download the missing part of the file and return its final size."""
+                nonlocal initial_offset, download_url
+                # Resume from a partial download left by an earlier attempt
+                try:
+                    offset = part_path.stat().st_size
+                except FileNotFoundError:
+                    offset = 0
+                if offset and SegmentState.path_for(part_path).exists():
+                    # The preallocated file of an unfinished segmented download says nothing about its progress
+                    discard_segments(part_path)
+                    offset = 0
+                if offset and not origin.matches(PartOrigin.load(part_path)):
+                    log.debug(f"{part_path.name} was downloaded from another version of {filename}, not resuming it")
+                    part_path.unlink()
+                    offset = 0
+                if expected_size and offset > expected_size:
+                    part_path.unlink()
+                    offset = 0
+                if offset == 0:
+                    origin.save(part_path)
+                if initial_offset is None:
+                    initial_offset = offset
 
-            # Stream the download with progress
-            async with context.http_client.stream(
-                method="GET",
-                url=download_url.temporary_download_url
-            ) as response:
-                response.raise_for_status()
-                async with aiofiles.open(file=output_path, mode="wb") as f:
-                    downloaded_size = 0
-                    async for chunk in response.aiter_bytes(chunk_size=8192):
-                        await f.write(chunk)
-                        chunk_size = len(chunk)
-                        downloaded_size += chunk_size
-                        file_progress.update(n=chunk_size)
-                        bytes_progress.update(n=chunk_size)
-
-            file_progress.close()
-            files_progress.update(n=1)
+                if expected_size and offset == expected_size:
+                    final_size = offset  # Only the rename was missing
+                    on_progress(final_size)
+                else:
+                    if download_url is not None and download_url.is_expired():
+                        log.debug(f"Download URL of {filename} is about to expire, resolving it again")
+                        context.stats.expired_urls += 1
+                        download_url = None
+                    if download_url is None:
+                        download_url = await resolve_download_url(context, filename)
+
+                    try:
+                        final_size = await stream_to_file(
+                            context=context,
+                            url=download_url.url,
+                            path=part_path,
+                            offset=offset,
+                            on_progress=on_progress,
+                            filename=filename,
+                        )
+                    except httpx.HTTPStatusError as e:
+                        if e.response.status_code != 403:
+                            raise
+                        # Temporary URLs are rejected with 403 once they expire
+                        context.stats.expired_urls += 1
+                        download_url = None
+                        raise ExpiredUrlError(f"Download URL of {filename} was rejected") from e
+
+                if expected_size and final_size < expected_size:
+                    raise IncompleteDownloadError(f"Downloaded {final_size} bytes, expected {expected_size}")
+                if expected_size and final_size > expected_size:
+                    part_path.unlink()
+                    raise ValueError(f"Downloaded {final_size} bytes, expected {expected_size}")
+                return final_size
+
+            started = time.time()
+            try:
+                final_size = None
+                if segmented:
+                    try:
+                        initial_offset = await download_segments(
+                            context, filename, part_path, expected_size, last_modified, download_url, on_progress
+                        )
+                        final_size = expected_size
+                    except RangeNotSupportedError as e:
+                        log.debug(f"{e!s}, downloading {filename} in one stream")
+                        discard_segments(part_path)
+                        on_progress(0)
+                if final_size is None:
+                    final_size = await context.retrier.call(fetch, f"download of {filename}")
+            except Exception:
+                finished = time.time()
+                for hook in context.hooks:
+                    hook.on_file_done(filename, max(0, position - (initial_offset or 0)), started, finished, success=False)
+                on_progress(0)
+                if isinstance(context.semaphore, AdaptiveLimiter):
+                    context.semaphore.record_error()
+                raise
+
+            finished = time.time()
+            downloaded = final_size - (initial_offset or 0)
+            try:
+                os.replace(part_path, output_path)
+            except OSError:
+                for hook in context.hooks:
+                    hook.on_file_done(filename, downloaded, started, finished, success=False)
+                raise
+            PartOrigin.remove(part_path)
+            if isinstance(context.semaphore, AdaptiveLimiter):
+                context.semaphore.record_success(downloaded, finished - started)
+                context.stats.concurrency_limit = context.semaphore.limit
+            for hook in context.hooks:
+                hook.on_file_done(filename, downloaded, started, finished, success=True)
 
             context.stats.downloaded_files += 1
-            context.stats.total_bytes_downloaded += downloaded_size
-            log.debug(f"Successfully downloaded: {filename} ({downloaded_size / 1024 / 1024:.1f} MB)")
+            context.stats.total_bytes_downloaded += final_size - (initial_offset or 0)
+            if context.manifest is not None:
+                context.manifest.record(filename, final_size, last_modified)
+            context.progress.end_file(filename, success=True)
+            log.debug(f"Successfully downloaded: {filename} ({final_size / 1024 / 1024:.1f} MB)")
 
         except Exception as e:
-            log.error(f"Error downloading {filename}: {str(e)}")
-            context.stats.failed_files.append(filename)
-            if output_path.exists():
-                output_path.unlink()  # Remove partially downloaded file
+            context.progress.end_file(filename, success=False)
+            _record_failure(context, filename, e)
+            # The partial download is kept in the .part file to resume from later
             raise
 
+def _content_range(content_range: str | None) -> Tuple[int, int] | None:
+    """Get the first and last byte positions, both inclusive, from a `Content-Range: bytes start-end/total` header."""
+    if not content_range or not content_range.startswith("bytes "):
+        return None
+    try:
+        first, last = content_range[len("bytes "):].split("/", 1)[0].split("-", 1)
+        return int(first), int(last)
+    except ValueError:
+        return None
+
+async def stream_to_file(
+    context: DownloadContext,
+    url: str,
+    path: Path,
+    offset: int,
+    on_progress: Callable[[int], None],
+    filename: str | None = None,
+) -> int:
+    """Stream a download URL into a file, resuming at `offset` when possible.
+
+    With a non-zero offset a `Range` request is sent and the response is
+    appended to the existing file. If the server ignores the range and sends
+    the whole file, the file is rewritten from the start instead.
+
+    Chunks of `context.chunk_size` bytes are coalesced into writes of at least
+    `context.write_buffer_size` bytes, and progress is reported at most every
+    `context.progress_interval` seconds, so that large files are not slowed
+    down by a disk write and progress update per small chunk. The writes go
+    through the `context.writer` backend.
+
+    Args:
+        context (DownloadContext): Download context containing clients and configuration
+        url (str): Temporary download URL
+        path (Path): File to write to
+        offset (int): Number of bytes already present in `path`
+        on_progress (Callable[[int], None]): Called with the number of bytes in the file as it grows
+        filename (str | None): Name of the file reported to the hooks. Defaults to the name of `path`.
+
+    Returns:
+        int: Size of the file after the download
+    """
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    filename = filename or path.name
+    requested = time.time()
+
+    async with context.http_client.stream(method="GET", url=url, headers=headers) as response:
+        if offset and response.status_code == 416:
+            # The partial file does not match the remote file; start over
+            log.debug(f"Range not satisfiable for {path.name}, downloading the whole file")
+            await response.aclose()
+            path.unlink()
+            return await stream_to_file(context, url, path, 0, on_progress, filename)
+
+        response.raise_for_status()
+
+        content_range = _content_range(response.headers.get("Content-Range"))
+        resumed = (
+            offset > 0
+            and response.status_code == 206
+            and content_range is not None
+            and content_range[0] == offset
+        )
+        if offset and not resumed:
+            log.debug(f"Server did not honour the range request for {path.name}, downloading the whole file")
+            offset = 0
+        on_progress(offset)
+
+        size = await _copy_stream(context, response, path, offset, on_progress, filename, requested)
+
+    on_progress(size)
+    return size
+
+async def _copy_stream(
+    context: DownloadContext,
+    response: httpx.Response,
+    path: Path,
+    offset: int,
+    on_progress: Callable[[int], None],
+    filename: str,
+    requested: float,
+    positional: bool = False,
+    on_written: Callable[[int], None] | None = None,
+    end: int | None = None,
+) -> int:
+    """Write a streamed response body into a file from `offset` and return the position after it.
+
+    With `end`, nothing is written at or after that position and the stream is
+    closed once it is reached, even if the server sends more. `on_written` is
+    called with the position up to which the body was written, once the writer
+    is closed, also when the stream breaks off.
+    """
+    writer = await open_writer(context.writer, path, offset, positional)
+    size = offset
+    buffer = bytearray()
+    reported = time.monotonic()
+    first_byte = True
+
+    async def flush() -> None:
+        nonlocal buffer
+        started = time.time()
+        await writer.write(buffer)
+        for hook in context.hooks:
+            hook.on_write(filename, len(buffer), started, time.time())
+        buffer = bytearray()  # The writer owns the written buffer
+
+    try:
+        async for chunk in response.aiter_bytes(chunk_size=context.chunk_size):
+            if context.hooks:
+                received = time.time()
+                for hook in context.hooks:
+                    if first_byte:
+                        hook.on_first_byte(filename, requested, received)
+                    hook.on_chunk(filename, len(chunk), received)
+            first_byte = False
+            if end is not None and size + len(chunk) > end:
+                chunk = chunk[:end - size]
+            buffer += chunk
+            size += len(chunk)
+            if len(buffer) >= context.write_buffer_size:
+                await flush()
+            if end is not None and size >= end:
+                break
+            now = time.monotonic()
+            if now - reported >= context.progress_interval:
+                on_progress(size)
+                reported = now
+    finally:
+        # Keep what was received, so an interrupted download resumes after it
+        try:
+            if buffer:
+                await flush()
+        finally:
+            await writer.close()
+        if on_written is not None:
+            on_written(size)
+    return size
+
+async def download_segments(
+    context: DownloadContext,
+    filename: str,
+    part_path: Path,
+    expected_size: int,
+    last_modified: str | None,
+    download_url: ResolvedUrl | None,
+    on_progress: Callable[[int], None],
+) -> int:
+    """Download a large file as concurrent byte ranges into a preallocated `.part` file.
+
+    The file is split into `context.segments` ranges that are fetched over the
+    same temporary download URL, written at their own offsets and retried on
+    their own. The bytes written per range are kept next to the `.part` file
+    (see `SegmentState`), so an interrupted download resumes every range where
+    it stopped. A `.part` file left by a sequential download of the same
+    remote file counts as done.
+
+    Args:
+        context (DownloadContext): Download context containing clients and configuration
+        filename (str): Name of the file to download
+        part_path (Path): File to download into
+        expected_size (int): Size of the file in bytes
+        last_modified (str | None): Last modification time reported by the API, identifying the remote file
+        download_url (ResolvedUrl | None): Download URL resolved ahead of time, shared by all ranges.
+            It is resolved again when missing, about to expire, or rejected by the server.
+        on_progress (Callable[[int], None]): Called with the number of bytes downloaded over all ranges
+
+    Returns:
+        int: Number of bytes that were already downloaded by an earlier attempt
+
+    Raises:
+        RangeNotSupportedError: If the server does not answer range requests with the requested range
+    """
+    state = SegmentState.load(part_path, expected_size, last_modified)
+    if state is None:
+        try:
+            present = part_path.stat().st_size
+        except FileNotFoundError:
+            present = 0
+        if present > expected_size or not PartOrigin(expected_size, last_modified).matches(PartOrigin.load(part_path)):
+            present = 0
+        segments = plan_segments(expected_size, context.segments)
+        for segment in segments:
+            segment.done = max(0, min(segment.length, present - segment.start))
+        state = SegmentState(SegmentState.path_for(part_path), expected_size, last_modified, segments)
+        # Saved before preallocating, so a preallocated file is never mistaken for a complete one
+        state.save()
+        PartOrigin.remove(part_path)  # The state records the origin from now on
+        await asyncio.get_running_loop().run_in_executor(None, preallocate, part_path, expected_size)
+
+    resumed = state.done
+    positions = [segment.done for segment in state.segments]
+    on_progress(resumed)
+    url_lock = asyncio.Lock()
+    current_url = download_url
+
+    async def get_url() -> ResolvedUrl:
+        nonlocal current_url
+        async with url_lock:  # Ranges waiting for a new URL share the first one resolved
+            if current_url is not None and current_url.is_expired():
+                log.debug(f"Download URL of {filename} is about to expire, resolving it again")
+                context.stats.expired_urls += 1
+                current_url = None
+            if current_url is None:
+                current_url = await resolve_download_url(context, filename)
+            return current_url
+
+    async def fetch_segment(index: int) -> None:
+        nonlocal current_url
+        segment = state.segments[index]
+        url = await get_url()
+        start = segment.start + segment.done
+        requested = time.time()
+
+        def on_segment_progress(position: int) -> None:
+            positions[index] = min(segment.length, position - segment.start)
+            on_progress(sum(positions))
+
+        def on_written(position: int) -> None:
+            segment.done = min(segment.length, position - segment.start)
+
+        try:
+            async with context.http_client.stream(
+                method="GET", url=url.url, headers={"Range": f"bytes={start}-{segment.end - 1}"}
+            ) as response:
+                response.raise_for_status()
+                content_range = _content_range(response.headers.get("Content-Range"))
+                if response.status_code != 206 or content_range != (start, segment.end - 1):
+                    raise RangeNotSupportedError(f"Server did not honour the range request for {filename}")
+                await _copy_stream(
+                    context, response, part_path, start, on_segment_progress, filename, requested,
+                    positional=True, on_written=on_written, end=segment.end,
+                )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 403:
+                raise
+            # Temporary URLs are rejected with 403 once they expire
+            if current_url is url:
+                context.stats.expired_urls += 1
+                current_url = None
+            raise ExpiredUrlError(f"Download URL of {filename} was rejected") from e
+        finally:
+            positions[index] = segment.done  # Bytes received but not written are downloaded again
+        if not segment.complete:
+            raise IncompleteDownloadError(
+                f"Range {index + 1} of {filename} ended after {segment.done} of {segment.length} bytes"
+            )
+
+    async def run_segment(index: int) -> None:
+        try:
+            await context.retrier.call(lambda: fetch_segment(index), f"range {index + 1} of {filename}")
+        finally:
+            state.save()
+
+    log.debug(f"Downloading {filename} in {len(state.segments)} ranges")
+    results = await asyncio.gather(
+        *(run_segment(index) for index, segment in enumerate(state.segments) if not segment.complete),
+        return_exceptions=True,
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        raise next((e for e in errors if isinstance(e, RangeNotSupportedError)), errors[0])
+
+    on_progress(expected_size)
+    state.remove()  # A complete .part file without a state is only waiting to be renamed
+    return resumed
+
+def _register_metrics(
+    metrics: DownloadMetrics,
+    context: DownloadContext,
+    file_queue: asyncio.Queue,
+    url_queue: asyncio.Queue,
+) -> None:
+    """Expose the counters of a download run and its queue depths as metrics."""
+    stats = context.stats
+    metrics.counter("listed_files", "Files found in the listing", lambda: stats.total_files)
+    metrics.counter("downloaded_files", "Files downloaded", lambda: stats.downloaded_files)
+    metrics.counter("skipped_files", "Files skipped because the local copy is up to date", lambda: stats.skipped_files)
+    metrics.counter("failed_files", "Files that failed to download", lambda: len(stats.failed_files))
+    metrics.counter("downloaded_bytes", "Bytes downloaded", lambda: stats.total_bytes_downloaded)
+    metrics.counter("retries", "Retried requests", lambda: context.retrier.retries)
+    metrics.counter("throttled_requests", "Requests throttled with a 429 or 503 response", lambda: context.retrier.throttled)
+    metrics.counter("expired_urls", "Download URLs resolved again because they expired", lambda: stats.expired_urls)
+    metrics.gauge("file_queue_depth", "Listed files waiting for a download URL", file_queue.qsize)
+    metrics.gauge("url_queue_depth", "Files with a download URL waiting for a download worker", url_queue.qsize)
+    if isinstance(context.semaphore, AdaptiveLimiter):
+        limiter = context.semaphore
+        metrics.gauge("active_downloads", "Downloads in progress", lambda: limiter.active)
+        metrics.gauge("concurrency_limit", "Current adaptive concurrency limit", lambda: limiter.limit)
+
+async def _write_metrics_periodically(metrics: DownloadMetrics, path: Path, interval: float) -> None:
+    while True:
+        try:
+            metrics.write_textfile(path)
+        except OSError as e:
+            log.warning(f"Could not write metrics to {path}: {e}")
+        await asyncio.sleep(interval)
+
 async def download(
     api_key: str | None = None,
     dataset_name: str = DEFAULT_DATASET_NAME,
@@ -246,11 +1193,64 @@ async def download(
     start_date: datetime | None = None,
     end_date: datetime | None = None,
     limit: int | None = None,
+    shard_window: timedelta | None = None,
+    max_concurrent_listing: int = DEFAULT_MAX_CONCURRENT_LISTING,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    use_manifest: bool = True,
+    retry_policy: RetryPolicy | None = None,
+    requests_per_second: float | None = None,
+    burst: int | None = None,
+    adaptive_concurrency: bool = False,
+    max_adaptive_concurrent: int = DEFAULT_MAX_ADAPTIVE_CONCURRENT,
+    transport_config: TransportConfig | None = None,
+    max_concurrent_urls: int = DEFAULT_MAX_CONCURRENT_URLS,
+    url_prefetch: int = DEFAULT_URL_PREFETCH,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    write_buffer_size: int = DEFAULT_WRITE_BUFFER_SIZE,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    writer: str = DEFAULT_WRITER,
+    segments: int = DEFAULT_SEGMENTS,
+    segment_threshold: int | None = DEFAULT_SEGMENT_THRESHOLD,
+    progress: str | ProgressReporter = DEFAULT_PROGRESS,
+    progress_report_interval: float = DEFAULT_PROGRESS_REPORT_INTERVAL,
+    metrics_port: int | None = None,
+    metrics_textfile: str | Path | None = None,
+    metrics_interval: float = DEFAULT_METRICS_INTERVAL,
+    hooks: List[DownloadHooks] | None = None,
+    trace: bool = False,
+    base_url: str = DEFAULT_API_BASE_URL,
+    follow: bool = False,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    stop: asyncio.Event | None = None,
+    incremental: bool = False,
+    listing_cache: ListingCache | str | Path | None = None,
+    api_key_cache: ApiKeyCache | str | Path | bool | None = True,
+    fast_listing: bool = False,
+    files: FileListing | Iterable[FileSummary] | None = None,
 ) -> DownloadStats:
     """Download dataset files for the specified date range.
 
+    Listing and downloading run as a pipeline: listing pages feed a bounded
+    queue, a pool of `max_concurrent_urls` workers resolves the temporary
+    download URLs up to `url_prefetch` files ahead, and a fixed pool of
+    `max_concurrent` long-lived workers downloads them. Downloads start as soon
+    as the first page arrives, do not wait for a URL round trip, and memory use
+    does not grow with the number of files. URLs that expire before their
+    download starts are resolved again.
+
+    With `follow`, the run does not end after the date range: the listing is
+    polled for new and republished files, which are downloaded by the same
+    warm clients and workers, until `stop` is set or the run is cancelled.
+
+    With `incremental`, the progress of the sync is kept in the output
+    directory (`.<dataset>-<version>.sync.json`) and a later run from the same
+    or a later start date only lists what was modified since. Files are then
+    listed oldest first, so the sync advances as files complete and an
+    interrupted run resumes where it stopped.
+
     Args:
-        api_key (str | None): KNMI API key. If None, an anonymous API key is used.
+        api_key (str | None): KNMI API key. If None, an anonymous API key is used, which is fetched again when the
+            API rejects it.
         dataset_name (str): Name of the dataset.
         version (str): Version of the dataset.
         max_concurrent (int): Maximum number of concurrent downloads.
@@ -258,76 +1258,333 @@ async def download(
         start_date (datetime | None): Start date for files to download. Defaults to 1 hour and 30 minutes ago.
         end_date (datetime | None): End date for files to download. Defaults to now.
         limit (int | None): Maximum number of files to download. If None, downloads all files.
+        shard_window (timedelta | None): List the date range in concurrent sub-windows of this length. If None, the range is listed in one pass.
+        max_concurrent_listing (int): Maximum number of concurrent listing requests when sharding.
+        queue_size (int): Maximum number of listed files waiting for a download worker.
+        use_manifest (bool): Keep a manifest of downloaded files in the output directory, used to detect
+            republished files. If False, only the size of local copies is checked.
+        retry_policy (RetryPolicy | None): How failed listing, URL and download requests are retried.
+            Defaults to `RetryPolicy()`.
+        requests_per_second (float | None): Maximum sustained rate of API requests (listing pages and download URLs).
+            If None, requests are not rate limited.
+        burst (int | None): Maximum number of API requests sent at once when rate limiting. Defaults to `requests_per_second`.
+        adaptive_concurrency (bool): Adapt the number of concurrent downloads to the observed throughput, starting
+            at `max_concurrent`. The current limit is reported in `DownloadStats.concurrency_limit`.
+        max_adaptive_concurrent (int): Upper bound of the adaptive concurrency limit.
+        transport_config (TransportConfig | None): Connection pool, HTTP/2 and timeout settings of the HTTP connection
+            pool shared by the API client, the downloads and the API key lookup. Defaults to `TransportConfig()`.
+        max_concurrent_urls (int): Maximum number of concurrent download URL requests.
+        url_prefetch (int): Maximum number of resolved download URLs waiting for a download worker.
+        chunk_size (int): Size of the chunks read from a download stream in bytes.
+        write_buffer_size (int): Number of bytes collected before writing them to disk.
+        progress_interval (float): Minimum time between two progress updates of a download in seconds.
+        writer (str): How downloads are written to disk: "aiofiles" through a shared thread pool, or "thread"
+            with a dedicated writer thread per file using vectored positional writes.
+        segments (int): Number of concurrent byte ranges a large file is downloaded in. 1 downloads every file in
+            a single stream.
+        segment_threshold (int | None): Size from which a file is downloaded in ranges, in bytes. If None, no file is.
+        progress (str | ProgressReporter): How progress is shown: "tqdm" progress bars, "log" or "json" for a
+            periodic aggregate status line in plain text or JSON lines, "none", or a custom `ProgressReporter`.
+        progress_report_interval (float): Minimum time between two status lines of the "log" and "json"
+            reporters in seconds.
+        metrics_port (int | None): Serve metrics in the Prometheus text format on this local port while downloading.
+            If None, no endpoint is started.
+        metrics_textfile (str | Path | None): Write metrics in the Prometheus text format to this file every
+            `metrics_interval` seconds and at the end, for the node exporter's textfile collector.
+        metrics_interval (float): Time between two writes of `metrics_textfile` in seconds.
+        hooks (List[DownloadHooks] | None): Callbacks for the phases of the run, such as listing pages, download
+            URLs, first bytes, chunks and completed files.
+        trace (bool): Record the phases of the run as OpenTelemetry spans with the globally configured tracer
+            provider. Requires the `opentelemetry-api` package.
+        base_url (str): Base URL of the Open Data API, for example of a local mock server.
+        follow (bool): Keep running after the date range and download files as they are published.
+            `end_date` and `limit` only apply to the initial range.
+        poll_interval (float): Time between two polls of the listing in follow mode in seconds.
+        stop (asyncio.Event | None): Ends follow mode once set; downloads already queued are finished first.
+        incremental (bool): Resume from the sync state kept in the output directory and list only files modified
+            since the last run. With a `limit`, the oldest files after the last run are downloaded.
+        listing_cache (ListingCache | str | Path | None): Cache the listing on disk in time buckets, in this
+            directory or with these settings, so overlapping date ranges are only listed once. Incremental syncs
+            and follow mode polls always list directly.
+        api_key_cache (ApiKeyCache | str | Path | bool | None): Cache the anonymous API key on disk in this file or
+            with these settings, so later runs do not fetch it again. If True, it is cached in the user's cache
+            directory, when there is one. If False or None, the key is fetched on every run.
+        fast_listing (bool): Decode listing pages directly from JSON into compact `FileRecord`s instead of
+            through the kiota client, which takes a fraction of the CPU time on long listings.
+        files (FileListing | Iterable[FileSummary] | None): Download these files instead of listing the date range,
+            for example a `FileListing` that was filtered beforehand. `start_date`, `end_date` and the listing
+            options are then ignored; `limit` applies in order. Cannot be combined with `follow` or `incremental`.
 
     Returns:
         DownloadStats: Statistics about the download process
     """
+    if files is not None and (follow or incremental):
+        raise ValueError("A given list of files cannot be followed or synced incrementally")
+    run_hooks = list(hooks or [])
+    if trace:
+        run_hooks.append(TracingHooks())
+
+    if adaptive_concurrency:
+        semaphore = AdaptiveLimiter(initial=max_concurrent, maximum=max(max_concurrent, max_adaptive_concurrent))
+        workers = semaphore.maximum
+        on_throttle = semaphore.record_throttle
+    else:
+        semaphore = asyncio.Semaphore(max_concurrent)
+        workers = max_concurrent
+        on_throttle = None
+
+    # One connection pool shared by the API key lookup, the API client and the downloads
+    transport = SharedTransport(transport_config, concurrency=workers)
+    http_client = transport.client()
+
+    anonymous_key: AnonymousApiKey | None = None
     if not api_key:
-        api_key = await get_anonymous_api_key()
+        anonymous_key = AnonymousApiKey(http_client, make_api_key_cache(api_key_cache))
+        try:
+            await anonymous_key.get()
+        except Exception:
+            await transport.aclose()
+            raise
 
     # Initialize clients and context
-    client = initialize_client(api_key)
-    http_client = httpx.AsyncClient()
+    rate_limiter = TokenBucket(requests_per_second, burst) if requests_per_second else None
+    client = initialize_client(anonymous_key or api_key, rate_limiter, transport.client(), base_url)
+    listing_client: FastListingClient | None = None
+    if fast_listing:
+        listing_http_client = transport.client()
+        if rate_limiter is not None:
+            rate_limiter.install(listing_http_client)
+        listing_client = FastListingClient(listing_http_client, anonymous_key.key if anonymous_key else api_key, base_url)
+        if anonymous_key is not None:
+            anonymous_key.bind(listing_client)
     stats = DownloadStats()
-    
+    stats.concurrency_limit = max_concurrent
+    output_dir = Path(output_dir)
+
+    # A missing manifest is rebuilt from a scan of the output directory; otherwise the directory is not scanned
+    manifest = None
+    if use_manifest:
+        manifest = await asyncio.get_running_loop().run_in_executor(None, Manifest.load, output_dir, dataset_name, version)
+
     context = DownloadContext(
         client=client,
         http_client=http_client,
-        semaphore=asyncio.Semaphore(max_concurrent),
+        semaphore=semaphore,
         dataset_name=dataset_name,
         version=version,
-        output_dir=Path(output_dir),
-        stats=stats
+        output_dir=output_dir,
+        stats=stats,
+        manifest=manifest,
+        local_sizes={},
+        retrier=Retrier(
+            retry_policy,
+            on_throttle=on_throttle,
+            on_unauthorized=anonymous_key.refresh if anonymous_key is not None else None,
+        ),
+        rate_limiter=rate_limiter,
+        chunk_size=chunk_size,
+        write_buffer_size=write_buffer_size,
+        progress_interval=progress_interval,
+        writer=writer,
+        segments=segments,
+        segment_threshold=segment_threshold,
+        hooks=run_hooks,
+        listing_client=listing_client,
     )
+    if listing_cache is not None and not incremental:
+        context.listing_cache = listing_cache if isinstance(listing_cache, ListingCache) else ListingCache(listing_cache)
+    metrics: DownloadMetrics | None = None
+    metrics_writer: asyncio.Task | None = None
+
+    # Following and incremental syncs track the newest listed modification time
+    sync_state: SyncState | None = None
+    watermark: Watermark | None = None
+    list_start = start_date
+    sorting = GetSortingQueryParameterType.Desc
+    if follow or incremental:
+        start_date = start_date or get_default_date_range()[0]
+        if incremental:
+            sync_state = SyncState.load(output_dir, dataset_name, version)
+            watermark = sync_state.watermark(start_date)
+            list_start = watermark.begin
+            if list_start > as_utc(start_date):
+                log.info(f"Resuming the sync of {dataset_name} from {list_start}")
+            # Listed oldest first, the sync advances with every completed file
+            sorting = GetSortingQueryParameterType.Asc
+            if limit is not None:
+                shard_window = None  # Sharding with a limit merges the windows newest first
+        else:
+            watermark = Watermark(start_date)
+        watermark.settled = sorting == GetSortingQueryParameterType.Asc and shard_window is None
+    last_saved = 0.0
+
+    def save_sync_state(force: bool = False) -> None:
+        """Write the progress of an incremental sync, at most every few seconds unless forced."""
+        nonlocal last_saved
+        if sync_state is None or watermark is None:
+            return
+        now = time.monotonic()
+        if not force and now - last_saved < DEFAULT_SYNC_STATE_INTERVAL:
+            return
+        last_saved = now
+        sync_state.record(start_date, watermark)
+        try:
+            sync_state.save()
+        except OSError as e:
+            log.warning(f"Could not write sync state to {sync_state.path}: {e}")
 
     try:
-        files = await get_files_list(
-            context=context,
-            start_date=start_date,
-            end_date=end_date,
-            limit=limit
-        )
-            
-        context.stats.total_files = len(files)
-        total_size = sum(file.size or 0 for file in files)
-        log.info(f"Found {len(files)} files in date range {start_date} to {end_date} (Total size: {format_size(total_size)})")
-
-        # Main progress bar for overall progress (both files and bytes)
-        with tqdm(
-            total=total_size,
-            desc="Overall Progress",
-            unit="iB",
-            unit_scale=True,
-            unit_divisor=1024,
-            miniters=1,
-        ) as bytes_progress, tqdm(
-            total=len(files),
-            desc="Files Progress",
-            unit="file",
-            leave=False,
-            miniters=1,
-        ) as files_progress:
-            # Download files concurrently with semaphore limiting
-            tasks = [
-                download_file(
-                    context=context,
-                    filename=file.filename,
-                    expected_size=file.size or 0,
-                    files_progress=files_progress,
-                    bytes_progress=bytes_progress
-                )
-                for file in files
-                if file.filename is not None  # Skip files with no filename
-            ]
-            await asyncio.gather(*tasks, return_exceptions=True)
+        # Totals grow as listing pages arrive
+        with make_progress(progress, progress_report_interval) as reporter:
+            context.progress = reporter
+            queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+            url_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, url_prefetch))
+
+            if metrics_port is not None or metrics_textfile is not None:
+                metrics = DownloadMetrics()
+                _register_metrics(metrics, context, queue, url_queue)
+                context.hooks.append(metrics)
+                if metrics_port is not None:
+                    port = metrics.serve(metrics_port)
+                    log.info(f"Serving metrics on http://{DEFAULT_METRICS_HOST}:{port}/metrics")
+                if metrics_textfile is not None:
+                    metrics_writer = asyncio.create_task(
+                        _write_metrics_periodically(metrics, Path(metrics_textfile), metrics_interval)
+                    )
+
+            async def enqueue(page: List[FileSummary]) -> int:
+                """Feed a page of listed files into the download queue and return their total size."""
+                page_size = sum(file.size or 0 for file in page)
+                context.stats.total_files += len(page)
+                reporter.add_total(len(page), page_size)
+                await probe_local_copies(context, page)
+                for file in page:
+                    if file.filename is not None:  # Skip files with no filename
+                        await queue.put(file)
+                return page_size
+
+            async def produce() -> None:
+                """List the date range and feed the files into the download queue."""
+                total_size = 0
+                try:
+                    if files is not None:
+                        listing = files if isinstance(files, FileListing) else FileListing.from_files(files)
+                        listing = listing[:limit]
+                        for offset in range(0, len(listing), queue_size):
+                            total_size += await enqueue(list(listing[offset:offset + queue_size]))
+                        log.info(f"Downloading {context.stats.total_files} given files (Total size: {format_size(total_size)})")
+                        return
+
+                    # Files listed again in the overlap with the last sync must not count towards the limit
+                    pages = iter_file_pages(
+                        context=context,
+                        start_date=list_start,
+                        end_date=end_date,
+                        limit=None if incremental else limit,
+                        shard_window=shard_window,
+                        max_concurrent_listing=max_concurrent_listing,
+                        sorting=sorting,
+                    )
+                    try:
+                        async for page in pages:
+                            if watermark is not None:
+                                page = watermark.update(page, None if limit is None else limit - context.stats.total_files)
+                            total_size += await enqueue(page)
+                            save_sync_state()
+                            if limit is not None and context.stats.total_files >= limit:
+                                break
+                    finally:
+                        await pages.aclose()
+                    log.info(f"Found {context.stats.total_files} files in date range {list_start} to {end_date} (Total size: {format_size(total_size)})")
+
+                    if watermark is not None:
+                        watermark.settled = True
+                    if follow and watermark is not None:
+                        log.info(f"Following {dataset_name} for new files every {poll_interval}s")
+                        async for page in follow_file_pages(context, watermark, poll_interval, stop):
+                            await enqueue(page)
+                finally:
+                    await queue.put(None)
+
+            async def queued_files() -> AsyncIterator[FileSummary]:
+                """Yield files from the queue until the producer is done."""
+                while True:
+                    file = await queue.get()
+                    if file is None:
+                        return
+                    yield file
+
+            async def resolve(file: FileSummary) -> None:
+                """Resolve the download URL of a file and hand it to the download workers."""
+                download_url = None
+                error = None
+                local_size, entry = _local_copy(context, file.filename)
+                if not is_up_to_date(local_size, entry, file.size or 0, file.last_modified):
+                    try:
+                        download_url = await resolve_download_url(context, file.filename)
+                    except Exception as e:
+                        error = e  # Reported by download_file, like every other failure
+                await url_queue.put((file, download_url, error))
+
+            async def resolve_all() -> None:
+                try:
+                    await run_worker_pool(queued_files(), resolve, max_concurrent_urls)
+                finally:
+                    await url_queue.put(None)
+
+            async def resolved_files() -> AsyncIterator[Tuple[FileSummary, ResolvedUrl | None, Exception | None]]:
+                """Yield files with their download URLs until the resolvers are done."""
+                while True:
+                    item = await url_queue.get()
+                    if item is None:
+                        return
+                    yield item
+
+            async def consume(item: Tuple[FileSummary, ResolvedUrl | None, Exception | None]) -> None:
+                file, download_url, resolve_error = item
+                try:
+                    await download_file(
+                        context=context,
+                        filename=file.filename,
+                        expected_size=file.size or 0,
+                        last_modified=file.last_modified,
+                        download_url=download_url,
+                        resolve_error=resolve_error,
+                    )
+                except Exception:
+                    pass  # Already logged and recorded in the stats by download_file
+                else:
+                    if watermark is not None:
+                        watermark.done(file.filename)
+                        save_sync_state()
+
+            results = await asyncio.gather(
+                produce(),
+                resolve_all(),
+                run_worker_pool(resolved_files(), consume, workers),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+
+        context.stats.retries = context.retrier.retries
+        context.stats.throttled_requests = context.retrier.throttled
+        if isinstance(semaphore, AdaptiveLimiter):
+            context.stats.concurrency_limit = semaphore.limit
 
         # Print summary
         # fmt: off
         log.info("\nDownload Summary:")
         log.info(f"Total files found:      {context.stats.total_files}")
         log.info(f"Files already present:  {context.stats.skipped_files}")
+        log.info(f"Stale files refreshed:  {context.stats.stale_files}")
         log.info(f"Files downloaded:       {context.stats.downloaded_files}")
         log.info(f"Failed downloads:       {len(context.stats.failed_files)}")
+        log.info(f"Retries:                {context.stats.retries} ({context.stats.throttled_requests} throttled)")
+        log.info(f"Expired download URLs:  {context.stats.expired_urls}")
+        if adaptive_concurrency:
+            log.info(f"Concurrency limit:      {context.stats.concurrency_limit}")
         log.info(f"Total data downloaded:  {format_size(context.stats.total_bytes_downloaded)}")
         # fmt: on
         
@@ -341,6 +1598,90 @@ async def download(
         raise
 
     finally:
+        save_sync_state(force=True)
         await http_client.aclose()  # Ensure HTTP client is properly closed
+        await transport.aclose()
+        if context.manifest is not None:
+            context.manifest.close()
+        if metrics_writer is not None:
+            metrics_writer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await metrics_writer
+        if metrics is not None:
+            if metrics_textfile is not None:
+                try:
+                    metrics.write_textfile(metrics_textfile)
+                except OSError as e:
+                    log.warning(f"Could not write metrics to {metrics_textfile}: {e}")
+            metrics.close()
 
     return context.stats
+
+async def list_files(
+    api_key: str | None = None,
+    dataset_name: str = DEFAULT_DATASET_NAME,
+    version: str = DEFAULT_DATASET_VERSION,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    limit: int | None = None,
+    shard_window: timedelta | None = None,
+    max_concurrent_listing: int = DEFAULT_MAX_CONCURRENT_LISTING,
+    retry_policy: RetryPolicy | None = None,
+    transport_config: TransportConfig | None = None,
+    base_url: str = DEFAULT_API_BASE_URL,
+    api_key_cache: ApiKeyCache | str | Path | bool | None = True,
+    fast_listing: bool = True,
+) -> FileListing:
+    """List the files of a date range into a compact `FileListing`, to filter before passing it to `download()`.
+
+    Args:
+        api_key (str | None): KNMI API key. If None, an anonymous API key is used.
+        dataset_name (str): Name of the dataset.
+        version (str): Version of the dataset.
+        start_date (datetime | None): Start date for the files. Defaults to 1 hour and 30 minutes ago.
+        end_date (datetime | None): End date for the files. Defaults to now.
+        limit (int | None): Maximum number of files to list. If None, lists all files.
+        shard_window (timedelta | None): List the date range in concurrent sub-windows of this length.
+        max_concurrent_listing (int): Maximum number of concurrent listing requests when sharding.
+        retry_policy (RetryPolicy | None): How failed listing requests are retried. Defaults to `RetryPolicy()`.
+        transport_config (TransportConfig | None): Connection pool and timeout settings. Defaults to `TransportConfig()`.
+        base_url (str): Base URL of the Open Data API, for example of a local mock server.
+        api_key_cache (ApiKeyCache | str | Path | bool | None): Cache of the anonymous API key, as for `download()`.
+        fast_listing (bool): Decode listing pages directly from JSON instead of through the kiota client.
+
+    Returns:
+        FileListing: The listed files, newest first
+    """
+    transport = SharedTransport(transport_config)
+    try:
+        anonymous_key: AnonymousApiKey | None = None
+        if not api_key:
+            anonymous_key = AnonymousApiKey(transport.client(), make_api_key_cache(api_key_cache))
+            await anonymous_key.get()
+
+        context = DownloadContext(
+            client=initialize_client(anonymous_key or api_key, http_client=transport.client(), base_url=base_url),
+            http_client=transport.client(),
+            dataset_name=dataset_name,
+            version=version,
+            output_dir=DEFAULT_OUTPUT_DIR,
+            stats=DownloadStats(),
+            retrier=Retrier(retry_policy, on_unauthorized=anonymous_key.refresh if anonymous_key is not None else None),
+        )
+        if fast_listing:
+            context.listing_client = FastListingClient(
+                transport.client(), anonymous_key.key if anonymous_key else api_key, base_url
+            )
+            if anonymous_key is not None:
+                anonymous_key.bind(context.listing_client)
+
+        return await FileListing.from_pages(iter_file_pages(
+            context=context,
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            shard_window=shard_window,
+            max_concurrent_listing=max_concurrent_listing,
+        ))
+    finally:
+        await transport.aclose()
@@ -1,9 +1,30 @@
+from __future__ import annotations
+
+import os
 from pathlib import Path
 from datetime import datetime, timedelta
 
+# Default base URL of the KNMI Open Data API
+DEFAULT_API_BASE_URL = "https://api.dataplatform.knmi.nl/open-data"
+
 # Default output directory
 DEFAULT_OUTPUT_DIR = Path("./datasets")
 
+# Default name of the directory for cached data shared between runs, in the user's cache directory
+DEFAULT_CACHE_DIR_NAME = "knmi-dataset-downloader"
+
+# Default name of the file caching the anonymous API key between runs, in the cache directory
+DEFAULT_API_KEY_CACHE_NAME = "anonymous-api-key.json"
+
+# Default name of the directory of the listing cache, in the cache directory
+DEFAULT_LISTING_CACHE_NAME = "listings"
+
+# Default lifetime of a cached anonymous API key that does not state its expiry
+DEFAULT_API_KEY_TTL = timedelta(days=1)
+
+# Default time before its expiry at which a cached anonymous API key is fetched again
+DEFAULT_API_KEY_EXPIRY_MARGIN = timedelta(minutes=5)
+
 # Default dataset name
 DEFAULT_DATASET_NAME = "Actuele10mindataKNMIstations"
 
@@ -13,6 +34,102 @@ DEFAULT_DATASET_VERSION = "2"
 # Default maximum number of concurrent downloads
 DEFAULT_MAX_CONCURRENT = 10
 
+# Default upper bound of the concurrency limit when adapting it to the observed throughput
+DEFAULT_MAX_ADAPTIVE_CONCURRENT = 64
+
+# Default maximum number of concurrent listing requests when sharding the listing
+DEFAULT_MAX_CONCURRENT_LISTING = 4
+
+# Default maximum number of concurrent download URL requests
+DEFAULT_MAX_CONCURRENT_URLS = 4
+
+# Default maximum number of resolved download URLs waiting for a download worker
+DEFAULT_URL_PREFETCH = 20
+
+# Default lifetime assumed for a download URL that does not state its expiry (seconds)
+DEFAULT_URL_TTL = 300.0
+
+# Default time before its expiry at which a download URL is resolved again (seconds)
+DEFAULT_URL_EXPIRY_MARGIN = 30.0
+
+# Default maximum number of listed files waiting for a download worker
+DEFAULT_QUEUE_SIZE = 1000
+
+# Default size of the chunks read from a download stream (bytes)
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Default number of received bytes collected before writing them to disk
+DEFAULT_WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Default number of byte ranges a large file is downloaded in concurrently
+DEFAULT_SEGMENTS = 4
+
+# Default size from which a file is downloaded in concurrent byte ranges (bytes)
+DEFAULT_SEGMENT_THRESHOLD = 64 * 1024 * 1024
+
+# Default minimum time between two progress updates of a download (seconds)
+DEFAULT_PROGRESS_INTERVAL = 0.1
+
+# Default progress reporter
+DEFAULT_PROGRESS = "tqdm"
+
+# Default minimum time between two aggregate progress status lines (seconds)
+DEFAULT_PROGRESS_REPORT_INTERVAL = 10.0
+
+# Default address the metrics endpoint listens on
+DEFAULT_METRICS_HOST = "127.0.0.1"
+
+# Default time between two writes of the metrics textfile (seconds)
+DEFAULT_METRICS_INTERVAL = 15.0
+
+# Default backend writing downloads to disk
+DEFAULT_WRITER = "aiofiles"
+
+# Default time between two polls of the listing in follow mode (seconds)
+DEFAULT_POLL_INTERVAL = 10.0
+
+# Default time before the newest seen modification time from which every poll lists again
+DEFAULT_POLL_OVERLAP = timedelta(minutes=10)
+
+# Default minimum time between two writes of the sync state of an incremental sync (seconds)
+DEFAULT_SYNC_STATE_INTERVAL = 1.0
+
+# Default length of the time buckets of the listing cache
+DEFAULT_LISTING_CACHE_BUCKET = timedelta(days=1)
+
+# Default lifetime of a cached listing bucket that was still open when it was listed (seconds)
+DEFAULT_LISTING_CACHE_TTL = 60.0
+
+# Default time after its end during which new files can still show up in a listing bucket
+DEFAULT_LISTING_CACHE_GRACE = timedelta(minutes=10)
+
+# Default maximum total size of the listing cache (bytes)
+DEFAULT_LISTING_CACHE_SIZE = 100 * 1024 * 1024
+
+# Default maximum number of attempts per request, including the first one
+DEFAULT_MAX_ATTEMPTS = 5
+
+# Default delay before the first retry, doubled on every further attempt (seconds)
+DEFAULT_RETRY_BASE_DELAY = 1.0
+
+# Default maximum delay between two attempts (seconds)
+DEFAULT_RETRY_MAX_DELAY = 60.0
+
+# Default longest Retry-After a request waits for; a request asked to wait longer is not retried (seconds)
+DEFAULT_MAX_RETRY_AFTER = 300.0
+
+# Default maximum number of retries over a whole run
+DEFAULT_RETRY_BUDGET = 1000
+
+# Default timeout for establishing a connection (seconds)
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# Default timeout for reading or writing data on a connection (seconds)
+DEFAULT_READ_TIMEOUT = 60.0
+
+# Default time an idle connection is kept open for reuse (seconds)
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+
 # Default time window
 DEFAULT_TIME_WINDOW = timedelta(hours=1, minutes=30)
 
@@ -22,3 +139,23 @@ def get_default_date_range() -> tuple[datetime, datetime]:
     end = datetime.now()
     start = end - DEFAULT_TIME_WINDOW
     return start, end
+
+# Default cache directory
+def get_default_cache_dir() -> Path | None:
+    """Get the directory for cached data shared between runs.
+
+    The directory is resolved when it is needed rather than on import, so
+    that a process without a home directory, such as a container running
+    under an arbitrary user ID, can still import the package.
+
+    Returns:
+        Path | None: `$XDG_CACHE_HOME/knmi-dataset-downloader`, or `~/.cache/knmi-dataset-downloader`,
+            or None if there is no home directory
+    """
+    base = os.environ.get("XDG_CACHE_HOME")
+    if not base:
+        try:
+            base = Path.home() / ".cache"
+        except (RuntimeError, KeyError):
+            return None
+    return Path(base) / DEFAULT_CACHE_DIR_NAME
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import httpx
+from kiota_abstractions.api_error import APIError
+
+from .defaults import DEFAULT_API_BASE_URL
+
+class FileRecord:
+    """A listed file, with the same attributes as the kiota `FileSummary` model but a fraction of its footprint."""
+
+    __slots__ = ("filename", "size", "created", "last_modified")
+
+    def __init__(
+        self,
+        filename: Optional[str],
+        size: Optional[int] = None,
+        created: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        self.filename = filename
+        self.size = size
+        self.created = created
+        self.last_modified = last_modified
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FileRecord):
+            return NotImplemented
+        return (self.filename, self.size, self.created, self.last_modified) == (
+            other.filename, other.size, other.created, other.last_modified
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"FileRecord(filename={self.filename!r}, size={self.size!r}, "
+            f"created={self.created!r}, last_modified={self.last_modified!r})"
+        )
+
+class ListingPage:
+    """One page of the listing, with the attributes of the kiota `ListFilesResponse` the pipeline uses."""
+
+    __slots__ = ("files", "is_truncated", "next_page_token")
+
+    def __init__(self, files: List[FileRecord], is_truncated: bool, next_page_token: Optional[str]) -> None:
+        self.files = files
+        self.is_truncated = is_truncated
+        self.next_page_token = next_page_token
+
+def parse_listing_page(content: bytes) -> ListingPage:
+    """Decode a listing response body straight into file records.
+
+    Args:
+        content (bytes): JSON body of a response of the `/files` endpoint
+
+    Returns:
+        ListingPage: The decoded page
+    """
+    body = json.loads(content)
+    files = [
+        FileRecord(entry.get("filename"), entry.get("size"), entry.get("created"), entry.get("lastModified"))
+        for entry in body.get("files") or ()
+    ]
+    return ListingPage(files, bool(body.get("isTruncated")), body.get("nextPageToken"))
+
+class FastListingClient:
+    """Lists files by calling the `/files` endpoint directly, without kiota.
+
+    Kiota parses every listing page into a tree of parse nodes and fills one
+    `FileSummary` per entry through a deserializer per field, which dominates
+    the CPU time of long listings. This client decodes the JSON body in one
+    pass into `FileRecord`s. Failed requests raise the same `APIError` as
+    kiota, so they are retried the same way.
+    """
+
+    def __init__(self, http_client: httpx.AsyncClient, api_key: str, base_url: str = DEFAULT_API_BASE_URL) -> None:
+        """Create a listing client.
+
+        Args:
+            http_client (httpx.AsyncClient): HTTP client to send the requests with, for example one created by
+                `SharedTransport.client()`
+            api_key (str): The API key sent with every request. Updated in place when an anonymous key is refreshed.
+            base_url (str): Base URL of the Open Data API
+        """
+        self.http_client = http_client
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+
+    async def get_page(
+        self,
+        dataset_name: str,
+        version: str,
+        begin: Optional[str] = None,
+        end: Optional[str] = None,
+        max_keys: Optional[int] = None,
+        order_by: str = "lastModified",
+        sorting: str = "desc",
+        next_page_token: Optional[str] = None,
+    ) -> ListingPage:
+        """Get one page of the listing of a dataset version.
+
+        Raises:
+            APIError: If the API answers with an error status
+        """
+        params: Dict[str, str] = {"orderBy": order_by, "sorting": sorting}
+        if begin is not None:
+            params["begin"] = begin
+        if end is not None:
+            params["end"] = end
+        if max_keys is not None:
+            params["maxKeys"] = str(max_keys)
+        if next_page_token is not None:
+            params["nextPageToken"] = next_page_token
+
+        response = await self.http_client.get(
+            f"{self.base_url}/v1/datasets/{quote(dataset_name, safe='')}/versions/{quote(version, safe='')}/files",
+            params=params,
+            headers={"Authorization": self.api_key, "Accept": "application/json"},
+        )
+        if response.status_code >= 400:
+            raise APIError(
+                f"The server returned status code {response.status_code}",
+                response.status_code,
+                dict(response.headers),
+            )
+        return parse_listing_page(response.content)
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import compress
+from typing import AsyncIterable, Iterable, Iterator, List, Optional, Sequence, overload
+
+from .fast_listing import FileRecord
+from .sync import as_utc, parse_timestamp
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Stored in place of a missing size or timestamp
+MISSING = -(2 ** 63)
+
+# Fields a listing can be sorted on, and the columns holding them
+SORT_FIELDS = {"filename": "filenames", "size": "sizes", "created": "created", "last_modified": "last_modified"}
+
+def to_micros(value: Optional[str]) -> int:
+    """Convert a timestamp reported by the API to microseconds since the epoch, or `MISSING`."""
+    moment = parse_timestamp(value)
+    if moment is None:
+        return MISSING
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+def from_micros(value: int) -> Optional[str]:
+    """Convert microseconds since the epoch back to an ISO 8601 timestamp in UTC."""
+    if value == MISSING:
+        return None
+    return (EPOCH + timedelta(microseconds=value)).isoformat()
+
+class FileListing:
+    """Compact, columnar listing of files.
+
+    A listing of millions of files held as `FileSummary` objects costs four
+    Python objects and two timestamp strings per file. A `FileListing` keeps
+    the filenames in a list and the sizes and timestamps in 64-bit integer
+    arrays, with timestamps as microseconds since the epoch, which takes a
+    fraction of the memory. Filtering and sorting work on whole columns and
+    return new listings; iterating yields `FileRecord`s, so a listing can be
+    passed anywhere a list of files is expected, including `download()`.
+
+    Timestamps are normalized to UTC in ISO 8601 (`2024-01-01T00:10:00+00:00`).
+    Missing sizes and timestamps are kept as `MISSING` and excluded by filters
+    on that column.
+    """
+
+    def __init__(
+        self,
+        filenames: Optional[List[str]] = None,
+        sizes: Optional[array] = None,
+        created: Optional[array] = None,
+        last_modified: Optional[array] = None,
+    ) -> None:
+        self.filenames: List[str] = filenames if filenames is not None else []
+        self.sizes = sizes if sizes is not None else array("q")
+        self.created = created if created is not None else array("q")
+        self.last_modified = last_modified if last_modified is not None else array("q")
+        if not len(self.filenames) == len(self.sizes) == len(self.created) == len(self.last_modified):
+            raise ValueError("Columns of a file listing must have the same length")
+
+    @classmethod
+    def from_files(cls, files: Iterable) -> FileListing:
+        """Build a listing from `FileSummary`s or `FileRecord`s. Files without a filename are skipped."""
+        listing = cls()
+        listing.extend(files)
+        return listing
+
+    @classmethod
+    async def from_pages(cls, pages: AsyncIterable[List]) -> FileListing:
+        """Build a listing from pages as they arrive, for example from `iter_file_pages`.
+
+        Only one page of full file objects is held at a time.
+        """
+        listing = cls()
+        async for page in pages:
+            listing.extend(page)
+        return listing
+
+    def extend(self, files: Iterable) -> None:
+        """Append files to the listing."""
+        for file in files:
+            if file.filename is None:
+                continue
+            self.filenames.append(file.filename)
+            self.sizes.append(MISSING if file.size is None else file.size)
+            self.created.append(to_micros(file.created))
+            self.last_modified.append(to_micros(file.last_modified))
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def _record(self, index: int) -> FileRecord:
+        size = self.sizes[index]
+        return FileRecord(
+            self.filenames[index],
+            None if size == MISSING else size,
+            from_micros(self.created[index]),
+            from_micros(self.last_modified[index]),
+        )
+
+    def __iter__(self) -> Iterator[FileRecord]:
+        return (self._record(index) for index in range(len(self)))
+
+    @overload
+    def __getitem__(self, key: int) -> FileRecord: ...
+
+    @overload
+    def __getitem__(self, key: slice) -> FileListing: ...
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return FileListing(self.filenames[key], self.sizes[key], self.created[key], self.last_modified[key])
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("file listing index out of range")
+        return self._record(key)
+
+    def __repr__(self) -> str:
+        return f"FileListing({len(self)} files, {self.total_size} bytes)"
+
+    @property
+    def total_size(self) -> int:
+        """Total size of the files with a known size, in bytes."""
+        return sum(size for size in self.sizes if size != MISSING)
+
+    def select(self, mask: Sequence[bool]) -> FileListing:
+        """Get the files for which `mask` is true, in order."""
+        return FileListing(
+            list(compress(self.filenames, mask)),
+            array("q", compress(self.sizes, mask)),
+            array("q", compress(self.created, mask)),
+            array("q", compress(self.last_modified, mask)),
+        )
+
+    def take(self, indices: Iterable[int]) -> FileListing:
+        """Get the files at `indices`, in that order."""
+        indices = list(indices)
+        return FileListing(
+            [self.filenames[index] for index in indices],
+            array("q", [self.sizes[index] for index in indices]),
+            array("q", [self.created[index] for index in indices]),
+            array("q", [self.last_modified[index] for index in indices]),
+        )
+
+    def between(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        field: str = "last_modified",
+    ) -> FileListing:
+        """Get the files with a timestamp from `start` up to, not including, `end`.
+
+        Args:
+            start (datetime | None): Lower bound, inclusive. Naive datetimes are taken as UTC. If None, unbounded.
+            end (datetime | None): Upper bound, exclusive. Naive datetimes are taken as UTC. If None, unbounded.
+            field (str): "last_modified" or "created"
+
+        Returns:
+            FileListing: The matching files
+        """
+        if field not in ("created", "last_modified"):
+            raise ValueError(f"Unknown timestamp field: {field}")
+        column = getattr(self, field)
+        low = (as_utc(start) - EPOCH) // timedelta(microseconds=1) if start is not None else MISSING + 1
+        high = (as_utc(end) - EPOCH) // timedelta(microseconds=1) if end is not None else 2 ** 63 - 1
+        return self.select([low <= value < high and value != MISSING for value in column])
+
+    def sized(self, min_size: Optional[int] = None, max_size: Optional[int] = None) -> FileListing:
+        """Get the files of at least `min_size` and at most `max_size` bytes. Files of unknown size are excluded."""
+        low = min_size if min_size is not None else 0
+        high = max_size if max_size is not None else 2 ** 63 - 1
+        return self.select([low <= size <= high for size in self.sizes])
+
+    def matching(self, pattern: str | re.Pattern) -> FileListing:
+        """Get the files whose filename matches a shell-style pattern such as `*_2024*.nc`, or a compiled regex.
+
+        A compiled regex only has to match part of the filename.
+        """
+        if isinstance(pattern, str):
+            match = re.compile(fnmatch.translate(pattern)).match
+        else:
+            match = pattern.search
+        return self.select([match(filename) is not None for filename in self.filenames])
+
+    def sorted(self, by: str = "last_modified", reverse: bool = False) -> FileListing:
+        """Get the files sorted on one column. Ties keep their order. Missing values sort first."""
+        if by not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {by}")
+        column = getattr(self, SORT_FIELDS[by])
+        return self.take(sorted(range(len(self)), key=column.__getitem__, reverse=reverse))
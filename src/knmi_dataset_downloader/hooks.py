@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+class DownloadHooks:
+    """Callbacks for the phases of a download run.
+
+    Subclass and override the events of interest, then pass an instance to
+    `download(hooks=[...])` or add it to `DownloadContext.hooks`. Timestamps
+    are Unix timestamps in seconds (`time.time()`), sizes are in bytes.
+
+    Hooks are called from the event loop and should return quickly; in
+    particular `on_chunk` is called for every chunk read from a download.
+    """
+
+    def on_list_page(self, files: int, started: float, finished: float) -> None:
+        """A page of the file listing with `files` files was fetched, including retries."""
+
+    def on_url_resolved(self, filename: str, started: float, finished: float) -> None:
+        """A temporary download URL was obtained, including retries."""
+
+    def on_first_byte(self, filename: str, requested: float, received: float) -> None:
+        """The first byte of a download response arrived."""
+
+    def on_chunk(self, filename: str, size: int, received: float) -> None:
+        """A chunk of a download was received."""
+
+    def on_write(self, filename: str, size: int, started: float, finished: float) -> None:
+        """Buffered bytes of a download were handed to the writer."""
+
+    def on_file_done(self, filename: str, size: int, started: float, finished: float, success: bool) -> None:
+        """A download finished or failed after all retries.
+
+        `size` is the number of bytes downloaded in this run, excluding bytes
+        resumed from an earlier partial download.
+        """
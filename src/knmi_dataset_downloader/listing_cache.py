@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .defaults import (
+    DEFAULT_LISTING_CACHE_BUCKET,
+    DEFAULT_LISTING_CACHE_GRACE,
+    DEFAULT_LISTING_CACHE_NAME,
+    DEFAULT_LISTING_CACHE_SIZE,
+    DEFAULT_LISTING_CACHE_TTL,
+    get_default_cache_dir,
+)
+from .knmi_dataset_api.models.file_summary import FileSummary
+from .sync import as_utc
+
+import logging
+log = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+class ListingCache:
+    """On-disk cache of the file listing, split into fixed time buckets.
+
+    Every bucket holds the complete listing of one dataset version for the
+    files last modified within it, so overlapping date ranges share buckets
+    and only the buckets that are missing need to be listed. A bucket that
+    ended more than `grace` before it was listed is closed and kept until it
+    is evicted; the bucket that was still open expires after `ttl` seconds.
+    The least recently used buckets are evicted when the cache grows beyond
+    `max_size` bytes.
+
+    Buckets are written atomically, so several processes can share a cache.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        bucket: timedelta = DEFAULT_LISTING_CACHE_BUCKET,
+        ttl: float = DEFAULT_LISTING_CACHE_TTL,
+        max_size: int = DEFAULT_LISTING_CACHE_SIZE,
+        grace: timedelta = DEFAULT_LISTING_CACHE_GRACE,
+    ) -> None:
+        """Create a listing cache.
+
+        Args:
+            directory (str | Path | None): Directory holding the cached buckets. If None, `listings` in the
+                default cache directory.
+            bucket (timedelta): Length of a bucket
+            ttl (float): Lifetime of a bucket that was still open when it was listed in seconds
+            max_size (int): Maximum total size of the cached buckets in bytes
+            grace (timedelta): Time after its end during which files can still show up in a bucket
+        """
+        if bucket <= timedelta(0):
+            raise ValueError("Listing cache bucket must be positive")
+        if directory is None:
+            cache_dir = get_default_cache_dir()
+            if cache_dir is None:
+                raise ValueError("There is no home directory to keep the listing cache in, pass a directory instead")
+            directory = cache_dir / DEFAULT_LISTING_CACHE_NAME
+        self.directory = Path(directory)
+        self.bucket = bucket
+        self.ttl = ttl
+        self.max_size = max_size
+        self.grace = grace
+
+    def buckets(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Get the aligned buckets covering a date range. Naive datetimes are taken as UTC."""
+        start, end = as_utc(start), as_utc(end)
+        current = EPOCH + self.bucket * ((start - EPOCH) // self.bucket)
+        buckets = []
+        while current < end:
+            buckets.append((current, current + self.bucket))
+            current += self.bucket
+        return buckets
+
+    def path(self, dataset_name: str, version: str, bucket_start: datetime) -> Path:
+        seconds = int(self.bucket.total_seconds())
+        return self.directory / dataset_name / version / f"{bucket_start:%Y%m%dT%H%M%SZ}-{seconds}s.json"
+
+    def get(self, dataset_name: str, version: str, bucket_start: datetime) -> Optional[List[FileSummary]]:
+        """Get the cached listing of a bucket, or None if it is missing or expired."""
+        path = self.path(dataset_name, version, bucket_start)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if not record["closed"] and time.time() - record["listed"] > self.ttl:
+                return None
+            files = [
+                FileSummary(filename=filename, size=size, created=created, last_modified=last_modified)
+                for filename, size, created, last_modified in record["files"]
+            ]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            log.debug(f"Ignoring unreadable listing cache entry {path}: {e!s}")
+            return None
+        try:
+            os.utime(path)  # Recently used buckets are evicted last
+        except OSError:
+            pass
+        return files
+
+    def put(self, dataset_name: str, version: str, bucket_start: datetime, files: List[FileSummary]) -> None:
+        """Store the complete listing of a bucket."""
+        listed = time.time()
+        closed = bucket_start + self.bucket + self.grace <= datetime.fromtimestamp(listed, timezone.utc)
+        path = self.path(dataset_name, version, bucket_start)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "listed": listed,
+                "closed": closed,
+                "files": [[file.filename, file.size, file.created, file.last_modified] for file in files],
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def evict(self) -> int:
+        """Remove the least recently used buckets until the cache fits in `max_size`.
+
+        Returns:
+            int: Number of buckets removed
+        """
+        entries = []
+        total = 0
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue  # Being written by another process
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            log.debug(f"Evicted {removed} buckets from the listing cache {self.directory}")
+        return removed
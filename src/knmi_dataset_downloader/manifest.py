@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, TextIO
+
+from .sync import parse_timestamp
+
+import logging
+log = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.jsonl"
+
+# Suffix of files that are still being downloaded
+PART_SUFFIX = ".part"
+
+# Suffix of the file recording which remote file a `.part` file is downloaded from
+ORIGIN_SUFFIX = ".origin" + PART_SUFFIX
+
+@dataclass
+class ManifestEntry:
+    """A downloaded file as recorded in the manifest."""
+    size: Optional[int] = None
+    last_modified: Optional[str] = None
+
+def same_timestamp(a: Optional[str], b: Optional[str]) -> bool:
+    """Decide whether two timestamps reported by the API are the same moment, however they are written."""
+    if a == b:
+        return True
+    moment = parse_timestamp(a)
+    return moment is not None and moment == parse_timestamp(b)
+
+@dataclass
+class PartOrigin:
+    """The remote file a `.part` file is downloaded from, kept next to it.
+
+    A `.part` file is only resumed while the remote file has the recorded
+    size and modification time, so that a file republished with the same
+    size is not completed with bytes of the new version.
+    """
+    size: Optional[int] = None
+    last_modified: Optional[str] = None
+
+    @staticmethod
+    def path_for(part_path: Path) -> Path:
+        """Get the location of the origin of `part_path`."""
+        return part_path.with_name(part_path.name[:-len(PART_SUFFIX)] + ORIGIN_SUFFIX)
+
+    @classmethod
+    def load(cls, part_path: Path) -> Optional[PartOrigin]:
+        """Load the origin of a `.part` file, or None if it was not recorded."""
+        path = cls.path_for(part_path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            return cls(size=record["size"], last_modified=record["last_modified"])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            log.debug(f"Ignoring unreadable origin {path}: {e!s}")
+            return None
+
+    def matches(self, other: Optional[PartOrigin]) -> bool:
+        """Decide whether a recorded origin is the same remote file."""
+        return (
+            other is not None
+            and self.size == other.size
+            and same_timestamp(self.last_modified, other.last_modified)
+        )
+
+    def save(self, part_path: Path) -> None:
+        """Record the origin of `part_path`, before the first byte is written to it."""
+        with open(self.path_for(part_path), "w", encoding="utf-8") as f:
+            json.dump({"size": self.size, "last_modified": self.last_modified}, f)
+
+    @classmethod
+    def remove(cls, part_path: Path) -> None:
+        try:
+            cls.path_for(part_path).unlink()
+        except FileNotFoundError:
+            pass
+
+def manifest_path(output_dir: Path, dataset_name: str, version: str) -> Path:
+    """Get the location of the manifest for a dataset version."""
+    return output_dir / f".{dataset_name}-{version}{MANIFEST_SUFFIX}"
+
+def scan_directory(directory: Path) -> Dict[str, int]:
+    """Recursively list the files below a directory with their sizes.
+
+    Hidden files (such as manifests) are left out. Paths are relative to
+    `directory` and use forward slashes, like the filenames of the KNMI API.
+
+    Args:
+        directory (Path): Directory to scan
+
+    Returns:
+        Dict[str, int]: Mapping of relative filename to size in bytes
+    """
+    sizes: Dict[str, int] = {}
+
+    def walk(path: str, prefix: str) -> None:
+        try:
+            entries = os.scandir(path)
+        except FileNotFoundError:
+            return
+        with entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    walk(entry.path, f"{prefix}{entry.name}/")
+                elif entry.is_file():
+                    sizes[f"{prefix}{entry.name}"] = entry.stat().st_size
+
+    walk(str(directory), "")
+    return sizes
+
+def stat_files(directory: Path, filenames: Iterable[str]) -> Dict[str, Optional[int]]:
+    """Get the sizes of some files below a directory.
+
+    Args:
+        directory (Path): Directory holding the files
+        filenames (Iterable[str]): Paths relative to `directory`
+
+    Returns:
+        Dict[str, int | None]: Mapping of filename to size in bytes, or to None if the file cannot be found or read
+    """
+    sizes: Dict[str, Optional[int]] = {}
+    for filename in filenames:
+        try:
+            sizes[filename] = (directory / filename).stat().st_size
+        except OSError:  # Missing, or a path through a file or an unreadable directory
+            sizes[filename] = None
+    return sizes
+
+def is_up_to_date(
+    local_size: Optional[int],
+    entry: Optional[ManifestEntry],
+    expected_size: Optional[int],
+    last_modified: Optional[str],
+) -> bool:
+    """Decide whether a local copy of a file can be kept.
+
+    A copy is stale when it is missing, when its size differs from the size
+    reported by the API (for example a file truncated by a killed process), or
+    when the manifest recorded an older `last_modified` than the API reports
+    (the file was republished). Unknown sizes and timestamps are not held
+    against the copy.
+
+    Args:
+        local_size (int | None): Size of the local copy, or None if there is none
+        entry (ManifestEntry | None): Manifest entry of the file, if any
+        expected_size (int | None): Size reported by the API
+        last_modified (str | None): Last modification time reported by the API
+
+    Returns:
+        bool: True if the local copy is complete and current
+    """
+    if local_size is None:
+        return False
+    if expected_size and local_size != expected_size:
+        return False
+    if entry is not None and entry.last_modified and last_modified:
+        # The same moment can be written differently, for example by a `FileListing`
+        if not same_timestamp(entry.last_modified, last_modified):
+            return False
+    return True
+
+class Manifest:
+    """Append-only log of the files downloaded for a dataset version.
+
+    The log is kept in the output directory as one JSON object per line and is
+    loaded into memory, so deciding whether a file was already downloaded is a
+    dictionary lookup instead of a filesystem probe.
+    """
+
+    def __init__(self, path: Path, entries: Dict[str, ManifestEntry]) -> None:
+        self.path = path
+        self.entries = entries
+        self._file: Optional[TextIO] = None
+
+    @classmethod
+    def load(
+        cls,
+        output_dir: Path,
+        dataset_name: str,
+        version: str,
+        local_sizes: Optional[Dict[str, int]] = None,
+    ) -> Manifest:
+        """Load the manifest of a dataset version, rebuilding it when missing.
+
+        A missing manifest is rebuilt from a scan of the output directory, so
+        files downloaded before the manifest existed are still recognised.
+
+        Args:
+            output_dir (Path): Output directory holding the downloaded files
+            dataset_name (str): Name of the dataset
+            version (str): Version of the dataset
+            local_sizes (Dict[str, int] | None): Result of an earlier `scan_directory` of the output directory, reused when rebuilding
+
+        Returns:
+            Manifest: The loaded manifest
+        """
+        path = manifest_path(output_dir, dataset_name, version)
+        if not path.exists():
+            manifest = cls.rebuild(output_dir, path, local_sizes)
+            log.debug(f"Rebuilt manifest {path} with {len(manifest)} files from a directory scan")
+            return manifest
+
+        entries: Dict[str, ManifestEntry] = {}
+        lines = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    record = json.loads(line)
+                    entries[record["filename"]] = ManifestEntry(
+                        size=record.get("size"),
+                        last_modified=record.get("last_modified"),
+                    )
+                except (ValueError, KeyError, TypeError):
+                    # A process killed mid-write can leave a truncated last line
+                    log.debug(f"Ignoring malformed manifest line in {path}")
+
+        manifest = cls(path, entries)
+        if lines > 2 * len(entries):
+            manifest.compact()
+        return manifest
+
+    @classmethod
+    def rebuild(
+        cls,
+        output_dir: Path,
+        path: Path,
+        local_sizes: Optional[Dict[str, int]] = None,
+    ) -> Manifest:
+        """Create a manifest from the files currently in the output directory.
+
+        The manifest is only written when the scan found files; otherwise it is
+        created by the first `record`, so a run that fails before downloading
+        anything leaves no trace in the output directory.
+        """
+        if local_sizes is None:
+            local_sizes = scan_directory(output_dir)
+        entries = {
+            filename: ManifestEntry(size=size)
+            for filename, size in local_sizes.items()
+            if not filename.endswith(PART_SUFFIX)
+        }
+        manifest = cls(path, entries)
+        if entries:
+            manifest.compact()
+        return manifest
+
+    def __contains__(self, filename: object) -> bool:
+        return filename in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.entries)
+
+    def get(self, filename: str) -> Optional[ManifestEntry]:
+        """Get the entry of a file, or None if it is not in the manifest."""
+        return self.entries.get(filename)
+
+    def record(self, filename: str, size: Optional[int], last_modified: Optional[str]) -> None:
+        """Record a downloaded file and append it to the log on disk."""
+        self.entries[filename] = ManifestEntry(size=size, last_modified=last_modified)
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Line buffered so every record reaches the file even if the process is killed
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        self._file.write(_encode(filename, self.entries[filename]))
+
+    def compact(self) -> None:
+        """Rewrite the log on disk with a single line per file."""
+        self.close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for filename, entry in self.entries.items():
+                f.write(_encode(filename, entry))
+        os.replace(tmp_path, self.path)
+
+    def close(self) -> None:
+        """Close the log file, if it was opened for appending."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def _encode(filename: str, entry: ManifestEntry) -> str:
+    return json.dumps(
+        {"filename": filename, "size": entry.size, "last_modified": entry.last_modified},
+        separators=(",", ":"),
+    ) + "\n"
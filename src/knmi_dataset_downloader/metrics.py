@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .defaults import DEFAULT_METRICS_HOST
+from .hooks import DownloadHooks
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets for request latencies (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Buckets for the throughput of a single download (bytes per second)
+THROUGHPUT_BUCKETS = tuple(float(2 ** n) for n in range(14, 31, 2))  # 16 KiB/s to 1 GiB/s
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric(ABC):
+    """A metric rendered in the Prometheus text exposition format."""
+    type = "untyped"
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, float]]:
+        """Names and values of the samples of this metric."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        lines += [f"{name} {_format_value(value)}" for name, value in self.samples()]
+        return "\n".join(lines) + "\n"
+
+class Counter(Metric):
+    """A value that only goes up, either counted here or read from `function`."""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, function: Optional[Callable[[], float]] = None) -> None:
+        super().__init__(name, help)
+        self.value = 0.0
+        self.function = function
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def samples(self) -> List[Tuple[str, float]]:
+        value = self.function() if self.function is not None else self.value
+        return [(f"{self.name}_total", value)]
+
+class Gauge(Metric):
+    """A value read from `function` whenever the metrics are collected."""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]) -> None:
+        super().__init__(name, help)
+        self.function = function
+
+    def samples(self) -> List[Tuple[str, float]]:
+        return [(self.name, self.function())]
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]) -> None:
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # The last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> List[Tuple[str, float]]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative))
+        samples.append((f"{self.name}_sum", self.sum))
+        samples.append((f"{self.name}_count", self.count))
+        return samples
+
+class DownloadMetrics(DownloadHooks):
+    """Metrics of a download run in the Prometheus text exposition format.
+
+    Latencies, throughput and written bytes are recorded from the download
+    hooks as they happen. Counters and gauges that already live elsewhere,
+    such as the retry counters or the queue depths, are registered with
+    `counter` and `gauge` and read when the metrics are collected. The
+    metrics can be scraped from a local HTTP endpoint started with `serve`,
+    or written to a file for the node exporter's textfile collector with
+    `write_textfile`.
+    """
+
+    def __init__(self, prefix: str = "knmi_download") -> None:
+        self.prefix = prefix
+        self.metrics: List[Metric] = []
+        self.listing_page_seconds = self.add(Histogram(
+            f"{prefix}_listing_page_seconds", "Time to fetch one page of the file listing", LATENCY_BUCKETS))
+        self.url_seconds = self.add(Histogram(
+            f"{prefix}_url_seconds", "Time to obtain a temporary download URL", LATENCY_BUCKETS))
+        self.first_byte_seconds = self.add(Histogram(
+            f"{prefix}_first_byte_seconds", "Time from sending a download request to its first byte", LATENCY_BUCKETS))
+        self.file_throughput = self.add(Histogram(
+            f"{prefix}_file_throughput_bytes_per_second", "Throughput of a single completed download", THROUGHPUT_BUCKETS))
+        self.bytes_written = self.add(Counter(
+            f"{prefix}_bytes_written", "Bytes written to disk"))
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def on_list_page(self, files: int, started: float, finished: float) -> None:
+        self.listing_page_seconds.observe(finished - started)
+
+    def on_url_resolved(self, filename: str, started: float, finished: float) -> None:
+        self.url_seconds.observe(finished - started)
+
+    def on_first_byte(self, filename: str, requested: float, received: float) -> None:
+        self.first_byte_seconds.observe(received - requested)
+
+    def on_write(self, filename: str, size: int, started: float, finished: float) -> None:
+        self.bytes_written.inc(size)
+
+    def on_file_done(self, filename: str, size: int, started: float, finished: float, success: bool) -> None:
+        if success and finished > started:
+            self.file_throughput.observe(size / (finished - started))
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, function: Callable[[], float]) -> Counter:
+        """Register a counter read from `function`."""
+        return self.add(Counter(f"{self.prefix}_{name}", help, function))
+
+    def gauge(self, name: str, help: str, function: Callable[[], float]) -> Gauge:
+        """Register a gauge read from `function`."""
+        return self.add(Gauge(f"{self.prefix}_{name}", help, function))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        return "".join(metric.render() for metric in self.metrics)
+
+    def write_textfile(self, path: str | Path) -> None:
+        """Write the metrics to a file, replacing it atomically."""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = DEFAULT_METRICS_HOST) -> int:
+        """Serve the metrics over HTTP from a background thread.
+
+        Args:
+            port (int): Port to listen on. With 0 a free port is chosen.
+            host (str): Address to listen on
+
+        Returns:
+            int: The port the metrics are served on
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass  # Scrapes are not worth a log line
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        """Stop serving the metrics."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
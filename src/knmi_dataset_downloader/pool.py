@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, TypeVar, Union
+
+T = TypeVar("T")
+
+class _SharedIterator(AsyncIterator[T]):
+    """Async iterator over a sync or async iterable that many workers can pull from."""
+
+    def __init__(self, items: Union[Iterable[T], AsyncIterable[T]]) -> None:
+        if isinstance(items, AsyncIterable):
+            self._async_iterator = items.__aiter__()
+            self._iterator = None
+        else:
+            self._async_iterator = None
+            self._iterator = iter(items)
+        # Async generators cannot be advanced by two coroutines at once
+        self._lock = asyncio.Lock()
+
+    def __aiter__(self) -> _SharedIterator[T]:
+        return self
+
+    async def __anext__(self) -> T:
+        if self._iterator is not None:
+            try:
+                return next(self._iterator)
+            except StopIteration:
+                raise StopAsyncIteration
+        async with self._lock:
+            return await self._async_iterator.__anext__()
+
+async def run_worker_pool(
+    items: Union[Iterable[T], AsyncIterable[T]],
+    handler: Callable[[T], Awaitable[None]],
+    concurrency: int,
+) -> None:
+    """Process items with a fixed number of long-lived worker coroutines.
+
+    Each worker pulls the next item from the shared iterator only when it is
+    idle, so memory and scheduling overhead depend on `concurrency` rather than
+    on the number of items. If a handler raises, the remaining workers are
+    cancelled and the first exception is propagated.
+
+    Args:
+        items (Iterable[T] | AsyncIterable[T]): Items to process, consumed lazily
+        handler (Callable[[T], Awaitable[None]]): Coroutine function called for every item
+        concurrency (int): Number of workers
+    """
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+
+    shared = _SharedIterator(items)
+
+    async def worker() -> None:
+        async for item in shared:
+            await handler(item)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
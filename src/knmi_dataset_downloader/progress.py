@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import TYPE_CHECKING, Dict, Optional, TextIO
+
+from .defaults import DEFAULT_PROGRESS_REPORT_INTERVAL
+
+if TYPE_CHECKING:
+    from tqdm.asyncio import tqdm
+
+# Available progress reporters
+PROGRESS_REPORTERS = ("tqdm", "log", "json", "none")
+
+class ProgressReporter:
+    """Receives the progress of a download run.
+
+    The base class ignores everything, so it doubles as the no-op reporter.
+    Totals grow while the listing is still paginating.
+    """
+
+    def add_total(self, files: int, size: int) -> None:
+        """Add listed files and their size in bytes to the totals."""
+
+    def skip_file(self, filename: str, size: int) -> None:
+        """Count a file whose local copy is up to date."""
+
+    def start_file(self, filename: str, size: int) -> None:
+        """Announce that a file of `size` bytes starts downloading."""
+
+    def advance(self, filename: str, delta: int) -> None:
+        """Add downloaded bytes of a file. A negative delta takes back bytes of a failed download."""
+
+    def end_file(self, filename: str, success: bool) -> None:
+        """Announce that a file finished downloading, or failed."""
+
+    def close(self) -> None:
+        """Report the final state and release resources."""
+
+    def __enter__(self) -> ProgressReporter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+class NullProgress(ProgressReporter):
+    """Reports nothing."""
+
+class TqdmProgress(ProgressReporter):
+    """Progress bars for the total bytes, the number of files and every active download."""
+
+    def __init__(self) -> None:
+        from tqdm.asyncio import tqdm  # Only needed for progress bars, not for headless runs
+
+        self._tqdm = tqdm
+        self.bytes_progress = tqdm(
+            total=0,
+            desc="Overall Progress",
+            unit="iB",
+            unit_scale=True,
+            unit_divisor=1024,
+            miniters=1,
+        )
+        self.files_progress = tqdm(
+            total=0,
+            desc="Files Progress",
+            unit="file",
+            leave=False,
+            miniters=1,
+        )
+        self.file_bars: Dict[str, tqdm] = {}
+
+    def add_total(self, files: int, size: int) -> None:
+        self.bytes_progress.total += size
+        self.files_progress.total += files
+        self.bytes_progress.refresh()
+        self.files_progress.refresh()
+
+    def skip_file(self, filename: str, size: int) -> None:
+        self.files_progress.update(n=1)
+        self.bytes_progress.update(n=size)
+
+    def start_file(self, filename: str, size: int) -> None:
+        self.file_bars[filename] = self._tqdm(
+            total=size,
+            desc=f"Downloading {filename}",
+            unit="iB",
+            unit_scale=True,
+            leave=False,
+        )
+
+    def advance(self, filename: str, delta: int) -> None:
+        bar = self.file_bars.get(filename)
+        if bar is not None:
+            bar.update(n=delta)
+        self.bytes_progress.update(n=delta)
+
+    def end_file(self, filename: str, success: bool) -> None:
+        bar = self.file_bars.pop(filename, None)
+        if bar is not None:
+            bar.close()
+        if success:
+            self.files_progress.update(n=1)
+
+    def close(self) -> None:
+        for bar in self.file_bars.values():
+            bar.close()
+        self.file_bars.clear()
+        self.files_progress.close()
+        self.bytes_progress.close()
+
+class AggregateProgress(ProgressReporter):
+    """Writes one aggregate status line at most every `interval` seconds.
+
+    Meant for cron jobs and containers, where progress bars only fill the
+    logs. Lines are written as plain text, or as JSON objects (JSON lines)
+    when `json_lines` is set. A status line is written when progress is
+    reported after the interval has passed, and once more on close.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_PROGRESS_REPORT_INTERVAL,
+        json_lines: bool = False,
+        stream: Optional[TextIO] = None,
+    ) -> None:
+        """Create an aggregate reporter.
+
+        Args:
+            interval (float): Minimum time between two status lines in seconds
+            json_lines (bool): Write JSON objects instead of plain text
+            stream (TextIO | None): Stream to write to. Defaults to standard error.
+        """
+        self.interval = interval
+        self.json_lines = json_lines
+        self.stream = stream
+        self.files_total = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.files_skipped = 0
+        self.files_failed = 0
+        self.bytes_done = 0
+        self.active = 0
+        self.started = time.monotonic()
+        self._reported = self.started
+        self._reported_bytes = 0
+
+    def add_total(self, files: int, size: int) -> None:
+        self.files_total += files
+        self.bytes_total += size
+        self._maybe_report()
+
+    def skip_file(self, filename: str, size: int) -> None:
+        self.files_done += 1
+        self.files_skipped += 1
+        self.bytes_done += size
+        self._maybe_report()
+
+    def start_file(self, filename: str, size: int) -> None:
+        self.active += 1
+
+    def advance(self, filename: str, delta: int) -> None:
+        self.bytes_done += delta
+        self._maybe_report()
+
+    def end_file(self, filename: str, success: bool) -> None:
+        self.active -= 1
+        if success:
+            self.files_done += 1
+        else:
+            self.files_failed += 1
+        self._maybe_report()
+
+    def close(self) -> None:
+        self.report()
+
+    def _maybe_report(self) -> None:
+        if time.monotonic() - self._reported >= self.interval:
+            self.report()
+
+    def report(self) -> None:
+        """Write a status line now."""
+        now = time.monotonic()
+        elapsed = now - self._reported
+        rate = (self.bytes_done - self._reported_bytes) / elapsed if elapsed > 0 else 0.0
+        self._reported = now
+        self._reported_bytes = self.bytes_done
+
+        if self.json_lines:
+            line = json.dumps({
+                "time": time.time(),
+                "elapsed": round(now - self.started, 3),
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "files_skipped": self.files_skipped,
+                "files_failed": self.files_failed,
+                "active": self.active,
+                "bytes_done": self.bytes_done,
+                "bytes_total": self.bytes_total,
+                "bytes_per_second": round(rate, 1),
+            })
+        else:
+            line = (
+                f"[{now - self.started:8.1f}s] "
+                f"files {self.files_done}/{self.files_total} "
+                f"(skipped {self.files_skipped}, failed {self.files_failed}, active {self.active}) "
+                f"| {self.bytes_done / 1024 / 1024:.1f}/{self.bytes_total / 1024 / 1024:.1f} MB "
+                f"| {rate / 1024 / 1024:.2f} MB/s"
+            )
+        stream = self.stream or sys.stderr
+        stream.write(line + "\n")
+        stream.flush()
+
+def make_progress(
+    reporter: str | ProgressReporter,
+    interval: float = DEFAULT_PROGRESS_REPORT_INTERVAL,
+) -> ProgressReporter:
+    """Get a progress reporter by name, or pass through a reporter instance.
+
+    Args:
+        reporter (str | ProgressReporter): One of `PROGRESS_REPORTERS`, or a reporter instance
+        interval (float): Minimum time between two status lines of the "log" and "json" reporters in seconds
+
+    Returns:
+        ProgressReporter: The progress reporter
+    """
+    if isinstance(reporter, ProgressReporter):
+        return reporter
+    if reporter == "tqdm":
+        return TqdmProgress()
+    if reporter == "log":
+        return AggregateProgress(interval)
+    if reporter == "json":
+        return AggregateProgress(interval, json_lines=True)
+    if reporter == "none":
+        return NullProgress()
+    raise ValueError(f"Unknown progress reporter: {reporter}")
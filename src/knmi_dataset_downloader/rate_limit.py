@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+class TokenBucket:
+    """Token bucket limiting the rate of requests.
+
+    Tokens are added continuously at `rate` per second up to `burst`, and every
+    request takes one. Waiting requests are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        """Create a token bucket.
+
+        Args:
+            rate (float): Sustained number of requests per second
+            burst (int | None): Maximum number of requests allowed at once. Defaults to `rate`, at least 1.
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        if self.burst < 1:
+            raise ValueError("Burst must be at least 1")
+        self.acquired = 0  # Number of requests let through
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+            self.acquired += 1
+
+    def install(self, client: httpx.AsyncClient) -> None:
+        """Limit every request sent through an HTTP client."""
+        async def limit(request: httpx.Request) -> None:
+            await self.acquire()
+
+        client.event_hooks["request"].append(limit)
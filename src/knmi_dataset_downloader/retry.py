@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, FrozenSet, Mapping, Optional, TypeVar
+
+import httpx
+from kiota_abstractions.api_error import APIError
+
+from .defaults import (
+    DEFAULT_MAX_ATTEMPTS,
+    DEFAULT_MAX_RETRY_AFTER,
+    DEFAULT_RETRY_BASE_DELAY,
+    DEFAULT_RETRY_BUDGET,
+    DEFAULT_RETRY_MAX_DELAY,
+)
+
+import logging
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Status codes that indicate a temporary problem on the server side
+RETRY_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Status codes that indicate the client is being throttled
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+# Status codes with which the API rejects the API key
+AUTH_STATUS_CODES = frozenset({401, 403})
+
+class RetryableError(Exception):
+    """A failure that is worth retrying, such as a download that ended early."""
+
+@dataclass
+class RetryPolicy:
+    """Configuration of how failed requests are retried.
+
+    Delays grow exponentially from `base_delay` up to `max_delay`, with full
+    jitter so that workers throttled at the same moment do not retry in
+    lockstep. A `Retry-After` header sent by the server takes precedence over
+    the computed delay and is waited for in full, also beyond `max_delay`; a
+    request asked to wait longer than `max_retry_after` is not retried.
+    `retry_budget` caps the number of retries over the whole run, so a
+    persistently failing API makes the run fail quickly instead of retrying
+    every file to exhaustion.
+    """
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    base_delay: float = DEFAULT_RETRY_BASE_DELAY
+    max_delay: float = DEFAULT_RETRY_MAX_DELAY
+    max_retry_after: Optional[float] = DEFAULT_MAX_RETRY_AFTER
+    retry_budget: Optional[int] = DEFAULT_RETRY_BUDGET
+    retry_status_codes: FrozenSet[int] = field(default_factory=lambda: RETRY_STATUS_CODES)
+
+    def backoff(self, attempt: int) -> float:
+        """Get the jittered delay before retrying after the given failed attempt (starting at 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+def status_code_of(error: BaseException) -> Optional[int]:
+    """Get the HTTP status code of a failed request, if the error carries one."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    if isinstance(error, APIError):
+        return error.response_status_code
+    return None
+
+def _headers_of(error: BaseException) -> Optional[Mapping[str, Any]]:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.headers
+    if isinstance(error, APIError):
+        return error.response_headers
+    return None
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Get the delay requested by a `Retry-After` header, in seconds.
+
+    Args:
+        error (BaseException): Error of a failed request
+
+    Returns:
+        float | None: The requested delay, or None if the server did not send one
+    """
+    headers = _headers_of(error)
+    if not headers:
+        return None
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+class Retrier:
+    """Runs operations under a retry policy with a retry budget shared by the whole run."""
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        on_throttle: Optional[Callable[[], None]] = None,
+        on_unauthorized: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> None:
+        """Create a retrier.
+
+        Args:
+            policy (RetryPolicy | None): Retry policy. Defaults to `RetryPolicy()`.
+            on_throttle (Callable[[], None] | None): Called whenever a request is throttled with a 429 or 503 response
+            on_unauthorized (Callable[[], Awaitable[bool]] | None): Called when the API rejects the API key with a 401
+                or 403 response. If it returns True, the key was replaced and the request is retried once right away.
+        """
+        self.policy = policy or RetryPolicy()
+        self.on_throttle = on_throttle
+        self.on_unauthorized = on_unauthorized
+        self.retries = 0
+        self.throttled = 0
+        self._budget_start = 0
+
+    @property
+    def budget_left(self) -> Optional[int]:
+        """Number of retries left in the budget, or None if it is unlimited."""
+        if self.policy.retry_budget is None:
+            return None
+        return max(0, self.policy.retry_budget - (self.retries - self._budget_start))
+
+    def reset_budget(self) -> None:
+        """Refill the retry budget, for example at the start of every poll of a long-running sync."""
+        self._budget_start = self.retries
+
+    def is_retryable(self, error: BaseException) -> bool:
+        """Decide whether an error is worth retrying."""
+        if isinstance(error, (RetryableError, httpx.TransportError)):
+            return True
+        status = status_code_of(error)
+        return status is not None and status in self.policy.retry_status_codes
+
+    async def call(self, operation: Callable[[], Awaitable[T]], description: str = "request") -> T:
+        """Run an operation, retrying it when it fails with a retryable error.
+
+        Args:
+            operation (Callable[[], Awaitable[T]]): Coroutine function performing one attempt
+            description (str): Description of the operation used in log messages
+
+        Returns:
+            T: The result of the first successful attempt
+
+        Raises:
+            Exception: The error of the last attempt, once attempts or the retry budget run out,
+                or immediately if the error is not retryable
+        """
+        attempt = 1
+        reauthorized = False
+        while True:
+            try:
+                return await operation()
+            except Exception as e:
+                # Only API errors: a 403 from a download URL means the URL expired, not the key
+                if (
+                    self.on_unauthorized is not None
+                    and not reauthorized
+                    and isinstance(e, APIError)
+                    and status_code_of(e) in AUTH_STATUS_CODES
+                ):
+                    reauthorized = True
+                    if await self.on_unauthorized():
+                        log.debug(f"Retrying {description} with a fresh API key")
+                        continue
+
+                if status_code_of(e) in THROTTLE_STATUS_CODES:
+                    self.throttled += 1
+                    if self.on_throttle is not None:
+                        self.on_throttle()
+
+                if not self.is_retryable(e) or attempt >= self.policy.max_attempts:
+                    raise
+                if self.budget_left == 0:
+                    log.warning(f"Retry budget exhausted, not retrying {description}")
+                    raise
+
+                delay = retry_after(e)
+                if delay is None:
+                    delay = self.policy.backoff(attempt)
+                elif self.policy.max_retry_after is not None and delay > self.policy.max_retry_after:
+                    # Retrying earlier than asked would only be throttled again
+                    log.warning(
+                        f"Not retrying {description}: the server asked to wait {delay:.0f}s, "
+                        f"longer than {self.policy.max_retry_after:.0f}s"
+                    )
+                    raise
+
+                self.retries += 1
+                log.debug(f"Retrying {description} in {delay:.1f}s after attempt {attempt} failed: {e!s}")
+                await asyncio.sleep(delay)
+                attempt += 1
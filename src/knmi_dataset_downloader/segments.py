@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from .manifest import PART_SUFFIX
+
+import logging
+log = logging.getLogger(__name__)
+
+# Suffix of the file tracking the segments of a segmented download, next to its `.part` file
+SEGMENTS_SUFFIX = ".segments" + PART_SUFFIX
+
+class RangeNotSupportedError(Exception):
+    """The server answered a range request with something other than the requested range."""
+
+@dataclass
+class Segment:
+    """A byte range of a segmented download, `start` inclusive and `end` exclusive."""
+    start: int
+    end: int
+    done: int = 0  # Bytes of the range written to the file
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+    @property
+    def complete(self) -> bool:
+        return self.done >= self.length
+
+def plan_segments(size: int, count: int) -> List[Segment]:
+    """Split a file of `size` bytes into `count` ranges of about equal length."""
+    count = max(1, min(count, size))
+    bounds = [size * index // count for index in range(count + 1)]
+    return [Segment(start, end) for start, end in zip(bounds, bounds[1:])]
+
+def preallocate(path: Path, size: int) -> None:
+    """Create or resize a file to `size` bytes, reserving the disk space where the platform supports it."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        os.ftruncate(fd, size)
+        if hasattr(os, "posix_fallocate") and size:
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                pass  # Not supported by the filesystem; the file stays sparse
+    finally:
+        os.close(fd)
+
+class SegmentState:
+    """Progress of a segmented download, kept next to its `.part` file.
+
+    The `.part` file of a segmented download is preallocated at its final
+    size, so unlike a sequential download its size says nothing about how
+    much was downloaded. The state records the bytes written per segment, so
+    an interrupted download resumes every segment where it stopped. It only
+    applies to the same remote file, identified by size and modification time.
+    """
+
+    def __init__(self, path: Path, size: int, last_modified: Optional[str], segments: List[Segment]) -> None:
+        self.path = path
+        self.size = size
+        self.last_modified = last_modified
+        self.segments = segments
+
+    @staticmethod
+    def path_for(part_path: Path) -> Path:
+        """Get the location of the state of the segmented download into `part_path`."""
+        return part_path.with_name(part_path.name[:-len(PART_SUFFIX)] + SEGMENTS_SUFFIX)
+
+    @property
+    def done(self) -> int:
+        """Number of bytes written over all segments."""
+        return sum(segment.done for segment in self.segments)
+
+    @classmethod
+    def load(cls, part_path: Path, size: int, last_modified: Optional[str]) -> Optional[SegmentState]:
+        """Load the state of an interrupted segmented download of the same remote file, if any."""
+        path = cls.path_for(part_path)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            segments = [Segment(start, end, done) for start, end, done in record["segments"]]
+            if record["size"] != size or record["last_modified"] != last_modified:
+                log.debug(f"Remote file of {part_path.name} changed, not resuming its segments")
+                return None
+            if part_path.stat().st_size != size:
+                return None
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            log.debug(f"Ignoring unreadable segment state {path}: {e!s}")
+            return None
+        return cls(path, size, last_modified, segments)
+
+    def save(self) -> None:
+        """Write the state to disk, replacing it atomically."""
+        tmp_path = self.path.with_name(self.path.name[:-len(PART_SUFFIX)] + ".tmp" + PART_SUFFIX)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "size": self.size,
+                "last_modified": self.last_modified,
+                "segments": [[segment.start, segment.end, segment.done] for segment in self.segments],
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+def discard_segments(part_path: Path) -> None:
+    """Remove an unfinished segmented download, so the file can be downloaded in one stream."""
+    for path in (part_path, SegmentState.path_for(part_path)):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .defaults import DEFAULT_POLL_OVERLAP
+from .knmi_dataset_api.models.file_summary import FileSummary
+
+import logging
+log = logging.getLogger(__name__)
+
+SYNC_STATE_SUFFIX = ".sync.json"
+
+# Version of the sync state file format
+SYNC_STATE_FORMAT = 1
+
+def sync_state_path(output_dir: Path, dataset_name: str, version: str) -> Path:
+    """Get the location of the sync state for a dataset version."""
+    return output_dir / f".{dataset_name}-{version}{SYNC_STATE_SUFFIX}"
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Parse a timestamp reported by the API into an aware UTC datetime, or None if it cannot be parsed."""
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return as_utc(moment)
+
+def as_utc(moment: datetime) -> datetime:
+    """Interpret a naive datetime as UTC, like the listing timestamps do."""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+class Watermark:
+    """Newest modification time seen in the listing of a dataset.
+
+    Polling lists everything modified since the watermark, minus an overlap
+    that catches files that show up in the listing a little later than their
+    modification time suggests. Files listed during the overlap are remembered
+    with their modification time, so only new and republished files are
+    returned by `update`.
+
+    Files returned by `update` stay pending until they are marked `done`. The
+    `cursor` is the time before which every listed file has been handled, and
+    is where an interrupted sync resumes.
+    """
+
+    def __init__(
+        self,
+        since: datetime,
+        overlap: timedelta = DEFAULT_POLL_OVERLAP,
+        timestamp: datetime | None = None,
+        recent: Dict[str, Optional[str]] | None = None,
+    ) -> None:
+        """Create a watermark.
+
+        Args:
+            since (datetime): Time from which files are followed. Naive datetimes are taken as UTC.
+            overlap (timedelta): How far before the watermark every poll starts listing
+            timestamp (datetime | None): Watermark to resume from. Defaults to `since`.
+            recent (Dict[str, str | None] | None): Files already seen near the watermark, with their last modification time
+        """
+        self.floor = as_utc(since)
+        self.timestamp = max(self.floor, as_utc(timestamp)) if timestamp is not None else self.floor
+        self.overlap = overlap
+        self.recent: Dict[str, Optional[str]] = dict(recent or {})  # Filename -> lastModified of the files listed in the overlap
+        self.pending: Dict[str, Optional[datetime]] = {}  # Filename -> lastModified of the files not handled yet
+        self.settled = True  # Whether every file modified before `timestamp` has been listed
+        self._resumed = self.timestamp
+
+    @property
+    def begin(self) -> datetime:
+        """Start of the time range to list on the next poll."""
+        return max(self.floor, self.timestamp - self.overlap)
+
+    @property
+    def cursor(self) -> datetime:
+        """Time before which every listed file has been handled."""
+        frontier = self.timestamp if self.settled else self._resumed
+        return min([frontier] + [moment for moment in self.pending.values() if moment is not None])
+
+    def update(self, files: Iterable[FileSummary], limit: int | None = None) -> List[FileSummary]:
+        """Advance the watermark over listed files.
+
+        Args:
+            files (Iterable[FileSummary]): Files from the listing
+            limit (int | None): Maximum number of files to return. The watermark does not advance over the files after them.
+
+        Returns:
+            List[FileSummary]: The files that were not seen before, or that were modified since
+        """
+        new = []
+        for file in files:
+            if limit is not None and len(new) >= limit:
+                break
+            if file.filename is None or self.recent.get(file.filename, "") == file.last_modified:
+                continue
+            self.recent[file.filename] = file.last_modified
+            moment = parse_timestamp(file.last_modified)
+            if moment is not None and moment > self.timestamp:
+                self.timestamp = moment
+            self.pending[file.filename] = moment
+            new.append(file)
+
+        begin = self.begin
+        self.recent = {
+            filename: last_modified
+            for filename, last_modified in self.recent.items()
+            if (parse_timestamp(last_modified) or begin) >= begin
+        }
+        return new
+
+    def done(self, filename: str) -> None:
+        """Mark a listed file as downloaded or already up to date."""
+        self.pending.pop(filename, None)
+
+class SyncState:
+    """Where the last sync of a dataset version got to, kept in the output directory.
+
+    Every file modified between `since` and `cursor` has been downloaded, so
+    a later run starting at or after `since` only needs to list from the
+    cursor onwards. Files seen shortly before the cursor are kept as well, so
+    they are not counted again when the overlap is listed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        since: datetime | None = None,
+        cursor: datetime | None = None,
+        recent: Dict[str, Optional[str]] | None = None,
+    ) -> None:
+        self.path = path
+        self.since = since
+        self.cursor = cursor
+        self.recent: Dict[str, Optional[str]] = recent or {}
+
+    @classmethod
+    def load(cls, output_dir: Path, dataset_name: str, version: str) -> SyncState:
+        """Load the sync state of a dataset version. A missing or unreadable state is empty."""
+        path = sync_state_path(output_dir, dataset_name, version)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            if record.get("format") != SYNC_STATE_FORMAT:
+                raise ValueError(f"unsupported format {record.get('format')!r}")
+            return cls(
+                path,
+                since=parse_timestamp(record.get("since")),
+                cursor=parse_timestamp(record.get("cursor")),
+                recent=dict(record.get("recent") or {}),
+            )
+        except FileNotFoundError:
+            return cls(path)
+        except (ValueError, TypeError, AttributeError) as e:
+            log.warning(f"Ignoring unreadable sync state {path}: {e!s}")
+            return cls(path)
+
+    def covers(self, start: datetime) -> bool:
+        """Whether the synced range includes `start`, so a sync from `start` can resume at the cursor."""
+        return self.since is not None and self.cursor is not None and self.since <= as_utc(start) <= self.cursor
+
+    def watermark(self, start: datetime, overlap: timedelta = DEFAULT_POLL_OVERLAP) -> Watermark:
+        """Get a watermark for a sync from `start`, resuming at the cursor when the synced range includes `start`."""
+        if not self.covers(start):
+            return Watermark(start, overlap)
+        return Watermark(start, overlap, timestamp=self.cursor, recent=self.recent)
+
+    def record(self, start: datetime, watermark: Watermark) -> None:
+        """Take over the progress of a sync from `start`."""
+        if not self.covers(start):
+            self.since = as_utc(start)
+        self.cursor = watermark.cursor
+        # Pending files were listed but not downloaded, so they must not be skipped as seen next time
+        self.recent = {
+            filename: last_modified
+            for filename, last_modified in watermark.recent.items()
+            if filename not in watermark.pending
+        }
+
+    def save(self) -> None:
+        """Write the state to disk, replacing it atomically."""
+        if self.since is None or self.cursor is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": SYNC_STATE_FORMAT,
+                "order_by": "lastModified",
+                "since": self.since.isoformat(),
+                "cursor": self.cursor.isoformat(),
+                "recent": self.recent,
+            }, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from .hooks import DownloadHooks
+
+def _ns(timestamp: float) -> int:
+    return int(timestamp * 1e9)
+
+class TracingHooks(DownloadHooks):
+    """Records the phases of a download run as OpenTelemetry spans.
+
+    Every listing page becomes a `knmi.list_page` span. Every download
+    becomes a `knmi.download_file` span with child spans for resolving its
+    download URL and waiting for the first byte, and attributes for the
+    number of chunks and the time spent handing buffers to the writer. Spans
+    are created once a phase is complete, with its real start and end times,
+    so any OpenTelemetry exporter configured on the tracer provider can be
+    used.
+    """
+
+    def __init__(self, tracer: Any = None) -> None:
+        """Create tracing hooks.
+
+        Args:
+            tracer (opentelemetry.trace.Tracer | None): Tracer to create spans with. Defaults to a tracer
+                from the global tracer provider.
+
+        Raises:
+            ImportError: If the `opentelemetry-api` package is not installed
+        """
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "Tracing requires the opentelemetry-api package, "
+                "install it with: pip install knmi-dataset-downloader[tracing]"
+            ) from e
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("knmi_dataset_downloader")
+        self._urls: Dict[str, List[Tuple[float, float]]] = {}
+        self._first_bytes: Dict[str, List[Tuple[float, float]]] = {}
+        self._chunks: Dict[str, int] = {}
+        self._write_seconds: Dict[str, float] = {}
+
+    def _span(self, name: str, started: float, finished: float, **kwargs: Any) -> Any:
+        span = self.tracer.start_span(name, start_time=_ns(started), **kwargs)
+        span.end(end_time=_ns(finished))
+        return span
+
+    def on_list_page(self, files: int, started: float, finished: float) -> None:
+        self._span("knmi.list_page", started, finished, attributes={"knmi.files": files})
+
+    def on_url_resolved(self, filename: str, started: float, finished: float) -> None:
+        self._urls.setdefault(filename, []).append((started, finished))
+
+    def on_first_byte(self, filename: str, requested: float, received: float) -> None:
+        self._first_bytes.setdefault(filename, []).append((requested, received))
+
+    def on_chunk(self, filename: str, size: int, received: float) -> None:
+        self._chunks[filename] = self._chunks.get(filename, 0) + 1
+
+    def on_write(self, filename: str, size: int, started: float, finished: float) -> None:
+        self._write_seconds[filename] = self._write_seconds.get(filename, 0.0) + finished - started
+
+    def on_file_done(self, filename: str, size: int, started: float, finished: float, success: bool) -> None:
+        urls = self._urls.pop(filename, [])
+        first_bytes = self._first_bytes.pop(filename, [])
+        # The download URL may have been resolved ahead of the download
+        span_start = min([started] + [begin for begin, _ in urls])
+
+        span = self.tracer.start_span(
+            "knmi.download_file",
+            start_time=_ns(span_start),
+            attributes={
+                "knmi.filename": filename,
+                "knmi.bytes": size,
+                "knmi.chunks": self._chunks.pop(filename, 0),
+                "knmi.write_seconds": self._write_seconds.pop(filename, 0.0),
+                "knmi.success": success,
+            },
+        )
+        if not success:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        parent = self._trace.set_span_in_context(span)
+        for begin, end in urls:
+            self._span("knmi.resolve_url", begin, end, context=parent)
+        for begin, end in first_bytes:
+            self._span("knmi.first_byte", begin, end, context=parent)
+        span.end(end_time=_ns(finished))
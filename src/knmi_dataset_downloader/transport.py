@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+
+from .defaults import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_KEEPALIVE_EXPIRY,
+    DEFAULT_READ_TIMEOUT,
+)
+
+@dataclass
+class TransportConfig:
+    """Connection pool and timeout settings shared by every HTTP client.
+
+    When `max_connections` is None the pool is sized from the download
+    concurrency, leaving room for the listing and download URL requests that
+    run next to the downloads.
+    """
+    max_connections: Optional[int] = None
+    max_keepalive_connections: Optional[int] = None
+    keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY
+    http2: bool = False
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT
+    read_timeout: float = DEFAULT_READ_TIMEOUT
+
+    def limits(self, concurrency: int) -> httpx.Limits:
+        """Get the pool limits for the given number of concurrent downloads."""
+        max_connections = self.max_connections or 2 * concurrency
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=self.max_keepalive_connections or max_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self) -> httpx.Timeout:
+        """Get the request timeouts.
+
+        Waiting for a free connection is not limited, since the pool is sized
+        to the concurrency and a wait only means all connections are busy.
+        """
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.read_timeout,
+            pool=None,
+        )
+
+class _BorrowedTransport(httpx.AsyncBaseTransport):
+    """Forwards requests to a shared transport without closing it with the client."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass  # Closed by the owning SharedTransport
+
+class SharedTransport:
+    """A single connection pool that all HTTP clients of a run are built on.
+
+    Clients created with `client()` share connections and TLS sessions, so the
+    API client, the download streams and the API key lookup do not each pay
+    for their own handshakes. Closing a client leaves the pool open; the pool
+    is closed with `aclose()`.
+    """
+
+    def __init__(self, config: TransportConfig | None = None, concurrency: int = 1) -> None:
+        """Create the shared connection pool.
+
+        Args:
+            config (TransportConfig | None): Pool and timeout settings. Defaults to `TransportConfig()`.
+            concurrency (int): Number of concurrent downloads the pool is sized for
+
+        Raises:
+            ImportError: If HTTP/2 is enabled but the `h2` package is not installed
+        """
+        self.config = config or TransportConfig()
+        if self.config.http2:
+            # httpx only imports h2 once a connection negotiates HTTP/2, in the middle of a download
+            try:
+                import h2  # noqa: F401
+            except ImportError as e:
+                raise ImportError(
+                    "HTTP/2 requires the h2 package, "
+                    "install it with: pip install knmi-dataset-downloader[http2]"
+                ) from e
+        self.transport = httpx.AsyncHTTPTransport(
+            limits=self.config.limits(concurrency),
+            http2=self.config.http2,
+        )
+
+    def client(self, **kwargs: Any) -> httpx.AsyncClient:
+        """Create an HTTP client that sends its requests through the shared pool."""
+        kwargs.setdefault("timeout", self.config.timeout())
+        return httpx.AsyncClient(transport=_BorrowedTransport(self.transport), **kwargs)
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        await self.transport.aclose()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .defaults import DEFAULT_URL_EXPIRY_MARGIN, DEFAULT_URL_TTL
+
+@dataclass
+class ResolvedUrl:
+    """A temporary download URL together with the moment it stops working."""
+    url: str
+    expires_at: float  # Unix timestamp
+
+    def is_expired(self, margin: float = DEFAULT_URL_EXPIRY_MARGIN) -> bool:
+        """Check whether the URL expires within `margin` seconds."""
+        return time.time() + margin >= self.expires_at
+
+def url_expiry(url: str, resolved_at: Optional[float] = None) -> float:
+    """Determine when a temporary download URL expires.
+
+    Pre-signed S3 URLs carry their signing time and lifetime in the
+    `X-Amz-Date` and `X-Amz-Expires` query parameters. For other URLs a
+    conservative default lifetime is assumed.
+
+    Args:
+        url (str): Temporary download URL
+        resolved_at (float | None): Unix timestamp at which the URL was obtained. Defaults to now.
+
+    Returns:
+        float: Unix timestamp at which the URL expires
+    """
+    if resolved_at is None:
+        resolved_at = time.time()
+
+    query = parse_qs(urlsplit(url).query)
+    expires = query.get("X-Amz-Expires")
+    signed = query.get("X-Amz-Date")
+    if expires:
+        try:
+            lifetime = float(expires[0])
+        except ValueError:
+            return resolved_at + DEFAULT_URL_TTL
+        if signed:
+            try:
+                signed_at = datetime.strptime(signed[0], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+                return signed_at.timestamp() + lifetime
+            except ValueError:
+                pass
+        return resolved_at + lifetime
+
+    return resolved_at + DEFAULT_URL_TTL
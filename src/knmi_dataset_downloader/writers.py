@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional
+
+# Available writer backends
+WRITERS = ("aiofiles", "thread")
+
+class FileWriter(ABC):
+    """Sequential writer for a download, starting at a given offset.
+
+    By default the writer appends to the first `offset` bytes of the file, or
+    truncates it when the offset is 0. A positional writer writes at `offset`
+    into an existing file and leaves the rest of it alone, for the segments
+    of a preallocated file.
+
+    Buffers passed to `write` are handed over to the writer and must not be
+    modified by the caller afterwards.
+    """
+
+    @abstractmethod
+    async def open(self) -> None:
+        """Open the file at the offset."""
+
+    @abstractmethod
+    async def write(self, data: bytearray) -> None:
+        """Write a buffer after the data written so far."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Flush the written data and close the file."""
+
+class AiofilesWriter(FileWriter):
+    """Writes every buffer through aiofiles' shared thread pool."""
+
+    def __init__(self, path: Path, offset: int, positional: bool = False) -> None:
+        self.path = path
+        self.offset = offset
+        self.positional = positional
+        self._file = None
+
+    async def open(self) -> None:
+        import aiofiles  # Not needed with the thread backend
+
+        if self.positional:
+            self._file = await aiofiles.open(file=self.path, mode="r+b")
+            await self._file.seek(self.offset)
+        else:
+            self._file = await aiofiles.open(file=self.path, mode="ab" if self.offset else "wb")
+
+    async def write(self, data: bytearray) -> None:
+        await self._file.write(data)
+
+    async def close(self) -> None:
+        await self._file.close()
+
+class ThreadWriter(FileWriter):
+    """Writes buffers from a dedicated thread with positional, vectored writes.
+
+    The event loop only enqueues buffers; the thread drains everything that
+    is waiting and writes it with a single `os.pwritev` call where available.
+    At most `max_pending` buffers wait at once, so a slow disk pushes back on
+    the download instead of filling up memory.
+    """
+
+    def __init__(self, path: Path, offset: int, max_pending: int = 8, positional: bool = False) -> None:
+        self.path = path
+        self.offset = offset
+        self.positional = positional
+        self._queue: queue.SimpleQueue[Optional[bytearray]] = queue.SimpleQueue()
+        self._slots = asyncio.Semaphore(max_pending)
+        self._loop = asyncio.get_running_loop()
+        self._done = self._loop.create_future()
+        self._error: Optional[BaseException] = None
+        self._fd: Optional[int] = None
+        self._thread = threading.Thread(target=self._run, name=f"writer-{path.name}", daemon=True)
+
+    async def open(self) -> None:
+        flags = os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        if not self.offset and not self.positional:
+            flags |= os.O_TRUNC
+        self._fd = os.open(self.path, flags, 0o666)
+        self._thread.start()
+
+    def _release(self, count: int) -> None:
+        for _ in range(count):
+            self._slots.release()
+
+    def _write_all(self, buffers: List[bytearray]) -> None:
+        position = self.offset
+        views = [memoryview(buffer) for buffer in buffers]
+        while views:
+            if hasattr(os, "pwritev"):
+                written = os.pwritev(self._fd, views, position)
+            else:
+                os.lseek(self._fd, position, os.SEEK_SET)
+                written = os.write(self._fd, views[0])
+            position += written
+            # Drop what was written, keeping the rest of a partially written buffer
+            while views and written >= len(views[0]):
+                written -= len(views[0])
+                views.pop(0)
+            if views and written:
+                views[0] = views[0][written:]
+        self.offset = position
+
+    def _run(self) -> None:
+        closing = False
+        while not closing:
+            buffers = [self._queue.get()]
+            while True:  # Collect everything that is already waiting
+                try:
+                    buffers.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if buffers[-1] is None:
+                closing = True
+                buffers.pop()
+            if buffers and self._error is None:
+                try:
+                    self._write_all(buffers)
+                except BaseException as e:
+                    self._error = e
+            if buffers:
+                self._loop.call_soon_threadsafe(self._release, len(buffers))
+
+        try:
+            os.close(self._fd)
+        except OSError as e:
+            self._error = self._error or e
+        self._loop.call_soon_threadsafe(self._done.set_result, None)
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    async def write(self, data: bytearray) -> None:
+        self._raise_error()
+        await self._slots.acquire()
+        self._queue.put(data)
+
+    async def close(self) -> None:
+        """Wait until every buffer is written and close the file."""
+        self._queue.put(None)
+        await asyncio.shield(self._done)
+        self._raise_error()
+
+async def open_writer(backend: str, path: Path, offset: int, positional: bool = False) -> FileWriter:
+    """Open a writer for a download.
+
+    Args:
+        backend (str): One of `WRITERS`
+        path (Path): File to write to
+        offset (int): Number of bytes already present in `path` to append after. With 0 the file is truncated.
+        positional (bool): Write at `offset` into the existing file instead, without truncating it
+
+    Returns:
+        FileWriter: The opened writer
+    """
+    if backend == "aiofiles":
+        writer: FileWriter = AiofilesWriter(path, offset, positional=positional)
+    elif backend == "thread":
+        writer = ThreadWriter(path, offset, positional=positional)
+    else:
+        raise ValueError(f"Unknown writer backend: {backend}")
+    await writer.open()
+    return writer
@@ -1,5 +1,26 @@
+import base64
+import json
+import os
+import shutil
+import tempfile
+import time
 import unittest
-from src.knmi_dataset_downloader.api_key import get_anonymous_api_key
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.knmi_dataset_downloader.api_key import (
+    AnonymousApiKey,
+    ApiKeyCache,
+    api_key_expiry,
+    get_anonymous_api_key,
+    make_api_key_cache,
+)
+from src.knmi_dataset_downloader.defaults import get_default_cache_dir
+
+
+def make_key(claims: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
 
 class TestApiKey(unittest.IsolatedAsyncioTestCase):
     """Test cases for the api_key module."""
@@ -17,5 +38,73 @@ class TestApiKey(unittest.IsolatedAsyncioTestCase):
         # Should be a base64 string (only contains valid base64 characters)
         self.assertTrue(all(c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_-' for c in api_key))
 
+class TestApiKeyCache(unittest.IsolatedAsyncioTestCase):
+    """Test cases for caching the anonymous API key."""
+
+    async def asyncSetUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.cache = ApiKeyCache(self.cache_dir / "key.json", ttl=timedelta(hours=1))
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_expiry_from_key(self):
+        """The exp claim should be read from a bare payload and from a JWT."""
+        exp = int(time.time()) + 3600
+        expected = datetime.fromtimestamp(exp, timezone.utc)
+        self.assertEqual(api_key_expiry(make_key({"exp": exp})), expected)
+        self.assertEqual(api_key_expiry(f"{make_key({'alg': 'HS256'})}.{make_key({'exp': exp})}.signature"), expected)
+        self.assertIsNone(api_key_expiry(make_key({"org": "knmi", "h": "murmur128"})))
+        self.assertIsNone(api_key_expiry("not-a-key"))
+
+    def test_default_cache_without_home(self):
+        """Without a home directory the key should not be cached, instead of failing."""
+        environ = {name: value for name, value in os.environ.items() if name not in ("HOME", "XDG_CACHE_HOME")}
+        with patch.dict(os.environ, environ, clear=True), \
+                patch.object(Path, "home", side_effect=RuntimeError("Could not determine home directory.")):
+            self.assertIsNone(get_default_cache_dir())
+            self.assertIsNone(make_api_key_cache(True))
+            self.assertEqual(make_api_key_cache(self.cache_dir / "key.json").path, self.cache_dir / "key.json")
+
+    def test_default_cache_location(self):
+        """The default cache should follow $XDG_CACHE_HOME."""
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": str(self.cache_dir)}):
+            cache = make_api_key_cache(True)
+        self.assertEqual(cache.path, self.cache_dir / "knmi-dataset-downloader" / "anonymous-api-key.json")
+        self.assertIsNone(make_api_key_cache(False))
+        self.assertIs(make_api_key_cache(self.cache), self.cache)
+
+    def test_cached_key_expires(self):
+        """A cached key should be used until its expiry, minus the margin."""
+        key = make_key({"org": "knmi"})
+        self.cache.put(key)
+        self.assertEqual(self.cache.get(), key)
+
+        self.cache.put(make_key({"exp": int(time.time()) + 60}))  # Within the default margin
+        self.assertIsNone(self.cache.get())
+
+        self.cache.path.write_text("garbage")
+        self.assertIsNone(self.cache.get())
+
+    async def test_uses_cached_key_and_refreshes_it(self):
+        """A cached key should be used without a request, and replaced when the API rejects it."""
+        self.cache.put("eyJold")
+        provider = MagicMock()
+        with patch(
+            "src.knmi_dataset_downloader.api_key.get_anonymous_api_key", AsyncMock(return_value="eyJnew")
+        ) as fetch:
+            key = AnonymousApiKey(cache=self.cache)
+            self.assertEqual(await key.get(), "eyJold")
+            fetch.assert_not_called()
+
+            key.bind(provider)
+            self.assertTrue(await key.refresh())
+            self.assertTrue(await key.refresh())  # Shares the refresh that just happened
+            self.assertEqual(fetch.await_count, 1)
+
+        self.assertEqual(provider.api_key, "eyJnew")
+        self.assertEqual(self.cache.get(), "eyJnew")
+
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
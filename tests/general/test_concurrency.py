@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+
+from src.knmi_dataset_downloader.concurrency import AdaptiveLimiter
+
+
+class TestAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the adaptive concurrency limiter."""
+
+    async def test_grows_while_throughput_holds(self):
+        """The limit should increase by one per window of steady downloads."""
+        limiter = AdaptiveLimiter(initial=2, maximum=10)
+        for _ in range(2 + 2 + 3):
+            limiter.record_success(1000, 1.0)
+        self.assertEqual(limiter.limit, 4)
+
+    async def test_halves_once_per_window_when_throttled(self):
+        """A burst of throttled requests should only halve the limit once."""
+        limiter = AdaptiveLimiter(initial=8)
+        for _ in range(5):
+            limiter.record_throttle()
+        self.assertEqual(limiter.limit, 4)
+
+    async def test_shrinks_on_errors_and_slowdowns(self):
+        """Failed downloads and a throughput collapse should reduce the limit."""
+        limiter = AdaptiveLimiter(initial=4)
+        for _ in range(4):
+            limiter.record_error()
+        self.assertEqual(limiter.limit, 2)
+
+        limiter = AdaptiveLimiter(initial=2)
+        for _ in range(2):
+            limiter.record_success(1000, 1.0)
+        for _ in range(3):
+            limiter.record_success(100, 1.0)
+        self.assertEqual(limiter.limit, 1)
+
+    async def test_limits_concurrent_holders(self):
+        """No more than `limit` coroutines should hold a slot at once."""
+        limiter = AdaptiveLimiter(initial=3)
+        peak = 0
+
+        async def hold():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.active)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(hold() for _ in range(10)))
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.active, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
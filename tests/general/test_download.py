@@ -0,0 +1,442 @@
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from src.knmi_dataset_downloader import DownloadStats
+from src.knmi_dataset_downloader.concurrency import AdaptiveLimiter
+from src.knmi_dataset_downloader.hooks import DownloadHooks
+from src.knmi_dataset_downloader.dataset import DownloadContext, IncompleteDownloadError, download_file
+from src.knmi_dataset_downloader.manifest import Manifest, PartOrigin, manifest_path
+from src.knmi_dataset_downloader.knmi_dataset_api.models.file_download import FileDownload
+from src.knmi_dataset_downloader.retry import Retrier, RetryPolicy
+from src.knmi_dataset_downloader.segments import Segment, SegmentState, preallocate
+from src.knmi_dataset_downloader.urls import ResolvedUrl
+
+CONTENT = bytes(range(256)) * 40
+
+
+def make_client() -> MagicMock:
+    """Build a fake API client that hands out a download URL for every file."""
+    client = MagicMock()
+    files_builder = client.v1.datasets.by_dataset_name.return_value.versions.by_version_id.return_value.files
+
+    def by_filename(filename):
+        builder = MagicMock()
+        builder.url.get = AsyncMock(
+            return_value=FileDownload(temporary_download_url=f"https://download.test/{filename}")
+        )
+        return builder
+
+    files_builder.by_filename.side_effect = by_filename
+    return client
+
+
+def serve(content: bytes, honour_range: bool = True):
+    """Build a transport handler serving `content`, optionally honouring range requests."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        range_header = request.headers.get("Range")
+        if range_header and honour_range:
+            start = int(range_header[len("bytes="):].rstrip("-"))
+            return httpx.Response(
+                206,
+                content=content[start:],
+                headers={"Content-Range": f"bytes {start}-{len(content) - 1}/{len(content)}"},
+            )
+        return httpx.Response(200, content=content)
+
+    return handler, requests
+
+
+class TestDownloadFile(unittest.IsolatedAsyncioTestCase):
+    """Test cases for downloading a single file."""
+
+    async def asyncSetUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def make_context(self, handler, max_attempts: int = 3) -> DownloadContext:
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(http_client.aclose)
+        return DownloadContext(
+            client=make_client(),
+            http_client=http_client,
+            dataset_name="dataset",
+            version="1",
+            output_dir=self.output_dir,
+            stats=DownloadStats(),
+            retrier=Retrier(RetryPolicy(max_attempts=max_attempts, base_delay=0)),
+        )
+
+    async def fetch(self, context: DownloadContext, download_url: Optional[ResolvedUrl] = None) -> None:
+        await download_file(
+            context=context,
+            filename="file.nc",
+            expected_size=len(CONTENT),
+            download_url=download_url,
+        )
+
+    async def test_downloads_through_part_file(self):
+        """A completed download should be renamed from its .part file."""
+        handler, _ = serve(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertFalse((self.output_dir / "file.nc.part").exists())
+        self.assertEqual(context.stats.downloaded_files, 1)
+
+    async def test_resumes_partial_download(self):
+        """An existing .part file should be resumed with a range request."""
+        (self.output_dir / "file.nc.part").write_bytes(CONTENT[:1000])
+        PartOrigin(size=len(CONTENT)).save(self.output_dir / "file.nc.part")
+        handler, requests = serve(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual(requests[0].headers["Range"], "bytes=1000-")
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual(context.stats.total_bytes_downloaded, len(CONTENT) - 1000)
+        self.assertEqual([path.name for path in self.output_dir.iterdir()], ["file.nc"])
+
+    async def test_restarts_part_file_of_republished_file(self):
+        """A .part file of an earlier version of the file should not be resumed."""
+        part_path = self.output_dir / "file.nc.part"
+        part_path.write_bytes(b"A" * 1000)
+        PartOrigin(size=len(CONTENT), last_modified="2024-01-01T00:00:00+00:00").save(part_path)
+        handler, requests = serve(CONTENT)
+        context = self.make_context(handler)
+        await download_file(
+            context=context,
+            filename="file.nc",
+            expected_size=len(CONTENT),
+            last_modified="2024-01-02T00:00:00+00:00",
+        )
+
+        self.assertNotIn("Range", requests[0].headers)
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+
+    async def test_restarts_part_file_of_unknown_origin(self):
+        """A .part file that does not record its remote file should not be resumed."""
+        (self.output_dir / "file.nc.part").write_bytes(b"A" * 1000)
+        handler, requests = serve(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertNotIn("Range", requests[0].headers)
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+
+    async def test_falls_back_when_range_is_ignored(self):
+        """If the server sends the whole file, the .part file should be rewritten."""
+        (self.output_dir / "file.nc.part").write_bytes(b"garbage")
+        handler, _ = serve(CONTENT, honour_range=False)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+
+    async def test_keeps_part_file_on_failure(self):
+        """A failed download should leave its .part file to resume from."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=CONTENT[:500])
+
+        context = self.make_context(handler, max_attempts=1)
+        with self.assertRaises(IncompleteDownloadError):
+            await self.fetch(context)
+
+        self.assertEqual(context.stats.failed_files, ["file.nc"])
+        self.assertFalse((self.output_dir / "file.nc").exists())
+        self.assertEqual((self.output_dir / "file.nc.part").stat().st_size, 500)
+
+    async def test_retries_and_resumes_cut_stream(self):
+        """A stream that ends early should be retried from where it stopped."""
+        attempts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            attempts.append(request.headers.get("Range"))
+            if len(attempts) == 1:
+                return httpx.Response(200, content=CONTENT[:3000])
+            return httpx.Response(
+                206,
+                content=CONTENT[3000:],
+                headers={"Content-Range": f"bytes 3000-{len(CONTENT) - 1}/{len(CONTENT)}"},
+            )
+
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual(attempts, [None, "bytes=3000-"])
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual(context.retrier.retries, 1)
+
+    async def test_uses_prefetched_url(self):
+        """A download URL resolved ahead of time should be used without asking the API again."""
+        handler, requests = serve(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context, ResolvedUrl(url="https://prefetched.test/file.nc", expires_at=time.time() + 600))
+
+        self.assertEqual(str(requests[0].url), "https://prefetched.test/file.nc")
+        files = context.client.v1.datasets.by_dataset_name.return_value.versions.by_version_id.return_value.files
+        files.by_filename.assert_not_called()
+
+    async def test_resolves_expiring_url_again(self):
+        """A download URL that is about to expire should be resolved again before downloading."""
+        handler, requests = serve(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context, ResolvedUrl(url="https://prefetched.test/file.nc", expires_at=time.time()))
+
+        self.assertEqual(str(requests[0].url), "https://download.test/file.nc")
+        self.assertEqual(context.stats.expired_urls, 1)
+
+    async def test_resolves_rejected_url_again(self):
+        """A download URL rejected with 403 should be resolved again and the download retried."""
+        serve_content, requests = serve(CONTENT)
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.host == "prefetched.test":
+                requests.append(request)
+                return httpx.Response(403)
+            return serve_content(request)
+
+        context = self.make_context(handler)
+        await self.fetch(context, ResolvedUrl(url="https://prefetched.test/file.nc", expires_at=time.time() + 600))
+
+        self.assertEqual([r.url.host for r in requests], ["prefetched.test", "download.test"])
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual(context.stats.expired_urls, 1)
+
+    async def test_keeps_buffered_bytes_when_stream_breaks(self):
+        """Bytes still in the write buffer should reach the .part file when the connection drops."""
+        class BrokenStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield CONTENT[:2000]
+                raise httpx.ReadError("connection reset")
+
+        class BrokenTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+                return httpx.Response(200, stream=BrokenStream())
+
+        context = self.make_context(serve(CONTENT)[0], max_attempts=1)
+        context.http_client = httpx.AsyncClient(transport=BrokenTransport())
+        context.chunk_size = 1000
+        self.addAsyncCleanup(context.http_client.aclose)
+        with self.assertRaises(httpx.ReadError):
+            await self.fetch(context)
+
+        self.assertEqual((self.output_dir / "file.nc.part").read_bytes(), CONTENT[:2000])
+
+    async def test_reports_phases_to_hooks(self):
+        """The phases of a download should be reported to the hooks."""
+        events = []
+
+        class Recorder(DownloadHooks):
+            def on_url_resolved(self, filename, started, finished):
+                events.append(("url", filename))
+
+            def on_first_byte(self, filename, requested, received):
+                events.append(("first_byte", filename))
+
+            def on_write(self, filename, size, started, finished):
+                events.append(("write", size))
+
+            def on_file_done(self, filename, size, started, finished, success):
+                events.append(("done", size, success))
+
+        handler, _ = serve(CONTENT)
+        context = self.make_context(handler)
+        context.hooks.append(Recorder())
+        await self.fetch(context)
+
+        self.assertEqual(events, [
+            ("url", "file.nc"),
+            ("first_byte", "file.nc"),
+            ("write", len(CONTENT)),
+            ("done", len(CONTENT), True),
+        ])
+
+    async def test_reports_failed_rename_to_hooks(self):
+        """A download whose .part file cannot be renamed should be reported to the hooks as failed only."""
+        done = []
+
+        class Recorder(DownloadHooks):
+            def on_file_done(self, filename, size, started, finished, success):
+                done.append(success)
+
+        handler, _ = serve(CONTENT)
+        context = self.make_context(handler)
+        context.hooks.append(Recorder())
+        with patch("os.replace", side_effect=PermissionError("denied")):
+            with self.assertRaises(PermissionError):
+                await self.fetch(context)
+
+        self.assertEqual(done, [False])
+        self.assertEqual(context.stats.failed_files, ["file.nc"])
+
+    async def test_records_nothing_when_rename_fails(self):
+        """A download whose .part file cannot be renamed should not count as completed."""
+        handler, _ = serve(CONTENT)
+        context = self.make_context(handler)
+        context.manifest = Manifest(manifest_path(self.output_dir, "dataset", "1"), {})
+        context.semaphore = AdaptiveLimiter(4)
+        with patch("os.replace", side_effect=PermissionError("denied")), \
+                patch.object(AdaptiveLimiter, "record_success") as record_success:
+            with self.assertRaises(PermissionError):
+                await self.fetch(context)
+
+        self.assertNotIn("file.nc", context.manifest)
+        record_success.assert_not_called()
+        self.assertEqual(context.stats.downloaded_files, 0)
+
+
+def serve_ranges(content: bytes, cut: Optional[dict] = None):
+    """Build a transport handler answering `bytes=start-end` requests, cutting the first answer for a start short."""
+    requests = []
+    cut = dict(cut or {})
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.headers.get("Range"))
+        first, last = request.headers["Range"][len("bytes="):].split("-")
+        start, end = int(first), int(last) + 1
+        body = content[start:cut.pop(start, end)]
+        return httpx.Response(
+            206,
+            content=body,
+            headers={"Content-Range": f"bytes {start}-{end - 1}/{len(content)}"},
+        )
+
+    return handler, requests
+
+
+class TestSegmentedDownload(unittest.IsolatedAsyncioTestCase):
+    """Test cases for downloading a large file in concurrent ranges."""
+
+    async def asyncSetUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def make_context(self, handler) -> DownloadContext:
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(http_client.aclose)
+        return DownloadContext(
+            client=make_client(),
+            http_client=http_client,
+            dataset_name="dataset",
+            version="1",
+            output_dir=self.output_dir,
+            stats=DownloadStats(),
+            retrier=Retrier(RetryPolicy(max_attempts=3, base_delay=0)),
+            segments=4,
+            segment_threshold=1000,
+        )
+
+    async def fetch(self, context: DownloadContext) -> None:
+        await download_file(context=context, filename="file.nc", expected_size=len(CONTENT))
+
+    async def test_downloads_ranges(self):
+        """A large file should be fetched in one range request per segment."""
+        handler, requests = serve_ranges(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual(sorted(requests), sorted(["bytes=0-2559", "bytes=2560-5119", "bytes=5120-7679", "bytes=7680-10239"]))
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual([path.name for path in self.output_dir.iterdir()], ["file.nc"])
+        self.assertEqual(context.stats.total_bytes_downloaded, len(CONTENT))
+
+    async def test_retries_a_cut_range(self):
+        """A range that ends early should be retried on its own from where it stopped."""
+        handler, requests = serve_ranges(CONTENT, cut={5120: 6000})
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual(len(requests), 5)
+        self.assertIn("bytes=6000-7679", requests)
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+
+    async def test_resumes_ranges(self):
+        """An interrupted segmented download should only fetch what its ranges are missing."""
+        part_path = self.output_dir / "file.nc.part"
+        preallocate(part_path, len(CONTENT))
+        with open(part_path, "r+b") as f:
+            f.write(CONTENT[:2560])
+            f.seek(5120)
+            f.write(CONTENT[5120:6000])
+        SegmentState(SegmentState.path_for(part_path), len(CONTENT), None, [
+            Segment(0, 2560, 2560), Segment(2560, 5120, 0), Segment(5120, 7680, 880), Segment(7680, 10240, 0),
+        ]).save()
+
+        handler, requests = serve_ranges(CONTENT)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual(sorted(requests), sorted(["bytes=2560-5119", "bytes=6000-7679", "bytes=7680-10239"]))
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual(context.stats.total_bytes_downloaded, len(CONTENT) - 2560 - 880)
+
+    async def test_stops_at_the_end_of_a_range(self):
+        """A range should not write past its end when the server sends more than was asked for."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            first, last = request.headers["Range"][len("bytes="):].split("-")
+            start = int(first)
+            # Claims the requested range but sends everything up to the end of the file
+            return httpx.Response(206, content=CONTENT[start:], headers={"Content-Range": f"bytes {start}-{last}/{len(CONTENT)}"})
+
+        written = []
+
+        class Recorder(DownloadHooks):
+            def on_write(self, filename, size, started, finished):
+                written.append(size)
+
+        context = self.make_context(handler)
+        context.hooks.append(Recorder())
+        await self.fetch(context)
+
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual(sum(written), len(CONTENT))
+
+    async def test_rejects_a_range_up_to_the_end_of_the_file(self):
+        """A server answering every range up to the end of the file should get a single stream instead."""
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request.headers.get("Range"))
+            range_header = request.headers.get("Range")
+            if range_header is None:
+                return httpx.Response(200, content=CONTENT)
+            start = int(range_header[len("bytes="):].split("-")[0])
+            return httpx.Response(
+                206, content=CONTENT[start:], headers={"Content-Range": f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}"}
+            )
+
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertIn(None, requests)
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual([path.name for path in self.output_dir.iterdir()], ["file.nc"])
+
+    async def test_falls_back_without_range_support(self):
+        """If the server ignores ranges, the file should be downloaded in one stream."""
+        handler, _ = serve(CONTENT, honour_range=False)
+        context = self.make_context(handler)
+        await self.fetch(context)
+
+        self.assertEqual((self.output_dir / "file.nc").read_bytes(), CONTENT)
+        self.assertEqual([path.name for path in self.output_dir.iterdir()], ["file.nc"])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
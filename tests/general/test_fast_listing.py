@@ -0,0 +1,78 @@
+import json
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import httpx
+from kiota_abstractions.api_error import APIError
+
+from benchmarks.mock_server import EPOCH, MockServer, MockServerConfig
+from src.knmi_dataset_downloader import DownloadStats
+from src.knmi_dataset_downloader.dataset import DownloadContext, get_files_list, initialize_client
+from src.knmi_dataset_downloader.fast_listing import FastListingClient, FileRecord, parse_listing_page
+from src.knmi_dataset_downloader.retry import Retrier, RetryPolicy
+
+
+class TestFastListing(unittest.IsolatedAsyncioTestCase):
+    """Test cases for listing files without the generated API client."""
+
+    def test_parse_listing_page(self):
+        """A listing body should be decoded into file records and the paging state."""
+        page = parse_listing_page(json.dumps({
+            "files": [{"filename": "a.nc", "size": 10, "created": "2024-01-01T00:00:00+00:00",
+                       "lastModified": "2024-01-01T00:10:00+00:00"}],
+            "isTruncated": True,
+            "nextPageToken": "token",
+        }).encode())
+
+        self.assertEqual(page.files, [FileRecord("a.nc", 10, "2024-01-01T00:00:00+00:00", "2024-01-01T00:10:00+00:00")])
+        self.assertTrue(page.is_truncated)
+        self.assertEqual(page.next_page_token, "token")
+        self.assertFalse(hasattr(page.files[0], "__dict__"))
+
+    async def test_matches_generated_client(self):
+        """The fast path should list the same files as the generated client."""
+        config = MockServerConfig(files=25, page_size=7)
+        with MockServer(config) as server:
+            async with httpx.AsyncClient() as http_client:
+                listings = []
+                for fast in (False, True):
+                    context = DownloadContext(
+                        client=initialize_client("mock", base_url=server.url),
+                        http_client=MagicMock(),
+                        dataset_name="dataset",
+                        version="1",
+                        output_dir=Path("."),
+                        stats=DownloadStats(),
+                        listing_client=FastListingClient(http_client, "mock", server.url) if fast else None,
+                    )
+                    files = await get_files_list(context, EPOCH, config.end(), limit=20)
+                    listings.append([(f.filename, f.size, f.created, f.last_modified) for f in files])
+
+        self.assertEqual(len(listings[0]), 20)
+        self.assertEqual(listings[0], listings[1])
+
+    async def test_errors_are_retried_like_api_errors(self):
+        """Failed pages should raise API errors carrying the status, so they are retried and throttled alike."""
+        responses = [httpx.Response(429, headers={"Retry-After": "0"}), httpx.Response(200, json={"files": []})]
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.assertEqual(request.headers["Authorization"], "key")
+            self.assertEqual(request.url.params["orderBy"], "lastModified")
+            return responses.pop(0)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+            client = FastListingClient(http_client, "key", "https://api.test")
+            with self.assertRaises(APIError) as raised:
+                await client.get_page("dataset", "1")
+            self.assertEqual(raised.exception.response_status_code, 429)
+
+            responses.insert(0, httpx.Response(429, headers={"Retry-After": "0"}))
+            retrier = Retrier(RetryPolicy(base_delay=0))
+            page = await retrier.call(lambda: client.get_page("dataset", "1"))
+        self.assertEqual(page.files, [])
+        self.assertEqual(retrier.throttled, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
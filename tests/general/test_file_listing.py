@@ -0,0 +1,63 @@
+import re
+import unittest
+from datetime import datetime, timezone
+
+from src.knmi_dataset_downloader import FileListing
+from src.knmi_dataset_downloader.fast_listing import FileRecord
+from src.knmi_dataset_downloader.knmi_dataset_api.models.file_summary import FileSummary
+
+
+def make_listing() -> FileListing:
+    return FileListing.from_files([
+        FileSummary(filename="b_2024.nc", size=300, created="2024-01-01T00:20:00+00:00", last_modified="2024-01-01T00:20:00+00:00"),
+        FileSummary(filename="a_2024.nc", size=100, created="2024-01-01T00:10:00Z", last_modified="2024-01-01T01:10:00.250000+01:00"),
+        FileSummary(filename="c_2023.txt", size=None, created=None, last_modified="2023-12-31T23:50:00+00:00"),
+        FileSummary(filename=None, size=5),
+    ])
+
+
+class TestFileListing(unittest.TestCase):
+    """Test cases for the columnar file listing."""
+
+    def test_round_trip(self):
+        """Files should come back as records with their timestamps normalized to UTC."""
+        listing = make_listing()
+
+        self.assertEqual(len(listing), 3)
+        self.assertEqual(listing[1], FileRecord("a_2024.nc", 100, "2024-01-01T00:10:00+00:00", "2024-01-01T00:10:00.250000+00:00"))
+        self.assertEqual(listing[-1], FileRecord("c_2023.txt", None, None, "2023-12-31T23:50:00+00:00"))
+        self.assertEqual([file.filename for file in listing[1:]], ["a_2024.nc", "c_2023.txt"])
+        self.assertEqual(listing.total_size, 400)
+        with self.assertRaises(IndexError):
+            listing[3]
+
+    def test_filters(self):
+        """Filters on time, size and filename should select matching files in order."""
+        listing = make_listing()
+
+        self.assertEqual(listing.between(datetime(2024, 1, 1)).filenames, ["b_2024.nc", "a_2024.nc"])
+        self.assertEqual(
+            listing.between(end=datetime(2024, 1, 1, 0, 15, tzinfo=timezone.utc)).filenames,
+            ["a_2024.nc", "c_2023.txt"],
+        )
+        self.assertEqual(listing.between(datetime(2023, 1, 1), field="created").filenames, ["b_2024.nc", "a_2024.nc"])
+        self.assertEqual(listing.sized(min_size=200).filenames, ["b_2024.nc"])
+        self.assertEqual(listing.sized(max_size=200).filenames, ["a_2024.nc"])
+        self.assertEqual(listing.matching("*_2024.nc").filenames, ["b_2024.nc", "a_2024.nc"])
+        self.assertEqual(listing.matching(re.compile(r"2023")).filenames, ["c_2023.txt"])
+        self.assertEqual(listing.matching("*.nc").sized(min_size=200).total_size, 300)
+
+    def test_sorted(self):
+        """Listings should sort on any column."""
+        listing = make_listing()
+
+        self.assertEqual(listing.sorted().filenames, ["c_2023.txt", "a_2024.nc", "b_2024.nc"])
+        self.assertEqual(listing.sorted("last_modified", reverse=True).filenames, ["b_2024.nc", "a_2024.nc", "c_2023.txt"])
+        self.assertEqual(listing.sorted("filename").filenames, ["a_2024.nc", "b_2024.nc", "c_2023.txt"])
+        self.assertEqual(listing.sorted("size")[0].filename, "c_2023.txt")
+        with self.assertRaises(ValueError):
+            listing.sorted("color")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from src.knmi_dataset_downloader import DownloadStats
+from src.knmi_dataset_downloader.dataset import (
+    DownloadContext,
+    get_files_list,
+    iter_file_pages,
+    merge_file_lists,
+    split_date_range,
+)
+from src.knmi_dataset_downloader.knmi_dataset_api.models.file_summary import FileSummary
+from src.knmi_dataset_downloader.knmi_dataset_api.models.list_files_response import ListFilesResponse
+
+
+def make_file(minute: int) -> FileSummary:
+    timestamp = f"2024-01-01T00:{minute:02d}:00+00:00"
+    return FileSummary(
+        filename=f"file_{minute:02d}.nc",
+        size=100,
+        last_modified=timestamp,
+        created=timestamp,
+    )
+
+
+def make_client(files, page_size: int = 2, inclusive_end: bool = False) -> MagicMock:
+    """Build a fake API client serving `files` filtered on begin/end, `page_size` per page."""
+    async def get(request_configuration):
+        params = request_configuration.query_parameters
+        selected = [
+            f for f in files
+            if params.begin <= f.last_modified and (f.last_modified <= params.end if inclusive_end else f.last_modified < params.end)
+        ]
+        offset = int(params.next_page_token or 0)
+        page = selected[offset:offset + page_size]
+        truncated = offset + page_size < len(selected)
+        return ListFilesResponse(
+            files=list(page),
+            is_truncated=truncated,
+            next_page_token=str(offset + page_size) if truncated else None,
+        )
+
+    client = MagicMock()
+    files_builder = client.v1.datasets.by_dataset_name.return_value.versions.by_version_id.return_value.files
+    files_builder.get = AsyncMock(side_effect=get)
+    return client
+
+
+class TestListing(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the file listing."""
+
+    def make_context(self, client) -> DownloadContext:
+        return DownloadContext(
+            client=client,
+            http_client=MagicMock(),
+            dataset_name="Actuele10mindataKNMIstations",
+            version="2",
+            output_dir=Path("."),
+            stats=DownloadStats(),
+        )
+
+    def test_split_date_range(self):
+        """Sub-windows should cover the range without gaps."""
+        start = datetime(2024, 1, 1)
+        end = datetime(2024, 1, 1, 10)
+        windows = split_date_range(start, end, timedelta(hours=4))
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[0][0], start)
+        self.assertEqual(windows[-1][1], end)
+        for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+            self.assertEqual(previous_end, next_start)
+
+    def test_merge_file_lists(self):
+        """Merged listings should be de-duplicated and ordered newest first."""
+        merged = merge_file_lists([[make_file(1), make_file(5)], [make_file(5), make_file(3)]])
+        self.assertEqual([f.filename for f in merged], ["file_05.nc", "file_03.nc", "file_01.nc"])
+
+    async def test_sharded_listing_matches_unsharded(self):
+        """A sharded listing should return the same files as a single listing."""
+        files = [make_file(minute) for minute in range(0, 60, 10)]
+        start = datetime(2024, 1, 1, 0, 0)
+        end = datetime(2024, 1, 1, 1, 0)
+
+        single = await get_files_list(self.make_context(make_client(files)), start, end)
+        sharded = await get_files_list(
+            self.make_context(make_client(files)),
+            start,
+            end,
+            shard_window=timedelta(minutes=20),
+            max_concurrent_listing=2,
+        )
+
+        self.assertEqual(len(sharded), len(files))
+        self.assertEqual({f.filename for f in sharded}, {f.filename for f in single})
+        self.assertEqual(sharded[0].filename, "file_50.nc")
+
+    async def test_sharded_listing_respects_limit(self):
+        """The limit should apply to the merged listing."""
+        files = [make_file(minute) for minute in range(0, 60, 10)]
+        sharded = await get_files_list(
+            self.make_context(make_client(files)),
+            datetime(2024, 1, 1, 0, 0),
+            datetime(2024, 1, 1, 1, 0),
+            limit=2,
+            shard_window=timedelta(minutes=15),
+        )
+        self.assertEqual([f.filename for f in sharded], ["file_50.nc", "file_40.nc"])
+
+    async def test_iter_file_pages_streams_pages(self):
+        """Pages should be yielded one by one and respect the limit."""
+        files = [make_file(minute) for minute in range(0, 60, 10)]
+        pages = [
+            page
+            async for page in iter_file_pages(
+                self.make_context(make_client(files, page_size=2)),
+                datetime(2024, 1, 1, 0, 0),
+                datetime(2024, 1, 1, 1, 0),
+                limit=5,
+            )
+        ]
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
+    async def list_sharded(self, files) -> list:
+        listed = []
+        async for page in iter_file_pages(
+            self.make_context(make_client(files, page_size=3, inclusive_end=True)),
+            datetime(2024, 1, 1, 0, 0),
+            datetime(2024, 1, 1, 1, 0),
+            shard_window=timedelta(minutes=10),
+            max_concurrent_listing=3,
+        ):
+            listed.extend(page)
+        return listed
+
+    async def test_iter_file_pages_sharded_deduplicates(self):
+        """Sharded streaming should yield files at the edge of two windows exactly once."""
+        files = [make_file(minute) for minute in range(0, 60, 5)]
+        listed = await self.list_sharded(files)
+        self.assertEqual(sorted(f.filename for f in listed), sorted(f.filename for f in files))
+
+    async def test_iter_file_pages_sharded_keeps_newest(self):
+        """A file held back at a window edge should give way to a newer entry of the same file."""
+        files = [make_file(minute) for minute in range(0, 60, 5)]
+        modified = FileSummary(filename="file_20.nc", size=200, last_modified="2024-01-01T00:27:00+00:00")
+        listed = await self.list_sharded([*files, modified])
+        self.assertEqual(sorted(f.filename for f in listed), sorted(f.filename for f in files))
+        self.assertEqual([f.size for f in listed if f.filename == "file_20.nc"], [200])
+
+    async def test_iter_file_pages_sharded_yields_republished_file_once(self):
+        """A file listed again in another window after being republished should be yielded once."""
+        files = [make_file(minute) for minute in range(0, 60, 5)]
+        republished = [
+            FileSummary(filename="file_20.nc", size=200, last_modified="2024-01-01T00:27:00+00:00"),
+            FileSummary(filename="file_15.nc", size=200, last_modified="2024-01-01T00:33:00+00:00"),
+        ]
+        for order in ([*files, *republished], [*republished, *files]):
+            with self.subTest(first=order[0].filename):
+                listed = await self.list_sharded(order)
+                self.assertEqual(sorted(f.filename for f in listed), sorted(f.filename for f in files))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from src.knmi_dataset_downloader import DownloadStats
+from src.knmi_dataset_downloader.dataset import DownloadContext, get_files_list
+from src.knmi_dataset_downloader.listing_cache import ListingCache
+from tests.general.test_listing import make_client, make_file
+
+
+class TestListingCache(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the on-disk listing cache."""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_context(self, client, cache: ListingCache) -> DownloadContext:
+        return DownloadContext(
+            client=client,
+            http_client=MagicMock(),
+            dataset_name="Actuele10mindataKNMIstations",
+            version="2",
+            output_dir=Path("."),
+            stats=DownloadStats(),
+            listing_cache=cache,
+        )
+
+    def test_buckets_are_aligned(self):
+        """Buckets should be aligned to their length, regardless of the range."""
+        cache = ListingCache(self.directory, bucket=timedelta(minutes=20))
+        buckets = cache.buckets(datetime(2024, 1, 1, 0, 5), datetime(2024, 1, 1, 0, 45))
+        self.assertEqual(
+            [start.minute for start, _ in buckets],
+            [0, 20, 40],
+        )
+        self.assertEqual(buckets[0][0].tzinfo, timezone.utc)
+
+    def test_open_bucket_expires(self):
+        """A bucket that was listed before it ended should expire after the TTL, a closed one should not."""
+        cache = ListingCache(self.directory, ttl=0.0)
+        closed = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        open_bucket = datetime.now(timezone.utc)
+        cache.put("dataset", "1", closed, [make_file(10)])
+        cache.put("dataset", "1", open_bucket, [make_file(20)])
+
+        self.assertEqual([f.filename for f in cache.get("dataset", "1", closed)], ["file_10.nc"])
+        self.assertIsNone(cache.get("dataset", "1", open_bucket))
+
+    def test_evicts_least_recently_used(self):
+        """Eviction should remove the least recently used buckets until the cache fits."""
+        cache = ListingCache(self.directory)
+        starts = [datetime(2024, 1, day, tzinfo=timezone.utc) for day in (1, 2, 3)]
+        for age, start in zip((30, 20, 10), starts):
+            cache.put("dataset", "1", start, [make_file(minute) for minute in range(50)])
+            path = cache.path("dataset", "1", start)
+            os.utime(path, (path.stat().st_atime, path.stat().st_mtime - age))
+
+        # Room for the two most recently used buckets, whose sizes differ slightly with the listing time
+        cache.max_size = sum(cache.path("dataset", "1", start).stat().st_size for start in starts[1:])
+        self.assertEqual(cache.evict(), 1)
+        self.assertIsNone(cache.get("dataset", "1", starts[0]))
+        self.assertIsNotNone(cache.get("dataset", "1", starts[2]))
+
+    async def test_lists_only_missing_buckets(self):
+        """An overlapping range should only list the buckets that are not cached yet."""
+        files = [make_file(minute) for minute in range(0, 60, 5)]
+        cache = ListingCache(self.directory, bucket=timedelta(minutes=20))
+        client = make_client(files, page_size=100)
+        files_builder = client.v1.datasets.by_dataset_name.return_value.versions.by_version_id.return_value.files
+
+        first = await get_files_list(self.make_context(client, cache), datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 1, 0, 40))
+        self.assertEqual(files_builder.get.await_count, 2)
+        self.assertEqual(len(first), 8)
+
+        second = await get_files_list(self.make_context(client, cache), datetime(2024, 1, 1, 0, 25), datetime(2024, 1, 1, 0, 55))
+        self.assertEqual(files_builder.get.await_count, 3)
+        self.assertEqual([f.filename for f in second], [f"file_{minute:02d}.nc" for minute in range(50, 20, -5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.knmi_dataset_downloader.manifest import (
+    Manifest,
+    ManifestEntry,
+    is_up_to_date,
+    manifest_path,
+    scan_directory,
+    stat_files,
+)
+
+
+class TestManifest(unittest.TestCase):
+    """Test cases for the download manifest."""
+
+    def setUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_records_survive_reload(self):
+        """Recorded files should be known after loading the manifest again."""
+        manifest = Manifest.load(self.output_dir, "dataset", "1")
+        manifest.record("a.nc", 10, "2024-01-01T00:00:00+00:00")
+        manifest.record("b.nc", 20, None)
+        manifest.close()
+
+        reloaded = Manifest.load(self.output_dir, "dataset", "1")
+        self.assertIn("a.nc", reloaded)
+        self.assertEqual(reloaded.get("a.nc").size, 10)
+        self.assertEqual(reloaded.get("a.nc").last_modified, "2024-01-01T00:00:00+00:00")
+        self.assertIn("b.nc", reloaded)
+        self.assertNotIn("c.nc", reloaded)
+
+    def test_rebuilds_from_directory_scan(self):
+        """A missing manifest should be rebuilt from the files on disk."""
+        (self.output_dir / "a.nc").write_bytes(b"12345")
+        (self.output_dir / "sub").mkdir()
+        (self.output_dir / "sub" / "b.nc").write_bytes(b"1")
+
+        manifest = Manifest.load(self.output_dir, "dataset", "1")
+
+        self.assertEqual(sorted(manifest), ["a.nc", "sub/b.nc"])
+        self.assertEqual(manifest.get("a.nc").size, 5)
+        self.assertTrue(manifest_path(self.output_dir, "dataset", "1").exists())
+
+    def test_written_on_first_record(self):
+        """Loading the manifest of an empty or missing directory should not write anything."""
+        output_dir = self.output_dir / "missing"
+        manifest = Manifest.load(output_dir, "dataset", "1")
+        self.assertFalse(output_dir.exists())
+
+        manifest.record("a.nc", 10, None)
+        manifest.close()
+        self.assertEqual(list(Manifest.load(output_dir, "dataset", "1")), ["a.nc"])
+
+    def test_stat_treats_unreadable_paths_as_missing(self):
+        """A path that cannot be examined should count as a missing file instead of failing the probe."""
+        (self.output_dir / "a.nc").write_bytes(b"123")
+        (self.output_dir / "file").write_bytes(b"1")
+        self.assertEqual(
+            stat_files(self.output_dir, ["a.nc", "file/b.nc", "missing.nc"]),
+            {"a.nc": 3, "file/b.nc": None, "missing.nc": None},
+        )
+
+    def test_ignores_truncated_lines(self):
+        """A partially written last line should not break loading."""
+        manifest = Manifest.load(self.output_dir, "dataset", "1")
+        manifest.record("a.nc", 10, None)
+        manifest.close()
+        with open(manifest.path, "a", encoding="utf-8") as f:
+            f.write('{"filename": "b.n')
+
+        reloaded = Manifest.load(self.output_dir, "dataset", "1")
+        self.assertEqual(list(reloaded), ["a.nc"])
+
+    def test_scan_skips_hidden_files(self):
+        """Manifests and other hidden files should not show up in a scan."""
+        (self.output_dir / "a.nc").write_bytes(b"1")
+        (self.output_dir / ".hidden").write_bytes(b"1")
+        self.assertEqual(scan_directory(self.output_dir), {"a.nc": 1})
+
+    def test_is_up_to_date(self):
+        """Missing, truncated and republished files should be downloaded again."""
+        entry = ManifestEntry(size=10, last_modified="2024-01-01T00:00:00+00:00")
+        self.assertTrue(is_up_to_date(10, entry, 10, "2024-01-01T00:00:00+00:00"))
+        self.assertFalse(is_up_to_date(None, entry, 10, "2024-01-01T00:00:00+00:00"))
+        self.assertFalse(is_up_to_date(4, entry, 10, "2024-01-01T00:00:00+00:00"))
+        self.assertFalse(is_up_to_date(10, entry, 10, "2024-02-01T00:00:00+00:00"))
+        # Copies found by a directory scan have no recorded timestamp
+        self.assertTrue(is_up_to_date(10, ManifestEntry(size=10), 10, "2024-02-01T00:00:00+00:00"))
+        self.assertTrue(is_up_to_date(10, None, 0, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
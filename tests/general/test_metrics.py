@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import httpx
+
+from src.knmi_dataset_downloader.metrics import DownloadMetrics, Histogram
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the download metrics."""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Histogram buckets should count all observations up to their bound."""
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        rendered = histogram.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', rendered)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3', rendered)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', rendered)
+        self.assertIn("latency_seconds_count 4", rendered)
+        self.assertIn("# TYPE latency_seconds histogram", rendered)
+
+    def test_registered_metrics_are_read_on_render(self):
+        """Counters and gauges backed by a function should show its current value."""
+        metrics = DownloadMetrics(prefix="test")
+        state = {"retries": 1}
+        metrics.counter("retries", "Retries", lambda: state["retries"])
+        metrics.gauge("queue_depth", "Queue depth", lambda: 7)
+        state["retries"] = 3
+
+        rendered = metrics.render()
+        self.assertIn("test_retries_total 3", rendered)
+        self.assertIn("test_queue_depth 7", rendered)
+
+    def test_write_textfile(self):
+        """The textfile should contain the rendered metrics."""
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory, True)
+        metrics = DownloadMetrics()
+        metrics.bytes_written.inc(1024)
+        metrics.write_textfile(directory / "knmi.prom")
+
+        self.assertIn("knmi_download_bytes_written_total 1024", (directory / "knmi.prom").read_text())
+        self.assertFalse((directory / "knmi.prom.tmp").exists())
+
+    def test_serve(self):
+        """The HTTP endpoint should serve the rendered metrics."""
+        metrics = DownloadMetrics()
+        port = metrics.serve(0)
+        self.addCleanup(metrics.close)
+        metrics.url_seconds.observe(0.2)
+
+        response = httpx.get(f"http://127.0.0.1:{port}/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("knmi_download_url_seconds_count 1", response.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
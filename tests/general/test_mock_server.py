@@ -0,0 +1,294 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from benchmarks.mock_server import EPOCH, MockServer, MockServerConfig
+from src.knmi_dataset_downloader import FileListing, download, list_files
+from src.knmi_dataset_downloader.api_key import ApiKeyCache
+from src.knmi_dataset_downloader.knmi_dataset_api.models.file_summary import FileSummary
+from src.knmi_dataset_downloader.retry import RetryPolicy
+
+
+class TestDownloadFromMockServer(unittest.IsolatedAsyncioTestCase):
+    """End-to-end test cases against the local mock API."""
+
+    async def asyncSetUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    async def run_download(self, config: MockServerConfig, **kwargs):
+        kwargs.setdefault("progress", "none")
+        with MockServer(config) as server:
+            stats = await download(
+                api_key="mock",
+                base_url=server.url,
+                output_dir=self.output_dir,
+                start_date=EPOCH.replace(tzinfo=None),
+                end_date=config.end().replace(tzinfo=None),
+                **kwargs,
+            )
+        return stats, server
+
+    async def test_downloads_every_page(self):
+        """All files of a paginated listing should be downloaded."""
+        config = MockServerConfig(files=25, file_size=1000, page_size=7)
+        stats, server = await self.run_download(config)
+
+        self.assertEqual(stats.downloaded_files, 25)
+        self.assertEqual(server.requests["list"], 4)
+        self.assertEqual(
+            sorted(path.name for path in self.output_dir.glob("*.nc")),
+            sorted(config.filename(index) for index in range(25)),
+        )
+
+    async def test_fast_listing_downloads_every_page(self):
+        """With the fast listing path, all files of a paginated listing should be downloaded."""
+        config = MockServerConfig(files=25, file_size=1000, page_size=7)
+        stats, server = await self.run_download(config, fast_listing=True)
+
+        self.assertEqual(stats.downloaded_files, 25)
+        self.assertEqual(server.requests["list"], 4)
+
+    async def test_downloads_given_listing(self):
+        """A filtered listing should be downloaded without listing again, and count as up to date afterwards."""
+        config = MockServerConfig(files=10, file_size=1000, page_size=4)
+        listing = FileListing.from_files(
+            FileSummary(filename=summary["filename"], size=summary["size"], last_modified=summary["lastModified"])
+            for summary in map(config.summary, range(10))
+        )
+        listing = listing.sorted("filename")[:6]
+        stats, server = await self.run_download(config, files=listing, limit=4)
+
+        self.assertEqual(stats.downloaded_files, 4)
+        self.assertEqual(server.requests["list"], 0)
+        self.assertEqual(sorted(path.name for path in self.output_dir.glob("*.nc")), listing.filenames[:4])
+
+        stats, server = await self.run_download(config)
+        self.assertEqual(stats.skipped_files, 4)
+        self.assertEqual(stats.downloaded_files, 6)
+
+    async def test_rerun_checks_only_new_files_on_disk(self):
+        """With a manifest, a rerun should neither scan the output directory nor stat the files it recorded."""
+        config = MockServerConfig(files=6, file_size=1000, page_size=4)
+        await self.run_download(config)
+        (self.output_dir / "unrelated").mkdir()
+        (self.output_dir / "unrelated" / "other.nc").write_bytes(b"1")
+
+        config.files = 9
+        from src.knmi_dataset_downloader import dataset, manifest
+        with patch.object(manifest, "scan_directory", side_effect=AssertionError("scanned")), \
+                patch.object(dataset, "stat_files", wraps=manifest.stat_files) as stat_files:
+            stats, _ = await self.run_download(config)
+
+        self.assertEqual(stats.skipped_files, 6)
+        self.assertEqual(stats.downloaded_files, 3)
+        probed = sorted(filename for call in stat_files.call_args_list for filename in call.args[1])
+        self.assertEqual(probed, sorted(config.filename(index) for index in range(6, 9)))
+
+    async def test_downloads_filtered_listing(self):
+        """A listing filtered in memory should be downloaded as given."""
+        config = MockServerConfig(files=20, file_size=1000, page_size=6)
+        with MockServer(config) as server:
+            listing = await list_files(
+                api_key="mock",
+                base_url=server.url,
+                start_date=EPOCH.replace(tzinfo=None),
+                end_date=config.end().replace(tzinfo=None),
+            )
+        selected = listing.between(end=config.modified(5))
+
+        self.assertEqual(len(listing), 20)
+        self.assertEqual(selected.filenames, [config.filename(index) for index in range(4, -1, -1)])
+        stats, _ = await self.run_download(config, files=selected)
+        self.assertEqual(stats.downloaded_files, 5)
+
+    async def test_serves_requested_range(self):
+        """The mock should answer a bounded range request with exactly that range."""
+        import httpx
+        config = MockServerConfig(files=1, file_size=1000)
+        with MockServer(config) as server:
+            async with httpx.AsyncClient(headers={"Authorization": "mock"}) as client:
+                url = (await client.get(
+                    f"{server.url}/v1/datasets/dataset/versions/1/files/{config.filename(0)}/url"
+                )).json()["temporaryDownloadUrl"]
+                whole = (await client.get(url)).content
+                response = await client.get(url, headers={"Range": "bytes=100-199"})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"], "bytes 100-199/1000")
+        self.assertEqual(response.content, whole[100:200])
+
+    async def test_segmented_download_fetches_every_byte_once(self):
+        """Segmented downloads from the mock should fetch each file once."""
+        config = MockServerConfig(files=2, file_size=100_000)
+        stats, server = await self.run_download(config, segments=4, segment_threshold=10_000)
+
+        self.assertEqual(stats.downloaded_files, 2)
+        self.assertEqual(server.requests["download"], 8)
+        self.assertEqual(server.bytes_sent, 200_000)
+        self.assertEqual([path.stat().st_size for path in self.output_dir.glob("*.nc")], [100_000, 100_000])
+
+    async def test_reports_failed_url_resolution(self):
+        """A file whose download URL cannot be resolved should be reported as failed to the progress and hooks."""
+        from src.knmi_dataset_downloader import dataset
+        from src.knmi_dataset_downloader.hooks import DownloadHooks
+        from src.knmi_dataset_downloader.progress import AggregateProgress
+
+        config = MockServerConfig(files=5, file_size=1000)
+        failing = config.filename(2)
+        resolve_download_url = dataset.resolve_download_url
+
+        async def resolve(context, filename):
+            if filename == failing:
+                raise ValueError("No download URL found")
+            return await resolve_download_url(context, filename)
+
+        done = []
+
+        class Recorder(DownloadHooks):
+            def on_file_done(self, filename, size, started, finished, success):
+                done.append((filename, success))
+
+        progress = AggregateProgress(interval=3600, stream=open(os.devnull, "w"))
+        self.addCleanup(progress.stream.close)
+        with patch.object(dataset, "resolve_download_url", side_effect=resolve):
+            stats, _ = await self.run_download(config, hooks=[Recorder()], progress=progress)
+
+        self.assertEqual(stats.failed_files, [failing])
+        self.assertEqual(stats.downloaded_files, 4)
+        self.assertIn((failing, False), done)
+        self.assertEqual(len(done), 5)
+        self.assertEqual((progress.files_failed, progress.files_done, progress.active), (1, 4, 0))
+
+    async def test_recovers_from_errors_and_throttling(self):
+        """Injected errors and 429 responses should be retried until every file is downloaded."""
+        config = MockServerConfig(files=20, file_size=1000, page_size=5, error_rate=0.1, throttle_rate=0.1, retry_after=0)
+        stats, server = await self.run_download(
+            config, retry_policy=RetryPolicy(max_attempts=10, base_delay=0.01, max_delay=0.05)
+        )
+
+        self.assertEqual(stats.downloaded_files, 20)
+        self.assertEqual(stats.failed_files, [])
+        self.assertEqual(stats.throttled_requests, server.requests["throttled"])
+
+    async def test_follow_downloads_new_files(self):
+        """In follow mode, files published after the initial range should be downloaded until stopped."""
+        config = MockServerConfig(files=5, file_size=1000, page_size=4)
+        stop = asyncio.Event()
+        with MockServer(config) as server:
+            run = asyncio.create_task(download(
+                api_key="mock",
+                base_url=server.url,
+                output_dir=self.output_dir,
+                start_date=EPOCH.replace(tzinfo=None),
+                end_date=config.end().replace(tzinfo=None),
+                progress="none",
+                follow=True,
+                poll_interval=0.05,
+                stop=stop,
+            ))
+            await self.wait_for_files(5)
+            config.files = 12  # Publish new files
+            await self.wait_for_files(12)
+            stop.set()
+            stats = await asyncio.wait_for(run, timeout=5)
+
+        self.assertEqual(stats.total_files, 12)
+        self.assertEqual(stats.downloaded_files, 12)
+        self.assertGreater(server.requests["list"], 3)
+
+    async def test_incremental_lists_only_the_delta(self):
+        """A second incremental run should list from where the first one stopped."""
+        config = MockServerConfig(files=30, file_size=1000, page_size=5)
+        with MockServer(config) as server:
+            first = await download(
+                api_key="mock",
+                base_url=server.url,
+                output_dir=self.output_dir,
+                start_date=EPOCH.replace(tzinfo=None),
+                end_date=config.end().replace(tzinfo=None),
+                progress="none",
+                incremental=True,
+            )
+            listed = server.requests["list"]
+            config.files = 33  # Publish new files
+            second = await download(
+                api_key="mock",
+                base_url=server.url,
+                output_dir=self.output_dir,
+                start_date=EPOCH.replace(tzinfo=None),
+                end_date=config.end().replace(tzinfo=None),
+                progress="none",
+                incremental=True,
+            )
+
+        self.assertEqual(first.downloaded_files, 30)
+        self.assertEqual(listed, 6)
+        self.assertEqual(second.downloaded_files, 3)
+        self.assertEqual(second.total_files, 3)
+        self.assertEqual(server.requests["list"] - listed, 1)
+
+    async def test_incremental_limit_counts_only_new_files(self):
+        """Files listed again in the overlap with the last sync should not count towards the limit."""
+        config = MockServerConfig(files=30, file_size=1000, page_size=5, interval=60)
+        first, _ = await self.run_download(config, incremental=True, limit=10)
+        second, _ = await self.run_download(config, incremental=True, limit=10)
+
+        self.assertEqual(first.downloaded_files, 10)
+        self.assertEqual(second.downloaded_files, 10)
+        self.assertEqual(second.skipped_files, 0)
+        self.assertEqual(
+            sorted(path.name for path in self.output_dir.glob("*.nc")),
+            sorted(config.filename(index) for index in range(20)),
+        )
+
+    async def test_unwritable_metrics_textfile_keeps_the_download_error(self):
+        """A metrics textfile that cannot be written should neither fail the run nor hide its error."""
+        config = MockServerConfig(files=3, file_size=1000)
+        textfile = self.output_dir / "missing" / "metrics.prom"
+        stats, _ = await self.run_download(config, metrics_textfile=textfile, metrics_interval=0.01)
+        self.assertEqual(stats.downloaded_files, 3)
+
+        with self.assertRaises(ConnectionError):
+            with patch("src.knmi_dataset_downloader.dataset.iter_file_pages", side_effect=ConnectionError("unreachable")):
+                await self.run_download(config, metrics_textfile=textfile)
+
+    async def test_refreshes_rejected_anonymous_key(self):
+        """A cached anonymous key the API rejects should be replaced by a fresh one."""
+        config = MockServerConfig(files=10, file_size=1000, page_size=5, api_key="eyJfresh")
+        cache = ApiKeyCache(self.output_dir / "key.json")
+        cache.put("eyJstale")
+        with patch(
+            "src.knmi_dataset_downloader.api_key.get_anonymous_api_key", AsyncMock(return_value="eyJfresh")
+        ) as fetch:
+            with MockServer(config) as server:
+                stats = await download(
+                    base_url=server.url,
+                    output_dir=self.output_dir,
+                    start_date=EPOCH.replace(tzinfo=None),
+                    end_date=config.end().replace(tzinfo=None),
+                    progress="none",
+                    api_key_cache=cache,
+                )
+
+        self.assertEqual(stats.downloaded_files, 10)
+        self.assertEqual(fetch.await_count, 1)
+        self.assertGreater(server.requests["unauthorized"], 0)
+        self.assertEqual(cache.get(), "eyJfresh")
+
+    async def wait_for_files(self, count: int, timeout: float = 5.0):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(list(self.output_dir.glob("*.nc"))) < count:
+            self.assertLess(loop.time(), deadline, f"Timed out waiting for {count} files")
+            await asyncio.sleep(0.02)
+
+
+if __name__ == '__main__':
+    unittest.main()
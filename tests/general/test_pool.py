@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+
+from src.knmi_dataset_downloader.pool import run_worker_pool
+
+
+class TestWorkerPool(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the worker pool."""
+
+    async def test_processes_every_item_within_concurrency(self):
+        """Every item should be handled while never exceeding the concurrency."""
+        processed = []
+        active = 0
+        peak = 0
+
+        async def handler(item: int) -> None:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0)
+            processed.append(item)
+            active -= 1
+
+        await run_worker_pool(range(100), handler, concurrency=4)
+
+        self.assertEqual(sorted(processed), list(range(100)))
+        self.assertLessEqual(peak, 4)
+
+    async def test_pulls_lazily_from_async_iterable(self):
+        """Items of an async iterable should only be pulled by idle workers."""
+        pulled = 0
+
+        async def items():
+            nonlocal pulled
+            for item in range(20):
+                pulled += 1
+                yield item
+
+        async def handler(item: int) -> None:
+            # At most one item per worker can be pulled ahead of the handled ones
+            self.assertLessEqual(pulled, item + 2)
+            await asyncio.sleep(0)
+
+        await run_worker_pool(items(), handler, concurrency=2)
+        self.assertEqual(pulled, 20)
+
+    async def test_propagates_handler_errors(self):
+        """The first handler error should be raised and stop the pool."""
+        async def handler(item: int) -> None:
+            if item == 3:
+                raise RuntimeError("boom")
+            await asyncio.sleep(0)
+
+        with self.assertRaises(RuntimeError):
+            await run_worker_pool(range(10), handler, concurrency=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import io
+import json
+import unittest
+
+from src.knmi_dataset_downloader.progress import (
+    AggregateProgress,
+    NullProgress,
+    ProgressReporter,
+    TqdmProgress,
+    make_progress,
+)
+
+
+class TestAggregateProgress(unittest.TestCase):
+    """Test cases for the periodic aggregate progress reporter."""
+
+    def run_files(self, reporter: AggregateProgress) -> None:
+        reporter.add_total(files=3, size=300)
+        reporter.skip_file("a", 100)
+        reporter.start_file("b", 100)
+        reporter.advance("b", 100)
+        reporter.end_file("b", success=True)
+        reporter.start_file("c", 100)
+        reporter.advance("c", 40)
+        reporter.advance("c", -40)
+        reporter.end_file("c", success=False)
+
+    def test_json_lines(self):
+        """Status lines should be JSON objects with the aggregate counters."""
+        stream = io.StringIO()
+        reporter = AggregateProgress(interval=3600, json_lines=True, stream=stream)
+        self.run_files(reporter)
+        reporter.close()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)  # Only the final report within the interval
+        status = json.loads(lines[0])
+        self.assertEqual(status["files_done"], 2)
+        self.assertEqual(status["files_total"], 3)
+        self.assertEqual(status["files_skipped"], 1)
+        self.assertEqual(status["files_failed"], 1)
+        self.assertEqual(status["bytes_done"], 200)
+        self.assertEqual(status["active"], 0)
+
+    def test_reports_every_interval(self):
+        """With a zero interval every update should write a status line."""
+        stream = io.StringIO()
+        reporter = AggregateProgress(interval=0, stream=stream)
+        self.run_files(reporter)
+
+        self.assertGreater(len(stream.getvalue().splitlines()), 1)
+        self.assertIn("files 2/3", stream.getvalue().splitlines()[-1])
+
+
+class TestMakeProgress(unittest.TestCase):
+    """Test cases for selecting a progress reporter."""
+
+    def test_by_name(self):
+        """Reporters should be selectable by name."""
+        self.assertIsInstance(make_progress("none"), NullProgress)
+        self.assertTrue(make_progress("json").json_lines)
+        with make_progress("tqdm") as reporter:
+            self.assertIsInstance(reporter, TqdmProgress)
+
+    def test_instance_is_passed_through(self):
+        """A reporter instance should be used as is."""
+        reporter = ProgressReporter()
+        self.assertIs(make_progress(reporter), reporter)
+
+    def test_unknown_name(self):
+        """An unknown reporter name should be rejected."""
+        with self.assertRaises(ValueError):
+            make_progress("fireworks")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.mock_server import EPOCH, MockServer, MockServerConfig
+from src.knmi_dataset_downloader import dataset, download
+from src.knmi_dataset_downloader.rate_limit import TokenBucket
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the token bucket rate limiter."""
+
+    async def test_burst_is_immediate(self):
+        """Requests within the burst should not wait."""
+        bucket = TokenBucket(rate=1, burst=5)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        self.assertLess(time.monotonic() - start, 0.1)
+
+    async def test_rate_is_enforced(self):
+        """Requests beyond the burst should be spread out at the configured rate."""
+        bucket = TokenBucket(rate=50, burst=1)
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+        # The first request uses the burst, the other five wait 1/50 s each
+        self.assertGreaterEqual(time.monotonic() - start, 5 / 50 * 0.9)
+
+    async def test_install_limits_client_requests(self):
+        """Requests sent through an HTTP client should take tokens from the bucket."""
+        bucket = TokenBucket(rate=0.01, burst=3)
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+        bucket.install(client)
+        async with client:
+            for _ in range(3):
+                await client.get("https://api.test/")
+        self.assertLess(bucket._tokens, 1)
+        self.assertEqual(bucket.acquired, 3)
+
+
+class TestRateLimitedDownload(unittest.IsolatedAsyncioTestCase):
+    """Test cases for rate limiting the API requests of a download."""
+
+    async def test_limits_listing_and_url_requests(self):
+        """Listing pages and download URLs, but not the downloads themselves, should take tokens."""
+        buckets = []
+
+        class RecordingBucket(TokenBucket):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                buckets.append(self)
+
+        config = MockServerConfig(files=6, file_size=1000, page_size=3)
+        for fast_listing in (False, True):
+            with self.subTest(fast_listing=fast_listing), tempfile.TemporaryDirectory() as output_dir:
+                buckets.clear()
+                with MockServer(config) as server, patch.object(dataset, "TokenBucket", RecordingBucket):
+                    started = time.monotonic()
+                    stats = await download(
+                        api_key="mock",
+                        base_url=server.url,
+                        output_dir=output_dir,
+                        start_date=EPOCH.replace(tzinfo=None),
+                        end_date=config.end().replace(tzinfo=None),
+                        progress="none",
+                        fast_listing=fast_listing,
+                        requests_per_second=20,
+                        burst=1,
+                    )
+                    elapsed = time.monotonic() - started
+
+                self.assertEqual(stats.downloaded_files, 6)
+                self.assertEqual(buckets[0].acquired, server.requests["list"] + server.requests["url"])
+                # The first request uses the burst, the other seven wait 1/20 s each
+                self.assertEqual(buckets[0].acquired, 8)
+                self.assertGreaterEqual(elapsed, 7 / 20 * 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
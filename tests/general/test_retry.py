@@ -0,0 +1,131 @@
+import asyncio
+import unittest
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from kiota_abstractions.api_error import APIError
+
+from src.knmi_dataset_downloader.retry import Retrier, RetryPolicy, retry_after
+
+
+def status_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://api.test/")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+class TestRetry(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the retry policy."""
+
+    def test_retry_after_seconds_and_date(self):
+        """Both forms of the Retry-After header should be understood."""
+        self.assertEqual(retry_after(status_error(429, {"Retry-After": "7"})), 7.0)
+        moment = datetime.now(timezone.utc) + timedelta(seconds=30)
+        delay = retry_after(status_error(503, {"Retry-After": format_datetime(moment, usegmt=True)}))
+        self.assertTrue(25 <= delay <= 30)
+        self.assertIsNone(retry_after(status_error(503)))
+
+    def test_backoff_is_bounded(self):
+        """Backoff delays should never exceed the maximum delay."""
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        for attempt in range(1, 10):
+            self.assertLessEqual(policy.backoff(attempt), 5)
+
+    async def test_retries_throttled_requests(self):
+        """A throttled request should be retried until it succeeds."""
+        retrier = Retrier(RetryPolicy(max_attempts=3, base_delay=0))
+        calls = 0
+
+        async def operation():
+            nonlocal calls
+            calls += 1
+            if calls < 3:
+                raise status_error(429, {"Retry-After": "0"})
+            return "ok"
+
+        self.assertEqual(await retrier.call(operation), "ok")
+        self.assertEqual(retrier.retries, 2)
+        self.assertEqual(retrier.throttled, 2)
+
+    async def test_waits_for_retry_after_beyond_max_delay(self):
+        """A Retry-After longer than the maximum backoff should be waited for in full."""
+        retrier = Retrier(RetryPolicy(max_attempts=2, max_delay=0.01, max_retry_after=1))
+        calls = []
+
+        async def operation():
+            calls.append(asyncio.get_running_loop().time())
+            if len(calls) == 1:
+                raise status_error(429, {"Retry-After": "0.2"})
+            return "ok"
+
+        self.assertEqual(await retrier.call(operation), "ok")
+        self.assertGreaterEqual(calls[1] - calls[0], 0.2)
+
+    async def test_gives_up_on_long_retry_after(self):
+        """A request asked to wait longer than max_retry_after should fail instead of retrying early."""
+        retrier = Retrier(RetryPolicy(max_attempts=5, max_retry_after=60))
+
+        async def operation():
+            raise status_error(429, {"Retry-After": "120"})
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await retrier.call(operation)
+        self.assertEqual(retrier.retries, 0)
+        self.assertEqual(retrier.throttled, 1)
+
+    async def test_does_not_retry_client_errors(self):
+        """Errors such as 404 should be raised immediately."""
+        retrier = Retrier(RetryPolicy(base_delay=0))
+
+        async def operation():
+            raise status_error(404)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await retrier.call(operation)
+        self.assertEqual(retrier.retries, 0)
+
+    async def test_retry_budget_is_shared(self):
+        """Once the budget is spent, failures should no longer be retried."""
+        retrier = Retrier(RetryPolicy(max_attempts=10, base_delay=0, retry_budget=3))
+
+        async def operation():
+            raise httpx.ConnectError("unreachable")
+
+        for _ in range(2):
+            with self.assertRaises(httpx.ConnectError):
+                await retrier.call(operation)
+        self.assertEqual(retrier.retries, 3)
+        self.assertEqual(retrier.budget_left, 0)
+
+
+    async def test_refreshes_rejected_api_key_once(self):
+        """A request the API rejects with 403 should be retried once after the key is refreshed."""
+        refreshes = 0
+
+        async def refresh():
+            nonlocal refreshes
+            refreshes += 1
+            return True
+
+        retrier = Retrier(RetryPolicy(base_delay=0), on_unauthorized=refresh)
+
+        async def operation():
+            raise APIError("Forbidden", response_status_code=403)
+
+        with self.assertRaises(APIError):
+            await retrier.call(operation)
+        self.assertEqual(refreshes, 1)
+        self.assertEqual(retrier.retries, 0)
+
+        # A 403 from a download URL means the URL expired, not the key
+        async def download():
+            raise status_error(403)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await retrier.call(download)
+        self.assertEqual(refreshes, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
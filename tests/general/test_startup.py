@@ -0,0 +1,30 @@
+import unittest
+
+from benchmarks.startup import HEAVY_MODULES, PACKAGE, import_times
+
+
+class TestStartup(unittest.TestCase):
+    """Test cases for the import cost of the CLI and the package."""
+
+    def test_cli_does_not_import_download_stack(self):
+        """Importing the CLI should not load httpx, kiota, tqdm or aiofiles."""
+        for module in (f"{PACKAGE}.cli", PACKAGE):
+            with self.subTest(module=module):
+                imported = import_times(module)
+                self.assertIn(module, imported)
+                self.assertEqual([name for name in HEAVY_MODULES if name in imported], [])
+
+    def test_lazy_exports(self):
+        """Names exported by the package should be importable on first use."""
+        import src.knmi_dataset_downloader as package
+        from src.knmi_dataset_downloader.dataset import download
+
+        self.assertIs(package.download, download)
+        for name in package.__all__:
+            self.assertTrue(hasattr(package, name), name)
+        with self.assertRaises(AttributeError):
+            package.missing
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from src.knmi_dataset_downloader.knmi_dataset_api.models.file_summary import FileSummary
+from src.knmi_dataset_downloader.sync import SyncState, Watermark, parse_timestamp, sync_state_path
+
+
+def make_file(minute: int, name: Optional[str] = None) -> FileSummary:
+    return FileSummary(
+        filename=name or f"file_{minute:02d}.nc",
+        size=100,
+        last_modified=f"2024-01-01T00:{minute:02d}:00+00:00",
+    )
+
+
+class TestWatermark(unittest.TestCase):
+    """Test cases for following the listing from a watermark."""
+
+    def test_parse_timestamp(self):
+        """Listing timestamps should be parsed as UTC, naive or not."""
+        expected = datetime(2024, 1, 1, 0, 10, tzinfo=timezone.utc)
+        self.assertEqual(parse_timestamp("2024-01-01T00:10:00+00:00"), expected)
+        self.assertEqual(parse_timestamp("2024-01-01T00:10:00Z"), expected)
+        self.assertEqual(parse_timestamp("2024-01-01T01:10:00+01:00"), expected)
+        self.assertIsNone(parse_timestamp("yesterday"))
+        self.assertIsNone(parse_timestamp(None))
+
+    def test_update_returns_only_new_files(self):
+        """Files listed again by an overlapping poll should not be returned twice."""
+        watermark = Watermark(datetime(2024, 1, 1), overlap=timedelta(minutes=15))
+        first = watermark.update([make_file(0), make_file(10), make_file(20)])
+        self.assertEqual(len(first), 3)
+        self.assertEqual(watermark.timestamp, datetime(2024, 1, 1, 0, 20, tzinfo=timezone.utc))
+        self.assertEqual(watermark.begin, datetime(2024, 1, 1, 0, 5, tzinfo=timezone.utc))
+
+        second = watermark.update([make_file(10), make_file(20), make_file(30)])
+        self.assertEqual([file.filename for file in second], ["file_30.nc"])
+
+    def test_update_returns_republished_files(self):
+        """A file listed with a newer modification time should be returned again."""
+        watermark = Watermark(datetime(2024, 1, 1))
+        watermark.update([make_file(10)])
+        republished = watermark.update([make_file(12, name="file_10.nc")])
+        self.assertEqual([file.last_modified for file in republished], ["2024-01-01T00:12:00+00:00"])
+
+    def test_begin_never_precedes_start(self):
+        """The overlap should not reach back before the time the watermark was created."""
+        watermark = Watermark(datetime(2024, 1, 1), overlap=timedelta(hours=1))
+        watermark.update([make_file(5)])
+        self.assertEqual(watermark.begin, datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+    def test_cursor_waits_for_pending_files(self):
+        """The cursor should not pass files that were listed but not handled yet."""
+        watermark = Watermark(datetime(2024, 1, 1))
+        watermark.update([make_file(10), make_file(20), make_file(30)])
+        self.assertEqual(watermark.cursor, datetime(2024, 1, 1, 0, 10, tzinfo=timezone.utc))
+        watermark.done("file_10.nc")
+        watermark.done("file_30.nc")
+        self.assertEqual(watermark.cursor, datetime(2024, 1, 1, 0, 20, tzinfo=timezone.utc))
+        watermark.done("file_20.nc")
+        self.assertEqual(watermark.cursor, datetime(2024, 1, 1, 0, 30, tzinfo=timezone.utc))
+
+    def test_cursor_stays_while_listing_is_unordered(self):
+        """Until an unordered listing completes, the cursor should stay where the sync resumed."""
+        watermark = Watermark(datetime(2024, 1, 1))
+        watermark.settled = False
+        watermark.update([make_file(30)])
+        watermark.done("file_30.nc")
+        self.assertEqual(watermark.cursor, datetime(2024, 1, 1, tzinfo=timezone.utc))
+        watermark.settled = True
+        self.assertEqual(watermark.cursor, datetime(2024, 1, 1, 0, 30, tzinfo=timezone.utc))
+
+
+class TestSyncState(unittest.TestCase):
+    """Test cases for the persisted sync state."""
+
+    def setUp(self):
+        self.output_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """A saved state should resume at its cursor, without the files that were still pending."""
+        state = SyncState.load(self.output_dir, "dataset", "1")
+        watermark = state.watermark(datetime(2024, 1, 1))
+        watermark.update([make_file(10), make_file(20)])
+        watermark.done("file_10.nc")
+        state.record(datetime(2024, 1, 1), watermark)
+        state.save()
+
+        loaded = SyncState.load(self.output_dir, "dataset", "1")
+        self.assertEqual(loaded.since, datetime(2024, 1, 1, tzinfo=timezone.utc))
+        self.assertEqual(loaded.cursor, datetime(2024, 1, 1, 0, 20, tzinfo=timezone.utc))
+        self.assertEqual(loaded.recent, {"file_10.nc": "2024-01-01T00:10:00+00:00"})
+
+        resumed = loaded.watermark(datetime(2024, 1, 1))
+        self.assertEqual([file.filename for file in resumed.update([make_file(10), make_file(20)])], ["file_20.nc"])
+
+    def test_start_outside_synced_range(self):
+        """A sync starting before the synced range, or after its cursor, should start over."""
+        state = SyncState(
+            sync_state_path(self.output_dir, "dataset", "1"),
+            since=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            cursor=datetime(2024, 2, 1, tzinfo=timezone.utc),
+        )
+        self.assertTrue(state.covers(datetime(2024, 1, 15)))
+        self.assertFalse(state.covers(datetime(2023, 12, 1)))
+        self.assertFalse(state.covers(datetime(2024, 3, 1)))
+        self.assertEqual(state.watermark(datetime(2023, 12, 1)).begin, datetime(2023, 12, 1, tzinfo=timezone.utc))
+
+    def test_unreadable_state_is_empty(self):
+        """A corrupt state file should be ignored."""
+        sync_state_path(self.output_dir, "dataset", "1").write_text("{not json")
+        state = SyncState.load(self.output_dir, "dataset", "1")
+        self.assertIsNone(state.cursor)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from src.knmi_dataset_downloader.tracing import TracingHooks
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+
+@unittest.skipIf(TracerProvider is None, "opentelemetry-sdk is not installed")
+class TestTracingHooks(unittest.TestCase):
+    """Test cases for recording download phases as OpenTelemetry spans."""
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.hooks = TracingHooks(provider.get_tracer("test"))
+
+    def test_download_span_with_children(self):
+        """A download should become a span with its URL and first byte phases as children."""
+        self.hooks.on_url_resolved("file.nc", 100.0, 100.5)
+        self.hooks.on_first_byte("file.nc", 101.0, 101.2)
+        self.hooks.on_chunk("file.nc", 10, 101.2)
+        self.hooks.on_chunk("file.nc", 10, 101.3)
+        self.hooks.on_write("file.nc", 20, 101.3, 101.4)
+        self.hooks.on_file_done("file.nc", 20, 101.0, 102.0, success=True)
+
+        spans = {span.name: span for span in self.exporter.get_finished_spans()}
+        download = spans["knmi.download_file"]
+        self.assertEqual(download.start_time, 100_000_000_000)  # Starts with the URL request
+        self.assertEqual(download.end_time, 102_000_000_000)
+        self.assertEqual(download.attributes["knmi.chunks"], 2)
+        self.assertEqual(download.attributes["knmi.bytes"], 20)
+        for name in ("knmi.resolve_url", "knmi.first_byte"):
+            self.assertEqual(spans[name].parent.span_id, download.context.span_id)
+
+    def test_failed_download_is_marked(self):
+        """A failed download should have an error status."""
+        self.hooks.on_file_done("file.nc", 0, 1.0, 2.0, success=False)
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertFalse(span.status.is_ok)
+
+    def test_list_page(self):
+        """A listing page should become a span with the number of files."""
+        self.hooks.on_list_page(5, 1.0, 2.0)
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.name, "knmi.list_page")
+        self.assertEqual(span.attributes["knmi.files"], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
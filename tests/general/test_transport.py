@@ -0,0 +1,48 @@
+import sys
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from src.knmi_dataset_downloader.transport import SharedTransport, TransportConfig
+
+
+class TestSharedTransport(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the shared connection pool."""
+
+    def test_pool_is_sized_from_concurrency(self):
+        """Without explicit limits the pool should scale with the concurrency."""
+        limits = TransportConfig().limits(concurrency=10)
+        self.assertEqual(limits.max_connections, 20)
+        self.assertEqual(TransportConfig(max_connections=5).limits(concurrency=10).max_connections, 5)
+
+    async def test_clients_share_the_pool(self):
+        """Closing one client should leave the pool usable for the others."""
+        transport = SharedTransport(concurrency=2)
+        handled = []
+
+        async def handle(request: httpx.Request) -> httpx.Response:
+            handled.append(request.url.host)
+            return httpx.Response(200)
+
+        transport.transport = httpx.MockTransport(handle)
+        first = transport.client()
+        second = transport.client()
+
+        await first.get("https://api.test/")
+        await first.aclose()
+        await second.get("https://download.test/")
+        await second.aclose()
+        await transport.aclose()
+
+        self.assertEqual(handled, ["api.test", "download.test"])
+
+    def test_http2_without_h2_names_the_extra(self):
+        """Enabling HTTP/2 without the h2 package should say which extra to install."""
+        with patch.dict(sys.modules, {"h2": None}):
+            with self.assertRaisesRegex(ImportError, r"knmi-dataset-downloader\[http2\]"):
+                SharedTransport(TransportConfig(http2=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
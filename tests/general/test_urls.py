@@ -0,0 +1,35 @@
+import time
+import unittest
+from datetime import datetime, timezone
+
+from src.knmi_dataset_downloader.defaults import DEFAULT_URL_TTL
+from src.knmi_dataset_downloader.urls import ResolvedUrl, url_expiry
+
+
+class TestUrlExpiry(unittest.TestCase):
+    """Test cases for determining when a download URL expires."""
+
+    def test_presigned_url(self):
+        """The expiry of a pre-signed URL should follow from its signing time and lifetime."""
+        url = "https://bucket.s3.amazonaws.com/file.nc?X-Amz-Date=20240101T120000Z&X-Amz-Expires=3600&X-Amz-Signature=abc"
+        signed_at = datetime(2024, 1, 1, 12, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(url_expiry(url, resolved_at=0), signed_at + 3600)
+
+    def test_lifetime_without_signing_time(self):
+        """Without a signing time the lifetime should count from when the URL was obtained."""
+        self.assertEqual(url_expiry("https://download.test/file.nc?X-Amz-Expires=60", resolved_at=100), 160)
+
+    def test_default_lifetime(self):
+        """URLs that do not state their expiry should get the default lifetime."""
+        self.assertEqual(url_expiry("https://download.test/file.nc", resolved_at=100), 100 + DEFAULT_URL_TTL)
+        self.assertEqual(url_expiry("https://download.test/file.nc?X-Amz-Expires=soon", resolved_at=100), 100 + DEFAULT_URL_TTL)
+
+    def test_is_expired(self):
+        """A URL should count as expired once it is within the margin of its expiry."""
+        url = ResolvedUrl(url="https://download.test/file.nc", expires_at=time.time() + 60)
+        self.assertFalse(url.is_expired(margin=30))
+        self.assertTrue(url.is_expired(margin=90))
+
+
+if __name__ == '__main__':
+    unittest.main()
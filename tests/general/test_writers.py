@@ -0,0 +1,50 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.knmi_dataset_downloader.writers import WRITERS, open_writer
+
+
+class TestWriters(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the backends writing downloads to disk."""
+
+    async def asyncSetUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+
+    async def asyncTearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    async def test_writes_buffers_in_order(self):
+        """Every backend should write the buffers sequentially, replacing an existing file."""
+        for backend in WRITERS:
+            with self.subTest(backend=backend):
+                path = self.directory / backend
+                path.write_bytes(b"old content that is longer")
+                writer = await open_writer(backend, path, 0)
+                for i in range(50):
+                    await writer.write(bytearray(bytes([i]) * 1000))
+                await writer.close()
+
+                self.assertEqual(path.read_bytes(), b"".join(bytes([i]) * 1000 for i in range(50)))
+
+    async def test_appends_after_offset(self):
+        """Every backend should keep the bytes before the offset when resuming."""
+        for backend in WRITERS:
+            with self.subTest(backend=backend):
+                path = self.directory / backend
+                path.write_bytes(b"head")
+                writer = await open_writer(backend, path, 4)
+                await writer.write(bytearray(b"tail"))
+                await writer.close()
+
+                self.assertEqual(path.read_bytes(), b"headtail")
+
+    async def test_unknown_backend(self):
+        """An unknown backend should be rejected."""
+        with self.assertRaises(ValueError):
+            await open_writer("carrier-pigeon", self.directory / "file", 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
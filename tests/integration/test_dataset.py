@@ -71,7 +71,8 @@ class TestDownloader(unittest.IsolatedAsyncioTestCase):
         )
         
         # Find the downloaded file
-        downloaded_files = list(self.temp_dir.glob("**/*"))
+        # Hidden files hold download bookkeeping such as the manifest
+        downloaded_files = [f for f in self.temp_dir.glob("**/*") if not f.name.startswith(".")]
         self.assertEqual(len(downloaded_files), 1, "Expected exactly one downloaded file")
         downloaded_file = downloaded_files[0]
         